@@ -15,6 +15,11 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
 from models.model_utils import IndicBERTModel
 from models.ocr_utils import OCRProcessor
 from pdf.pdf_utils import PDFProcessor
+from search.suffix_array import SuffixArrayCache
+from storage.document_store import DocumentStore
+from storage.embedding_cache import EmbeddingCache
+from storage.ocr_cache import OCRCache
+from storage.upload_store import InvalidUploadError, UploadStore, UploadTooLargeError
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
@@ -24,10 +29,19 @@ app.config['SECRET_KEY'] = 'your-secret-key-here'
 # Ensure uploads directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Per-document page text, written once at upload and read by every search
+document_store = DocumentStore(os.path.join(app.config['UPLOAD_FOLDER'], '.store'))
+upload_store = UploadStore(app.config['UPLOAD_FOLDER'], document_store)
+suffix_arrays = SuffixArrayCache(os.path.join(app.config['UPLOAD_FOLDER'], '.store', 'suffix_arrays'))
+embedding_cache = EmbeddingCache(os.path.join(app.config['UPLOAD_FOLDER'], '.store', 'embeddings'))
+ocr_cache = OCRCache(os.path.join(app.config['UPLOAD_FOLDER'], '.store', 'ocr_cache'))
+
 # Initialize models
-model_utils = IndicBERTModel()
-ocr_processor = OCRProcessor()
-pdf_processor = PDFProcessor()
+model_utils = IndicBERTModel(document_store=document_store, suffix_arrays=suffix_arrays,
+                             embedding_cache=embedding_cache)
+ocr_processor = OCRProcessor(cache=ocr_cache)
+pdf_processor = PDFProcessor(document_store=document_store, suffix_arrays=suffix_arrays,
+                             ocr_processor=ocr_processor)
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf'}
@@ -58,13 +72,24 @@ def upload_pdf():
         filename = secure_filename(file.filename)
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         
-        # Save uploaded file
-        file.save(file_path)
+        # Cached search results for the old content must not outlive it
+        previous_hash = document_store.resolve_hash(file_path) if os.path.exists(file_path) else None
+        
+        # Save uploaded file, hashing it as it streams (known content is not stored twice)
+        try:
+            file_path, doc_hash = upload_store.save(file.stream, filename, app.config['MAX_CONTENT_LENGTH'])
+        except UploadTooLargeError as e:
+            return jsonify({'error': str(e)}), 413
+        except InvalidUploadError as e:
+            return jsonify({'error': str(e)}), 400
+        if previous_hash and previous_hash != doc_hash:
+            model_utils.invalidate_document(previous_hash)
         
-        # Process the PDF
-        result = pdf_processor.process_pdf_sync(file_path)
+        # Process the PDF (or reuse the stored result of identical content)
+        result = pdf_processor.process_pdf_sync(file_path, doc_hash)
         
         if 'error' in result:
+            upload_store.remove(file_path, doc_hash)
             return jsonify(result), 500
         
         return jsonify(result)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Compare IndicBERT inference backends: embedding parity against eager PyTorch
+and throughput of each backend
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from models.backends import BACKENDS, build_tiny_bert, check_parity, create_backend
+from bench_embeddings import GUJARATI_WORDS, make_pages
+
+
+def load_model(tiny):
+    """IndicBERT from the Hugging Face cache, or a tiny local BERT"""
+    if tiny:
+        return build_tiny_bert(GUJARATI_WORDS, hidden_size=256, num_layers=4)
+    from transformers import AutoModel, AutoTokenizer
+    return AutoModel.from_pretrained("ai4bharat/indic-bert"), AutoTokenizer.from_pretrained("ai4bharat/indic-bert")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--tiny", action="store_true", help="Use a tiny local BERT instead of downloading IndicBERT")
+    args = parser.parse_args()
+
+    model, tokenizer = load_model(args.tiny)
+    texts = make_pages(args.pages)
+
+    print("🔍 Parity (pooled embeddings vs eager)")
+    for name in BACKENDS:
+        if name == "eager":
+            continue
+        parity = check_parity(model, tokenizer, texts, candidate=name, num_threads=args.threads,
+                              batch_size=args.batch_size)
+        print(f"   {name}: min cosine {parity['min_cosine']:.4f}, mean cosine {parity['mean_cosine']:.4f}, "
+              f"max |diff| {parity['max_abs_diff']:.3e}")
+
+    print(f"\n🚀 Throughput ({len(texts)} pages, batch size {args.batch_size})")
+    baseline = None
+    for name in BACKENDS:
+        backend = create_backend(name, args.threads)
+        backend.load(model, tokenizer)
+        backend.embed(texts[:args.batch_size], args.batch_size)  # warm-up
+        start = time.perf_counter()
+        backend.embed(texts, args.batch_size)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"   {name:<6} {len(texts) / elapsed:8.1f} pages/s  ({baseline / elapsed:.1f}x vs eager)")
+
+
+if __name__ == "__main__":
+    main()
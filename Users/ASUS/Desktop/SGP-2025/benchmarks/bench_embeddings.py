@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark IndicBERT embedding throughput: one forward pass per text vs length-bucketed batches
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from models.backends import build_tiny_bert
+from models.model_utils import IndicBERTModel
+
+GUJARATI_WORDS = ["આ", "એક", "નવલકથા", "છે", "જેમાં", "ઇતિહાસ", "વિશે", "લખવામાં", "આવ્યું", "ગુજરાત", "ભાષા", "પુસ્તક"]
+
+
+def build_tiny_model(model):
+    """Swap in a small randomly initialised BERT so the benchmark runs without a model download"""
+    tiny_model, tokenizer = build_tiny_bert(GUJARATI_WORDS)
+    model.use_model(tiny_model, tokenizer)
+    return model
+
+
+def make_pages(count):
+    """Generate page-like texts of varying length"""
+    random.seed(0)
+    return [" ".join(random.choice(GUJARATI_WORDS) for _ in range(random.randint(10, 250)))
+            for _ in range(count)]
+
+
+def time_embeddings(model, texts, batch_size, repeats):
+    """Return the best wall time over several runs"""
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = model.get_embeddings(texts, batch_size=batch_size)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=100, help="Number of page texts to embed")
+    parser.add_argument("--batch-sizes", default="1,8,16,32", help="Comma-separated batch sizes (1 = old per-text path)")
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--tiny", action="store_true", help="Use a tiny local BERT instead of downloading IndicBERT")
+    args = parser.parse_args()
+
+    model = IndicBERTModel()
+    if args.tiny:
+        build_tiny_model(model)
+    elif not model._load_model():
+        print("❌ Could not load IndicBERT; rerun with --tiny")
+        return
+
+    texts = make_pages(args.pages)
+    print(f"🚀 Embedding {len(texts)} pages")
+    print("=" * 50)
+
+    baseline_time, baseline = None, None
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        elapsed, embeddings = time_embeddings(model, texts, batch_size, args.repeats)
+        line = f"batch_size={batch_size:<3} {elapsed:7.2f}s  {len(texts) / elapsed:8.1f} pages/s"
+        if baseline is None:
+            baseline_time, baseline = elapsed, embeddings
+        else:
+            max_diff = float(np.abs(embeddings - baseline).max())
+            line += f"  speedup {baseline_time / elapsed:4.1f}x  max|diff| {max_diff:.2e}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
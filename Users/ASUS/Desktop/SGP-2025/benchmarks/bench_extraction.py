@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark text-PDF ingestion (extraction only, no store or indexes): the previous
+sequence that opened the file once per step (PyPDF2 language sample, fitz scanned
+check, PyPDF2 text and metadata) against the single PyMuPDF pass of extract_pdf.
+The previous sequence includes its first-page OCR language probe; extract_pdf
+reads the language from the text layer instead.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import fitz  # PyMuPDF
+import PyPDF2
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from models.ocr_utils import OCRProcessor
+from pdf.pdf_utils import PDFProcessor
+
+
+def old_extract(processor, pdf_path):
+    """Previous extract_pdf for a text PDF: five opens, text parsed by PyPDF2"""
+    ocr = processor.ocr_processor
+    # auto_detect_language: PyPDF2 sample of the first 2 pages, then an OCR probe of the first page
+    with open(pdf_path, 'rb') as file:
+        sample_text = "".join((page.extract_text() or "")[:1000] for page in PyPDF2.PdfReader(file).pages[:2])
+    languages = ['guj', 'eng'] if ocr.detect_gujarati_text(sample_text) else ['eng']
+    if languages == ['eng']:
+        first_page = next(ocr.pdf_to_images(pdf_path, max_pages=1), None)
+        if first_page is not None:
+            ocr.extract_text_with_ocr(first_page, ['guj', 'eng'])
+
+    # is_scanned_pdf: fitz, first 3 pages
+    with fitz.open(pdf_path) as doc:
+        ocr.is_scanned_text([doc.load_page(page_num).get_text() for page_num in range(min(3, len(doc)))])
+
+    # extract_text_from_pdf: PyPDF2
+    pages = []
+    with open(pdf_path, 'rb') as file:
+        for page_num, page in enumerate(PyPDF2.PdfReader(file).pages):
+            text = page.extract_text()
+            if text.strip():
+                pages.append({'page': page_num + 1, 'text': text.strip(), 'confidence': 1.0})
+
+    # get_pdf_info: PyPDF2 again
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        metadata = reader.metadata or {}
+        info = {'num_pages': len(reader.pages), 'title': metadata.get('/Title', '')}
+    return pages, info
+
+
+def new_extract(processor, pdf_path):
+    result = processor.extract_pdf(pdf_path)
+    return result['pages'], result['pdf_info']
+
+
+def best_time(fn, repeat):
+    """Best of repeat runs, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs='+', help="Text-based PDFs to extract")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    processor = PDFProcessor(ocr_processor=OCRProcessor(load_easyocr=False))
+    print(f"🚀 Extraction time, best of {args.repeat}")
+    print("=" * 60)
+
+    for pdf_path in args.pdfs:
+        with fitz.open(pdf_path) as doc:
+            page_count = len(doc)
+        old_pages, _ = old_extract(processor, pdf_path)
+        new_pages, _ = new_extract(processor, pdf_path)
+        old_s = best_time(lambda: old_extract(processor, pdf_path), args.repeat)
+        new_s = best_time(lambda: new_extract(processor, pdf_path), args.repeat)
+
+        print(f"\n📄 {os.path.basename(pdf_path)}: {page_count} pages, "
+              f"{os.path.getsize(pdf_path) / 1024:.0f} KB")
+        print(f"   {'multi-open (PyPDF2)':<24} {old_s * 1000:9.1f} ms  {old_s / page_count * 1000:6.2f} ms/page")
+        print(f"   {'single open (PyMuPDF)':<24} {new_s * 1000:9.1f} ms  {new_s / page_count * 1000:6.2f} ms/page")
+        print(f"   📈 {old_s / new_s:.1f}x faster")
+        # The two extractors differ in whitespace and line breaks; compare the words they find
+        old_words = sum(len(page['text'].split()) for page in old_pages)
+        new_words = sum(len(page['text'].split()) for page in new_pages)
+        print(f"   words: {old_words} (PyPDF2) vs {new_words} (PyMuPDF), "
+              f"pages with text: {len(old_pages)} vs {len(new_pages)}")
+
+
+if __name__ == "__main__":
+    main()
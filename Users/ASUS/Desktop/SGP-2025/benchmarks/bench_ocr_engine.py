@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare Tesseract engine modes: one pytesseract call (and process) per image,
+one tesseract process per batch via a list file, and the in-process tesserocr
+binding when installed. Measures raw recognition and full scanned-PDF ingestion.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from models.ocr_utils import OCRProcessor, TesseractEngine, TESSEROCR_AVAILABLE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdf", required=True, help="Scanned PDF to OCR")
+    parser.add_argument("--pages", type=int, default=8, help="Pages used for the raw recognition benchmark")
+    parser.add_argument("--languages", default="guj,eng", help="Comma-separated Tesseract languages")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--skip-ingestion", action="store_true", help="Only run the raw recognition benchmark")
+    args = parser.parse_args()
+
+    languages = args.languages.split(',')
+    modes = ['per_call', 'batch'] + (['tesserocr'] if TESSEROCR_AVAILABLE else [])
+    if not TESSEROCR_AVAILABLE:
+        print("⚠️  tesserocr not installed, skipping the in-process engine")
+
+    processor = OCRProcessor(load_easyocr=False)
+    images = [processor.preprocess_variant(image, 'standard')
+              for image in processor.pdf_to_images(args.pdf, max_pages=args.pages)]
+    config = processor.ocr_plan(languages)[0][1]
+
+    print(f"🔍 Raw recognition ({len(images)} pages, {config})")
+    baseline = None
+    for mode in modes:
+        engine = TesseractEngine(mode)
+        engine.recognize(images[:1], config)  # warm-up (loads traineddata for tesserocr)
+        start = time.perf_counter()
+        engine.recognize(images, config)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"   {mode:<10} {len(images) / elapsed:7.2f} pages/s  ({baseline / elapsed:.1f}x vs per_call)")
+
+    if args.skip_ingestion:
+        return
+
+    print(f"\n📄 Scanned PDF ingestion ({args.pdf}, batch size {args.batch_size})")
+    baseline = None
+    for mode in modes:
+        processor = OCRProcessor(load_easyocr=False, batch_size=args.batch_size, engine=TesseractEngine(mode))
+        start = time.perf_counter()
+        pages = processor.process_scanned_pdf(args.pdf, languages)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"   {mode:<10} {len(pages)} pages in {elapsed:6.1f}s  ({baseline / elapsed:.1f}x vs per_call)")
+
+
+if __name__ == "__main__":
+    main()
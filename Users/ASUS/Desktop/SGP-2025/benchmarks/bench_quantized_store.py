@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compact page embedding store: memory, scoring time and recall@k
+against exact float32 cosine similarity
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+
+from search.quantized_store import PRECISIONS, QuantizedEmbeddings, recall_at_k
+
+
+def make_embeddings(pages, dim, seed=0):
+    """Clustered random vectors, roughly like page embeddings of related documents"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, pages // 50), dim))
+    embeddings = centers[rng.integers(0, len(centers), size=pages)] + 0.6 * rng.normal(size=(pages, dim))
+    queries = centers[rng.integers(0, len(centers), size=50)] + 0.6 * rng.normal(size=(50, dim))
+    return embeddings, queries
+
+
+def time_per_query(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    embeddings, queries = make_embeddings(args.pages, args.dim)
+    print(f"🚀 {args.pages} pages x {args.dim} dims, top-{args.k}")
+    print("=" * 60)
+
+    # Old path: float64 matrix, cosine_similarity on every query, full Python sort
+    try:
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        def old_search(query):
+            similarities = cosine_similarity(query.reshape(1, -1), embeddings)[0]
+            return sorted(range(len(similarities)), key=lambda i: -similarities[i])[:args.k]
+
+        old_ms = time_per_query(old_search, queries)
+        print(f"{'float64 + sklearn':<20} {embeddings.nbytes / 1e6:8.1f} MB  {old_ms:8.2f} ms/query")
+    except ImportError:
+        old_ms = None
+        print("⚠️  scikit-learn not installed, skipping the old path")
+
+    for precision in PRECISIONS:
+        store = QuantizedEmbeddings.from_embeddings(embeddings, precision)
+        ms = time_per_query(lambda query: store.top_k(query, args.k), queries)
+        recall = recall_at_k(embeddings, store, queries, args.k)
+        line = (f"{precision:<20} {store.nbytes / 1e6:8.1f} MB  {ms:8.2f} ms/query  "
+                f"recall@{args.k} {recall:.3f}  memory {embeddings.nbytes / store.nbytes:4.1f}x smaller")
+        if old_ms:
+            line += f"  {old_ms / ms:5.1f}x faster"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
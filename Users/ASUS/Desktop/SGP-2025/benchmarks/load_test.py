@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Load test a running API server: search latency on its own, then while PDFs
+are being uploaded and processed. With ingestion off the event loop the
+search p99 should stay flat. Needs httpx (pip install httpx).
+
+    python load_test.py --pdf sample.pdf --upload ../uploads/scanned.pdf
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+import numpy as np
+
+
+async def search_client(client, args, latencies, stop):
+    """Issue searches back to back until told to stop"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.post("/search", json={"query": args.query, "pdf_filename": args.pdf})
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            print(f"⚠️  Search returned {response.status_code}: {response.text[:200]}")
+
+
+async def upload_client(client, path, count, upload_times):
+    """Upload the same PDF repeatedly, one after another"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    for i in range(count):
+        start = time.perf_counter()
+        response = await client.post(
+            "/upload-pdf",
+            files={"file": (f"loadtest_{i}_{os.path.basename(path)}", data, "application/pdf")}
+        )
+        upload_times.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            print(f"⚠️  Upload returned {response.status_code}: {response.text[:200]}")
+
+
+async def run_phase(args, uploads):
+    latencies = []
+    upload_times = []
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(base_url=args.url, timeout=600) as client:
+        searchers = [asyncio.create_task(search_client(client, args, latencies, stop))
+                     for _ in range(args.concurrency)]
+        if uploads:
+            await asyncio.gather(*[upload_client(client, args.upload, args.uploads, upload_times)
+                                   for _ in range(args.upload_concurrency)])
+        else:
+            await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*searchers)
+    return np.array(latencies), upload_times
+
+
+def report(label, latencies):
+    if not len(latencies):
+        print(f"   {label:<16} no searches completed")
+        return
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"   {label:<16} {len(latencies):6d} searches  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  p99 {p99:7.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--pdf", required=True, help="Already uploaded PDF filename to search")
+    parser.add_argument("--query", default="ગુજરાત")
+    parser.add_argument("--upload", required=True, help="Local PDF to upload during the loaded phase")
+    parser.add_argument("--uploads", type=int, default=2, help="Uploads per upload client")
+    parser.add_argument("--upload-concurrency", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent search clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds for the idle phase")
+    args = parser.parse_args()
+
+    print(f"🔍 Search latency ({args.concurrency} clients)")
+    idle, _ = await run_phase(args, uploads=False)
+    report("idle", idle)
+
+    loaded, upload_times = await run_phase(args, uploads=True)
+    report("during uploads", loaded)
+    if upload_times:
+        print(f"\n📄 {len(upload_times)} uploads, mean {np.mean(upload_times):.1f}s each")
+    if len(idle) and len(loaded):
+        print(f"\n📈 p99 ratio (loaded / idle): {np.percentile(loaded, 99) / np.percentile(idle, 99):.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
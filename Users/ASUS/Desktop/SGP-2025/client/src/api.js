@@ -55,21 +55,40 @@ api.interceptors.response.use(
 );
 
 // API functions
-export const uploadPDF = async (file) => {
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Upload a PDF as a background ingestion job and poll it until processing finishes.
+// onProgress receives the job status ({ stage, pages_done, total_pages, progress, eta_seconds }).
+export const uploadPDF = async (file, onProgress) => {
   const formData = new FormData();
   formData.append('file', file);
   
-  const response = await api.post('/upload-pdf', formData, {
+  const response = await api.post('/jobs', formData, {
     headers: {
       'Content-Type': 'multipart/form-data',
     },
-    timeout: 300000, // 5 minutes for upload + processing
-    // Add retry logic for network issues
-    validateStatus: (status) => {
-      return status < 500; // Don't retry on 4xx errors
-    },
+    timeout: 120000, // 2 minutes for the upload itself; processing is polled below
   });
-  return response.data;
+  
+  const jobId = response.data.job_id;
+  for (;;) {
+    const { data: job } = await api.get(`/jobs/${jobId}`, {
+      timeout: 10000, // 10 seconds per status check
+    });
+    if (onProgress) {
+      onProgress(job);
+    }
+    if (job.status === 'completed') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      // Shaped like an axios error so callers handle it the same way
+      const error = new Error(job.error || 'Processing failed');
+      error.response = { status: 500, data: { detail: job.error } };
+      throw error;
+    }
+    await sleep(1000);
+  }
 };
 
 export const searchPDF = async (query, pdfFilename) => {
@@ -84,20 +84,11 @@ const Upload = ({ onUploadSuccess, onUploadError }) => {
     setUploadError(null);
 
     try {
-      // Simulate progress for better UX
-      const progressInterval = setInterval(() => {
-        setUploadProgress(prev => {
-          if (prev >= 90) {
-            clearInterval(progressInterval);
-            return 90;
-          }
-          return prev + 10;
-        });
-      }, 200);
-
-      const result = await uploadPDF(file);
+      // Report real per-page progress from the ingestion job
+      const result = await uploadPDF(file, (job) => {
+        setUploadProgress(Math.min(99, Math.round(job.progress * 100)));
+      });
       
-      clearInterval(progressInterval);
       setUploadProgress(100);
       
       // Success
@@ -107,7 +98,6 @@ const Upload = ({ onUploadSuccess, onUploadError }) => {
       }, 500);
       
     } catch (error) {
-      clearInterval(progressInterval);
       setIsUploading(false);
       setUploadProgress(0);
       
@@ -0,0 +1 @@
+# Background jobs package for PDF search application 
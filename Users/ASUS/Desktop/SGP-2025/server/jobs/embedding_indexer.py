@@ -0,0 +1,70 @@
+import queue
+import threading
+from typing import Callable, Optional
+
+# Submitted when the indexer should stop after the current batch
+_STOP = None
+
+
+class EmbeddingIndexer:
+    def __init__(self, index_document: Callable[[str], bool], save: Callable[[], None]):
+        """Background thread that adds uploaded documents to the vector index, saving once per batch"""
+        # index_document(pdf_path) returns whether the index changed; save() persists it
+        self.index_document = index_document
+        self.save = save
+        self._queue: 'queue.Queue[Optional[str]]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        # Documents submitted but not yet handled
+        self._pending = 0
+        self._pending_changed = threading.Condition()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="embedding-indexer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, pdf_path: str) -> None:
+        """Queue a processed document; the caller does not wait for the embeddings"""
+        with self._pending_changed:
+            self._pending += 1
+        self._queue.put(pdf_path)
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until every submitted document has been handled"""
+        with self._pending_changed:
+            return self._pending_changed.wait_for(lambda: self._pending == 0, timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Everything queued meanwhile joins the batch, so a burst of uploads costs one save
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = _STOP in batch
+
+            changed = False
+            for pdf_path in dict.fromkeys(path for path in batch if path is not _STOP):
+                try:
+                    changed |= bool(self.index_document(pdf_path))
+                except Exception as e:
+                    print(f"Error indexing page embeddings of {pdf_path}: {e}")
+            if changed:
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"Error saving the vector index: {e}")
+
+            with self._pending_changed:
+                self._pending -= len(batch) - batch.count(_STOP)
+                self._pending_changed.notify_all()
+            if stopping:
+                return
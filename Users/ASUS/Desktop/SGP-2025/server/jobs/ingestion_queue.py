@@ -0,0 +1,161 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+# Stages reported per page, used for the ETA (the others take a roughly fixed time)
+PAGE_STAGES = ('render', 'preprocess', 'ocr')
+
+
+class IngestionJob:
+    def __init__(self, filename: str, pdf_path: str, doc_hash: Optional[str] = None):
+        """State of one queued PDF ingestion (status, stage and per-page progress)"""
+        self.job_id = uuid.uuid4().hex
+        self.filename = filename
+        self.pdf_path = pdf_path
+        # Content hash computed while the upload was saved (None = hash when storing)
+        self.doc_hash = doc_hash
+        self.status = "queued"  # queued, running, completed or failed
+        self.stage = "queued"   # starting, detect, render, preprocess, ocr, extract, index or done
+        self.pages_done = 0
+        self.total_pages = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.pages_started_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        # Bumped on every change so event streams only send updates
+        self.version = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time extrapolated from the pages processed so far"""
+        if self.status != "running" or not self.pages_done or not self.total_pages or self.pages_started_at is None:
+            return None
+        per_page = (time.time() - self.pages_started_at) / self.pages_done
+        return per_page * max(0, self.total_pages - self.pages_done)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        data = {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "progress": self.pages_done / self.total_pages if self.total_pages else (1.0 if self.status == "completed" else 0.0),
+            "eta_seconds": self.eta_seconds(),
+            "elapsed_seconds": end - self.started_at if self.started_at else 0.0,
+            "error": self.error
+        }
+        if include_result and self.status == "completed":
+            data["result"] = self.result
+        return data
+
+
+class IngestionQueue:
+    def __init__(self, process: Callable[[IngestionJob], Awaitable[Dict[str, Any]]], workers: int = 2,
+                 max_finished_jobs: int = 1000):
+        """Queue of PDF ingestion jobs, processed by a fixed number of asyncio workers"""
+        self.process = process
+        self.workers = max(1, workers)
+        # Finished jobs kept for status queries; the oldest are dropped past this count
+        self.max_finished_jobs = max_finished_jobs
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def start(self) -> None:
+        """Start the workers (call from the running event loop)"""
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, filename: str, pdf_path: str, doc_hash: Optional[str] = None) -> IngestionJob:
+        """Queue a saved PDF for processing"""
+        job = IngestionJob(filename, pdf_path, doc_hash)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def update(self, job: IngestionJob, stage: str, pages_done: int = 0, total_pages: int = 0) -> None:
+        """Record progress (called from worker threads as well as the event loop)"""
+        with self._lock:
+            job.stage = stage
+            if total_pages:
+                job.total_pages = total_pages
+                job.pages_done = pages_done
+                if stage in PAGE_STAGES and job.pages_started_at is None:
+                    job.pages_started_at = time.time()
+            job.version += 1
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            with self._lock:
+                job.status = "running"
+                job.stage = "starting"
+                job.started_at = time.time()
+                job.version += 1
+            try:
+                result = await self.process(job)
+                with self._lock:
+                    job.result = result
+                    job.status = "completed"
+                    job.stage = "done"
+                    job.pages_done = job.total_pages = result.get("total_pages", job.total_pages)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                with self._lock:
+                    job.error = str(e)
+                    job.status = "failed"
+            finally:
+                with self._lock:
+                    job.finished_at = time.time()
+                    job.version += 1
+                self._queue.task_done()
+
+    async def events(self, job_id: str, poll_interval: float = 0.5) -> AsyncIterator[str]:
+        """Server-Sent Events: a 'progress' event per change, then 'completed' or 'failed'"""
+        last_version = -1
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+                return
+            with self._lock:
+                version = job.version
+                data = job.to_dict(include_result=job.finished)
+            if version != last_version:
+                last_version = version
+                event = job.status if job.finished else "progress"
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            if job.finished:
+                return
+            await asyncio.sleep(poll_interval)
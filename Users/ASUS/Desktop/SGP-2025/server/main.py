@@ -1,19 +1,35 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import os
-import shutil
-from typing import List, Dict, Any
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 import uvicorn
 from pydantic import BaseModel
 import logging
+import threading
 import time
 from pathlib import Path
+from urllib.parse import quote
+import tempfile
 
 # Import our custom modules
-from models.model_utils import IndicBERTModel
+from jobs.embedding_indexer import EmbeddingIndexer
+from jobs.ingestion_queue import IngestionJob, IngestionQueue
 from models.ocr_utils import OCRProcessor
-from pdf.pdf_utils import PDFProcessor
+from pdf.pdf_utils import PDFProcessor, init_ingest_worker
+from search.inverted_index import InvertedIndex
+from search.suffix_array import SuffixArrayCache
+from search.vector_index import VectorIndex
+from storage.document_store import DocumentStore
+from storage.embedding_cache import EmbeddingCache
+from storage.highlight_cache import HighlightCache, normalize_terms
+from storage.ocr_cache import OCRCache
+from storage.multipart_stream import MultipartError, MultipartFileReader
+from storage.upload_store import UploadStore, UploadTooLargeError
+from storage.word_boxes import WordBoxStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,18 +46,152 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize models
-model_utils = IndicBERTModel()
-ocr_processor = OCRProcessor()
-pdf_processor = PDFProcessor()
-
 # Ensure uploads directory exists
 uploads_dir = Path("uploads")
 uploads_dir.mkdir(exist_ok=True)
 
+# Per-document page text, written once at upload and read by every search
+document_store = DocumentStore(str(uploads_dir / ".store"))
+# Uploaded bytes, stored once per distinct content; filenames in uploads/ link to them
+upload_store = UploadStore(str(uploads_dir), document_store)
+# Uploads are streamed to disk and rejected past this size (checked on the fly, not after the fact)
+max_file_size = int(os.getenv("MAX_FILE_SIZE", str(50 * 1024 * 1024)))
+# Slack allowed on Content-Length for the multipart boundaries and part headers
+MULTIPART_OVERHEAD = 64 * 1024
+suffix_arrays = SuffixArrayCache(str(uploads_dir / ".store" / "suffix_arrays"))
+embedding_cache = EmbeddingCache(str(uploads_dir / ".store" / "embeddings"))
+# Word rectangles per page, captured at ingestion so search hits can be drawn without reopening the PDF
+word_boxes = WordBoxStore(str(uploads_dir / ".store" / "word_boxes"))
+# Highlighted PDFs per document and term set (HIGHLIGHT_CACHE_MB=0 disables it)
+highlight_cache_max_bytes = int(os.getenv("HIGHLIGHT_CACHE_MB", "256")) * 1024 * 1024
+highlight_cache = (HighlightCache(str(uploads_dir / ".store" / "highlights"), highlight_cache_max_bytes)
+                   if highlight_cache_max_bytes > 0 else None)
+# OCR results per rendered page, shared by the ingestion workers (OCR_CACHE_MB=0 disables it)
+ocr_cache_max_bytes = int(os.getenv("OCR_CACHE_MB", "512")) * 1024 * 1024
+ocr_cache = OCRCache(str(uploads_dir / ".store" / "ocr_cache"), ocr_cache_max_bytes) if ocr_cache_max_bytes > 0 else None
+
+# Corpus-wide word index, rebuilt from the document store at startup and updated on every upload
+word_index = InvertedIndex()
+
+# Corpus-wide ANN index over page embeddings, saved after every upload
+vector_index_dir = str(uploads_dir / ".store" / "vector_index")
+
+# CPU-bound work runs off the event loop: text extraction/OCR in worker processes (0 = a thread),
+# search and inference on a bounded thread pool, so /health and searches stay responsive during uploads
+ingest_workers = int(os.getenv("INGEST_WORKERS", "2"))
+search_workers = int(os.getenv("SEARCH_WORKERS", "4"))
+# Scanned pages are OCR'd in parallel within each document (0 = share the cores between ingestion workers)
+ocr_page_workers = int(os.getenv("OCR_PAGE_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // max(1, ingest_workers))
+# OpenMP threads per Tesseract run: every ingestion worker may OCR ocr_page_workers pages at once
+ocr_thread_limit = max(1, (os.cpu_count() or 1) // (max(1, ingest_workers) * ocr_page_workers))
+search_executor = ThreadPoolExecutor(max_workers=max(1, search_workers), thread_name_prefix="search")
+
+# Heavy services, created by create_services() at startup rather than at import: spawned worker
+# processes re-import this module (as __mp_main__ under `python main.py`) and must not rebuild them
+vector_index: Optional[VectorIndex] = None
+ingest_executor: Optional[ProcessPoolExecutor] = None
+model_utils = None
+ocr_processor: Optional[OCRProcessor] = None
+embedding_indexer: Optional[EmbeddingIndexer] = None
+pdf_processor: Optional[PDFProcessor] = None
+
+@app.on_event("startup")
+async def create_services():
+    global vector_index, ingest_executor, model_utils, ocr_processor, embedding_indexer, pdf_processor
+    # Imported here so ingestion workers never load torch/transformers
+    from models.model_utils import IndicBERTModel
+
+    vector_index = VectorIndex.load(vector_index_dir) or VectorIndex()
+    ingest_executor = (ProcessPoolExecutor(max_workers=ingest_workers, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=init_ingest_worker,
+                                           initargs=(ocr_page_workers, ocr_thread_limit,
+                                                     ocr_cache.cache_dir if ocr_cache else None, ocr_cache_max_bytes))
+                       if ingest_workers > 0 else None)
+    model_utils = IndicBERTModel(document_store=document_store, suffix_arrays=suffix_arrays,
+                                 embedding_cache=embedding_cache, vector_index=vector_index,
+                                 backend=os.getenv("INFERENCE_BACKEND", "eager"),
+                                 num_threads=int(os.getenv("INFERENCE_THREADS", "0")) or None,
+                                 executor=search_executor)
+    ocr_processor = OCRProcessor(page_workers=ocr_page_workers, cache=ocr_cache, omp_thread_limit=ocr_thread_limit)
+    # Page embeddings are added to the vector index in the background, after the upload has responded
+    embedding_indexer = EmbeddingIndexer(model_utils.index_document_embeddings,
+                                         lambda: vector_index.save(vector_index_dir))
+    pdf_processor = PDFProcessor(document_store=document_store, word_index=word_index,
+                                 suffix_arrays=suffix_arrays, ocr_processor=ocr_processor,
+                                 executor=ingest_executor, word_boxes=word_boxes)
+    model_utils.add_load_listener(backfill_page_embeddings)
+
+# Readiness of each component, filled in by the background warm-up ('pending', 'ready', ...)
+readiness = {"index": "pending", "ocr": "pending"}
+warm_up_model = os.getenv("WARM_UP_MODEL", "1").lower() not in ("0", "false", "no")
+
+def warm_up_services():
+    """Build the word index, probe the OCR engines and warm the model up off the request path"""
+    try:
+        word_index.build_from_store(document_store)
+        readiness["index"] = "ready"
+        logger.info(f"[INDEX] Indexed {word_index.document_count} documents ({word_index.term_count} terms)")
+    except Exception as e:
+        readiness["index"] = "failed"
+        logger.error(f"[INDEX] Failed to build word index: {str(e)}")
+    
+    engines = ocr_processor.check_engines()
+    readiness["ocr"] = "ready" if engines["tesseract"] or engines["easyocr"] else "unavailable"
+    logger.info(f"[OCR] Engines: tesseract={engines['tesseract']} easyocr={engines['easyocr']}")
+    
+    if warm_up_model:
+        start_time = time.time()
+        if model_utils.warm_up():
+            logger.info(f"[MODEL] Model warmed up in {time.time() - start_time:.2f}s")
+        else:
+            logger.error("[MODEL] Model failed to load; searches will use fallback mode")
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Serve /health and /ready immediately; heavy initialization happens in the background
+    threading.Thread(target=warm_up_services, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_executors():
+    if ingest_executor is not None:
+        ingest_executor.shutdown(wait=False, cancel_futures=True)
+    search_executor.shutdown(wait=False, cancel_futures=True)
+
+def backfill_page_embeddings() -> None:
+    """Queue every uploaded document missing from the vector index (uploads skip it until the model is loaded)"""
+    missing = [filename for filename, doc_hash in document_store.filename_bindings().items()
+               if not vector_index.contains(doc_hash)]
+    if missing:
+        logger.info(f"[INDEX] Queued {len(missing)} documents for the vector index")
+    for filename in missing:
+        embedding_indexer.submit(str(uploads_dir / filename))
+
+@app.on_event("startup")
+async def start_embedding_indexer():
+    embedding_indexer.start()
+
+# Seconds shutdown waits for queued documents to be embedded and the vector index saved
+EMBEDDING_SHUTDOWN_TIMEOUT = 60
+
+@app.on_event("shutdown")
+async def stop_embedding_indexer():
+    if not await asyncio.to_thread(embedding_indexer.wait_idle, EMBEDDING_SHUTDOWN_TIMEOUT):
+        logger.warning("[INDEX] Shutting down with documents still queued for the vector index")
+    embedding_indexer.stop()
+
 class SearchRequest(BaseModel):
     query: str
     pdf_filename: str
+    include_rects: bool = False  # Add each match's rectangles on the page (PDF points)
+
+class HighlightRequest(BaseModel):
+    pdf_filename: str
+    terms: List[str]
+
+class CorpusSearchRequest(BaseModel):
+    query: str
+    phrase: bool = True
+    limit: int = 20
 
 @app.get("/")
 async def root():
@@ -62,66 +212,183 @@ async def health_check():
             "timestamp": time.time(),
             "uploads_directory": str(uploads_dir.absolute()),
             "models_status": model_status,
+            "caches": model_utils.cache_stats(),
             "api_version": "1.0.0"
         }
     except Exception as e:
         logger.error(f"[HEALTH] Health check failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
 
-@app.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    """Upload a PDF file for processing"""
-    start_time = time.time()
-    
-    # Validate file
-    if not file.filename:
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 once the model, OCR engines and word index are usable, 503 before"""
+    components = {
+        # Without warm-up the model loads lazily on the first search, so it does not gate readiness
+        "model": model_utils.load_state if warm_up_model else "lazy",
+        "ocr": readiness["ocr"],
+        "index": readiness["index"]
+    }
+    ready = all(state in ("ready", "lazy") for state in components.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "components": components,
+            "ocr_engines": ocr_processor.engine_status,
+            "indexed_documents": word_index.document_count
+        }
+    )
+
+def validate_upload(filename: Optional[str]) -> str:
+    """Check the uploaded file's name and return it sanitized"""
+    if not filename:
         raise HTTPException(status_code=400, detail="No filename provided")
     
-    if not file.filename.lower().endswith('.pdf'):
+    if not filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
     # Sanitize filename to prevent path traversal
-    safe_filename = Path(file.filename).name
+    safe_filename = Path(filename).name
     if not safe_filename or safe_filename.startswith('.'):
         raise HTTPException(status_code=400, detail="Invalid filename")
+    return safe_filename
+
+def uploaded_pdf_path(filename: str) -> str:
+    """Path of an uploaded PDF from a client-supplied name; 404 unless it is a file directly in uploads/"""
+    # Same sanitizing as uploads, then the real path must still be inside the uploads directory
+    safe_filename = Path(filename).name
+    pdf_path = uploads_dir / safe_filename
+    if (not safe_filename or safe_filename.startswith('.')
+            or pdf_path.resolve().parent != uploads_dir.resolve() or not pdf_path.is_file()):
+        raise HTTPException(status_code=404, detail="PDF file not found")
+    return str(pdf_path)
+
+def commit_upload(tmp_path: str, doc_hash: str, safe_filename: str) -> Path:
+    """Point the filename at a fully received upload (identical content is stored once)"""
+    file_path = uploads_dir / safe_filename
+    
+    # Cached search results for the content being replaced must not outlive it
+    previous_hash = document_store.resolve_hash(str(file_path)) if file_path.exists() else None
+    
+    file_path = Path(upload_store.commit(tmp_path, doc_hash, safe_filename)[0])
+    if previous_hash and previous_hash != doc_hash:
+        model_utils.invalidate_document(previous_hash)
+        logger.info(f"[UPLOAD] Replaced previous content of {safe_filename} ({previous_hash[:12]})")
+    
+    logger.info(f"[UPLOAD] File saved successfully: {safe_filename} ({file_path.stat().st_size} bytes, {doc_hash[:12]})")
+    return file_path
+
+async def save_upload(request: Request) -> Tuple[str, Path, str]:
+    """Stream a multipart PDF upload to disk, validating it on the way; returns (filename, path, content hash)"""
+    content_length = int(request.headers.get("content-length") or 0)
+    if content_length > max_file_size + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"File exceeds the maximum size of {max_file_size / (1024 * 1024):.3g}MB")
+    try:
+        reader = MultipartFileReader(request.headers.get("content-type", ""))
+    except MultipartError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    safe_filename = None
+    
+    async def file_chunks():
+        nonlocal safe_filename
+        async for data in request.stream():
+            chunks = reader.feed(data)
+            # The filename arrives with the part headers, before any file bytes are written
+            if safe_filename is None and reader.filename is not None:
+                safe_filename = validate_upload(reader.filename)
+                logger.info(f"[UPLOAD] Starting upload for: {safe_filename}")
+            for chunk in chunks:
+                yield chunk
+            if reader.finished:
+                break
+        if reader.filename is None:
+            raise HTTPException(status_code=400, detail="No file provided")
+    
+    try:
+        tmp_path, doc_hash = await upload_store.receive(file_chunks(), max_file_size)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        # Not a PDF, or a malformed multipart body
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Renames and hard links only, but resolving the replaced file's hash may read it
+    loop = asyncio.get_running_loop()
+    file_path = await loop.run_in_executor(None, commit_upload, tmp_path, doc_hash, safe_filename)
+    return safe_filename, file_path, doc_hash
+
+def remove_failed_upload(file_path: Path, doc_hash: str = None) -> None:
+    try:
+        upload_store.remove(str(file_path), doc_hash)
+        # The filename no longer exists: corpus search must stop returning it
+        word_index.remove_filename(file_path.name)
+        vector_index.remove_filename(file_path.name)
+        logger.info(f"[CLEANUP] Removed failed upload: {file_path.name}")
+    except Exception as cleanup_error:
+        logger.error(f"[CLEANUP] Failed to remove file: {cleanup_error}")
+
+async def ingest_pdf(file_path: Path, progress=None, doc_hash: str = None) -> Dict[str, Any]:
+    """Extract, store and index a saved PDF (reusing the stored result of known content); raises RuntimeError on failure"""
+    start_time = time.time()
+    logger.info(f"[PROCESS] Starting PDF processing for: {file_path.name}")
+    result = await pdf_processor.process_pdf(str(file_path), progress, doc_hash)
     
-    logger.info(f"[UPLOAD] Starting upload for: {safe_filename}")
+    if "error" in result:
+        logger.error(f"[PROCESS] PDF processing failed: {result['error']}")
+        raise RuntimeError(result["error"])
     
+    # Semantic indexing is best-effort and runs after the response; it never loads the model itself
+    embedding_indexer.submit(str(file_path))
+    
+    processing_time = time.time() - start_time
+    if result.get("deduplicated"):
+        logger.info(f"[DEDUP] Reused stored result in {processing_time:.2f}s: {file_path.name}")
+    else:
+        logger.info(f"[SUCCESS] PDF processed successfully in {processing_time:.2f}s: {file_path.name}")
+    
+    # Add processing time to result
+    result["processing_time"] = processing_time
+    result["file_size"] = file_path.stat().st_size
+    return result
+
+async def run_ingestion_job(job: IngestionJob) -> Dict[str, Any]:
+    """Process a queued upload, reporting progress on the job"""
+    file_path = Path(job.pdf_path)
+    try:
+        return await ingest_pdf(file_path, lambda stage, done, total: ingestion_queue.update(job, stage, done, total),
+                                job.doc_hash)
+    except Exception:
+        remove_failed_upload(file_path, job.doc_hash)
+        raise
+
+# Queued uploads run one job per ingestion worker; extraction itself still goes through the pools above
+ingestion_queue = IngestionQueue(run_ingestion_job, workers=max(1, ingest_workers))
+
+@app.on_event("startup")
+async def start_ingestion_queue():
+    ingestion_queue.start()
+
+@app.on_event("shutdown")
+async def stop_ingestion_queue():
+    await ingestion_queue.stop()
+    pdf_processor.close()
+
+@app.post("/upload-pdf")
+async def upload_pdf(request: Request):
+    """Upload a PDF file (multipart field 'file') for processing"""
     # Save uploaded file with error handling
-    file_path = uploads_dir / safe_filename
+    file_path = None
+    doc_hash = None
     
     try:
-        # Check if file already exists and create backup
-        if file_path.exists():
-            backup_path = uploads_dir / f"{safe_filename}.backup_{int(time.time())}"
-            shutil.move(str(file_path), str(backup_path))
-            logger.info(f"[UPLOAD] Existing file backed up to: {backup_path}")
-        
-        # Save the new file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Verify file was saved correctly
-        if not file_path.exists():
-            raise HTTPException(status_code=500, detail="Failed to save uploaded file")
-        
-        file_size = file_path.stat().st_size
-        logger.info(f"[UPLOAD] File saved successfully: {safe_filename} ({file_size} bytes)")
+        safe_filename, file_path, doc_hash = await save_upload(request)
         
         # Process the PDF
-        logger.info(f"[PROCESS] Starting PDF processing for: {safe_filename}")
-        result = await pdf_processor.process_pdf(str(file_path))
-        
-        if "error" in result:
-            logger.error(f"[PROCESS] PDF processing failed: {result['error']}")
-            raise HTTPException(status_code=500, detail=result["error"])
-        
-        processing_time = time.time() - start_time
-        logger.info(f"[SUCCESS] PDF processed successfully in {processing_time:.2f}s: {safe_filename}")
-        
-        # Add processing time to result
-        result["processing_time"] = processing_time
-        result["file_size"] = file_size
+        try:
+            result = await ingest_pdf(file_path, doc_hash=doc_hash)
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=str(e))
         
         return JSONResponse(content=result)
         
@@ -131,42 +398,193 @@ async def upload_pdf(file: UploadFile = File(...)):
     except Exception as e:
         logger.error(f"[ERROR] Unexpected error during upload/processing: {str(e)}")
         # Clean up failed upload
-        if file_path.exists():
-            try:
-                file_path.unlink()
-                logger.info(f"[CLEANUP] Removed failed upload: {safe_filename}")
-            except Exception as cleanup_error:
-                logger.error(f"[CLEANUP] Failed to remove file: {cleanup_error}")
+        if file_path is not None:
+            remove_failed_upload(file_path, doc_hash)
         
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
+@app.post("/jobs", status_code=202)
+async def create_ingestion_job(request: Request):
+    """Upload a PDF and process it in the background; poll /jobs/{id} or stream /jobs/{id}/events"""
+    try:
+        safe_filename, file_path, doc_hash = await save_upload(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[ERROR] Unexpected error during upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error saving PDF: {str(e)}")
+    
+    job = ingestion_queue.submit(safe_filename, str(file_path), doc_hash)
+    logger.info(f"[JOBS] Queued job {job.job_id} for: {safe_filename}")
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.job_id}",
+        "events_url": f"/jobs/{job.job_id}/events"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """Status, stage, per-page progress and ETA of an ingestion job (with the result once completed)"""
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=job.to_dict())
+
+@app.get("/jobs/{job_id}/events")
+async def stream_ingestion_job(job_id: str):
+    """Server-Sent Events stream of an ingestion job's progress"""
+    if ingestion_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        ingestion_queue.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/search")
 async def search_pdf(request: SearchRequest):
     query = request.query
-    pdf_filename = request.pdf_filename
     """Search for text in a specific PDF"""
-    pdf_path = os.path.join("uploads", pdf_filename)
-    
-    if not os.path.exists(pdf_path):
-        raise HTTPException(status_code=404, detail="PDF file not found")
+    pdf_path = uploaded_pdf_path(request.pdf_filename)
     
     try:
         # Normalize and trim query to avoid invisible chars interfering with matching
         query_norm = query.strip()
         # First try exact text matching for better highlighting
-        exact_results = model_utils.search_with_exact_matching(pdf_path, query_norm)
+        exact_results = await model_utils.run_in_executor(model_utils.search_with_exact_matching, pdf_path, query_norm)
         
         # If we found exact matches, return them
         if exact_results["results"]:
-            return JSONResponse(content=exact_results)
+            results = exact_results
+        else:
+            # If no exact matches, fall back to semantic search
+            results = await model_utils.search_text(pdf_path, query_norm)
         
-        # If no exact matches, fall back to semantic search
-        results = await model_utils.search_text(pdf_path, query_norm)
+        if request.include_rects:
+            results = await model_utils.run_in_executor(attach_match_rects, pdf_path, results)
         return JSONResponse(content=results)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching PDF: {str(e)}")
 
+def attach_match_rects(pdf_path: str, results: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of search results with the page rectangles of every match, from the word boxes stored at upload"""
+    doc_hash = document_store.resolve_hash(pdf_path)
+    boxes = word_boxes.get(doc_hash) if doc_hash else None
+    # Search results are cached and shared: annotate copies
+    results = dict(results, rects_available=boxes is not None)
+    if boxes is None:
+        return results
+    
+    annotated = []
+    for result in results["results"]:
+        page = result['page']
+        page_size = boxes.page_size(page)
+        result = dict(result, page_size=list(page_size) if page_size else None)
+        if 'exact_matches' in result:
+            result['exact_matches'] = [
+                dict(match, rects=boxes.rects(page, match['position'], match['position'] + match['length']))
+                for match in result['exact_matches']
+            ]
+        elif result.get('has_exact_match'):
+            # Semantic results locate their first exact occurrence only
+            start = result['match_position']
+            result['rects'] = boxes.rects(page, start, start + len(results['query']))
+        annotated.append(result)
+    results["results"] = annotated
+    return results
+
+def search_corpus_sync(query_norm: str, phrase: bool, limit: int) -> Dict[str, Any]:
+    """Word index search with context snippets, falling back to semantic search"""
+    start_time = time.perf_counter()
+    results = word_index.search(query_norm, phrase=phrase, limit=limit)
+    results["search_time_ms"] = (time.perf_counter() - start_time) * 1000
+    
+    # No word hits anywhere: fall back to semantic top-k pages across the corpus
+    if not results["results"]:
+        results = model_utils.search_corpus_semantic(query_norm, top_k=limit)
+        results["search_time_ms"] = (time.perf_counter() - start_time) * 1000
+        return results
+    
+    # Attach a context snippet around the first hit on each returned page
+    for result in results["results"]:
+        document = document_store.get(result["doc_hash"])
+        page_text = next((page['text'] for page in document['pages'] if page['page'] == result['page']), "") if document else ""
+        first_offset = result["offsets"][0]
+        context_start = max(0, first_offset - 100)
+        context_end = min(len(page_text), first_offset + len(query_norm) + 100)
+        context_text = page_text[context_start:context_end]
+        if context_start > 0:
+            context_text = "..." + context_text
+        if context_end < len(page_text):
+            context_text = context_text + "..."
+        result["text"] = context_text
+    
+    return results
+
+@app.post("/search-corpus")
+async def search_corpus(request: CorpusSearchRequest):
+    """Search for a term or phrase across every uploaded PDF"""
+    query_norm = request.query.strip()
+    if not query_norm:
+        raise HTTPException(status_code=400, detail="Query is required")
+    
+    results = await model_utils.run_in_executor(search_corpus_sync, query_norm, request.phrase, max(1, request.limit))
+    return JSONResponse(content=results)
+
+def highlight_sync(pdf_path: str, terms: Tuple[str, ...]) -> Tuple[bytes, bool]:
+    """Contents of the highlighted PDF and whether they came from the cache"""
+    doc_hash = document_store.resolve_hash(pdf_path)
+    if doc_hash is None or not document_store.contains(doc_hash):
+        raise HTTPException(status_code=404, detail="PDF has not been processed")
+    
+    # Read here rather than streamed from the cache file, which a concurrent eviction may delete
+    cached = highlight_cache.get(doc_hash, terms) if highlight_cache is not None else None
+    if cached is not None:
+        return cached, True
+    
+    if highlight_cache is not None:
+        output_path = highlight_cache.temp_path()
+    else:
+        fd, output_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+    try:
+        result = pdf_processor.highlight_stored_matches(pdf_path, list(terms), output_path, doc_hash)
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+        logger.info(f"[HIGHLIGHT] {os.path.basename(pdf_path)}: {result['matches']} matches on {len(result['pages'])} pages")
+        with open(output_path, 'rb') as f:
+            content = f.read()
+        if highlight_cache is not None:
+            highlight_cache.put(doc_hash, terms, output_path)
+    finally:
+        # put() moves the file into the cache; otherwise (no cache, or an error) it was only needed here
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+    return content, False
+
+@app.post("/highlight")
+async def highlight_pdf(request: HighlightRequest):
+    """PDF with every occurrence of the terms highlighted (cached per document and term set)"""
+    pdf_path = uploaded_pdf_path(request.pdf_filename)
+    terms = normalize_terms(request.terms)
+    if not terms:
+        raise HTTPException(status_code=400, detail="At least one term is required")
+    
+    start_time = time.perf_counter()
+    content, cached = await model_utils.run_in_executor(highlight_sync, pdf_path, terms)
+    filename = quote(f"{os.path.splitext(os.path.basename(pdf_path))[0]}_highlighted.pdf")
+    return Response(
+        content,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename*=utf-8''{filename}",
+            "X-Highlight-Cache": "hit" if cached else "miss",
+            "X-Highlight-Time-Ms": f"{(time.perf_counter() - start_time) * 1000:.1f}"
+        }
+    )
+
 @app.get("/pdfs")
 async def list_pdfs():
     """List all uploaded PDFs"""
@@ -0,0 +1,138 @@
+try:
+    import torch  # Optional: may be unavailable on some Python versions
+except Exception:
+    torch = None
+import os
+import tempfile
+from typing import List, Dict, Any
+
+import numpy as np
+
+
+class InferenceBackend:
+    """Eager PyTorch inference (full precision)"""
+    name = "eager"
+
+    def __init__(self, num_threads: int = None, device=None):
+        self.num_threads = num_threads
+        self.device = device or (torch.device("cpu") if torch else "cpu")
+        self.model = None
+        self.tokenizer = None
+
+    def prepare(self, model):
+        """Turn a loaded model into the module this backend runs"""
+        return model.to(self.device).eval()
+
+    def load(self, model, tokenizer) -> None:
+        """Prepare a model/tokenizer pair for inference"""
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        self.model = self.prepare(model)
+        self.tokenizer = tokenizer
+
+    @property
+    def hidden_size(self) -> int:
+        return self.model.config.hidden_size
+
+    def embed(self, texts: List[str], batch_size: int = 16) -> np.ndarray:
+        """Mean-pooled embeddings, run in batches of texts with similar token length"""
+        embeddings = np.zeros((len(texts), self.hidden_size), dtype=np.float32)
+        if not texts:
+            return embeddings
+
+        # Tokenize once without padding so texts can be sorted by token length
+        encoded = self.tokenizer(list(texts), max_length=512, truncation=True)
+        features = [
+            {key: encoded[key][i] for key in encoded.keys()}
+            for i in range(len(texts))
+        ]
+        order = sorted(range(len(texts)), key=lambda i: len(features[i]['input_ids']))
+
+        for batch_start in range(0, len(order), batch_size):
+            batch_indexes = order[batch_start:batch_start + batch_size]
+            try:
+                # Pad only up to the longest text in this bucket
+                inputs = self.tokenizer.pad(
+                    [features[i] for i in batch_indexes],
+                    padding=True,
+                    return_tensors="pt"
+                )
+                inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                with torch.no_grad():
+                    outputs = self.model(**inputs)
+                    # Mean pooling over real tokens only
+                    mask = inputs['attention_mask'].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+                    summed = (outputs.last_hidden_state * mask).sum(dim=1)
+                    pooled = summed / mask.sum(dim=1).clamp(min=1e-9)
+                embeddings[batch_indexes] = pooled.float().cpu().numpy()
+            except Exception as e:
+                print(f"Error getting embeddings for batch: {e}")
+                # Leave zero embeddings for this batch as fallback
+
+        return embeddings
+
+
+class DynamicInt8Backend(InferenceBackend):
+    """Dynamically quantized int8 Linear layers (CPU only)"""
+    name = "int8"
+
+    def __init__(self, num_threads: int = None, device=None):
+        # Quantized kernels only exist for the CPU
+        super().__init__(num_threads, torch.device("cpu") if torch else "cpu")
+
+    def prepare(self, model):
+        model = model.to(self.device).eval()
+        # Returns a quantized copy; the original float model is left untouched
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+BACKENDS = {
+    InferenceBackend.name: InferenceBackend,
+    DynamicInt8Backend.name: DynamicInt8Backend,
+}
+
+
+def create_backend(name: str = "eager", num_threads: int = None, device=None) -> InferenceBackend:
+    """Create an inference backend by name ('eager' or 'int8')"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](num_threads=num_threads, device=device)
+
+
+def check_parity(model, tokenizer, texts: List[str], candidate: str = "int8", reference: str = "eager",
+                 num_threads: int = None, batch_size: int = 16) -> Dict[str, Any]:
+    """Compare pooled embeddings of two backends built from the same model"""
+    results = {}
+    for name in (reference, candidate):
+        backend = create_backend(name, num_threads)
+        backend.load(model, tokenizer)
+        results[name] = backend.embed(texts, batch_size)
+
+    expected, actual = results[reference], results[candidate]
+    cosine = (expected * actual).sum(axis=1) / np.maximum(
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1), 1e-12)
+    return {
+        "reference": reference,
+        "candidate": candidate,
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()) if len(cosine) else 1.0,
+        "mean_cosine": float(cosine.mean()) if len(cosine) else 1.0,
+        "max_abs_diff": float(np.abs(expected - actual).max()) if len(cosine) else 0.0
+    }
+
+
+def build_tiny_bert(words: List[str], hidden_size: int = 128, num_layers: int = 2, seed: int = 0):
+    """A small randomly initialised BERT and character tokenizer, for tests and benchmarks without a download"""
+    from transformers import BertConfig, BertModel, BertTokenizer
+
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += sorted({ch for word in words for ch in word} - set(vocab))
+    vocab_file = os.path.join(tempfile.mkdtemp(), "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab))
+
+    config = BertConfig(vocab_size=len(vocab), hidden_size=hidden_size, num_hidden_layers=num_layers,
+                        num_attention_heads=2, intermediate_size=hidden_size * 2, max_position_embeddings=512)
+    torch.manual_seed(seed)
+    tokenizer = BertTokenizer(vocab_file, do_lower_case=False, tokenize_chinese_chars=False)
+    return BertModel(config).eval(), tokenizer
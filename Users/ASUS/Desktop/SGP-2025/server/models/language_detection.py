@@ -0,0 +1,94 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Unicode ranges [start, end) of the scripts written in the supported Tesseract languages.
+# Script names match the ones Tesseract's orientation and script detection (OSD) reports.
+SCRIPT_RANGES = (
+    (0x0041, 0x005B, 'Latin'),
+    (0x0061, 0x007B, 'Latin'),
+    (0x00C0, 0x0250, 'Latin'),
+    (0x0900, 0x0980, 'Devanagari'),
+    (0x0980, 0x0A00, 'Bengali'),
+    (0x0A00, 0x0A80, 'Gurmukhi'),
+    (0x0A80, 0x0B00, 'Gujarati'),
+    (0x0B00, 0x0B80, 'Oriya'),
+    (0x0B80, 0x0C00, 'Tamil'),
+    (0x0C00, 0x0C80, 'Telugu'),
+    (0x0C80, 0x0D00, 'Kannada'),
+    (0x0D00, 0x0D80, 'Malayalam'),
+)
+
+# Tesseract language of each script (Devanagari is Hindi unless it looks like Marathi)
+SCRIPT_LANGUAGES = {
+    'Latin': 'eng',
+    'Devanagari': 'hin',
+    'Bengali': 'ben',
+    'Gurmukhi': 'pan',
+    'Gujarati': 'guj',
+    'Oriya': 'ori',
+    'Tamil': 'tam',
+    'Telugu': 'tel',
+    'Kannada': 'kan',
+    'Malayalam': 'mal',
+}
+
+# A script must make up this share of the letters for its language to be OCR'd
+MIN_SCRIPT_SHARE = 0.1
+# Fewer letters than this are too few to tell the language from
+MIN_SCRIPT_LETTERS = 20
+# Marathi writes the retroflex 'ळ' (U+0933) routinely; Hindi practically never does
+MARATHI_MARKER = 0x0933
+MIN_MARATHI_MARKER_SHARE = 0.003
+
+SCRIPTS = tuple(dict.fromkeys(script for _, _, script in SCRIPT_RANGES))
+
+# Sorted range boundaries: a code point's insertion index is odd inside a range, even in a gap
+_EDGES = np.array([bound for start, end, _ in SCRIPT_RANGES for bound in (start, end)], dtype=np.uint32)
+_RANGE_SCRIPT = np.array([SCRIPTS.index(script) for _, _, script in SCRIPT_RANGES], dtype=np.intp)
+
+
+def codepoints(text: str) -> np.ndarray:
+    """Code points of a string as a uint32 array (no per-character Python loop)"""
+    return np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+
+
+def _script_counts(points: np.ndarray) -> Dict[str, int]:
+    index = np.searchsorted(_EDGES, points, side='right')
+    inside = (index & 1) == 1
+    counts = np.bincount(_RANGE_SCRIPT[index[inside] >> 1], minlength=len(SCRIPTS))
+    return {script: int(count) for script, count in zip(SCRIPTS, counts) if count}
+
+
+def script_histogram(text: str) -> Dict[str, int]:
+    """Letters of each script in the text (scripts without letters left out)"""
+    return _script_counts(codepoints(text)) if text else {}
+
+
+def script_language(script: str, marathi_marker_share: float = 0.0) -> Optional[str]:
+    """Tesseract language for a script name (None if no supported language uses it)"""
+    language = SCRIPT_LANGUAGES.get(script)
+    if language == 'hin' and marathi_marker_share >= MIN_MARATHI_MARKER_SHARE:
+        return 'mar'
+    return language
+
+
+def detect_languages(text: str, supported: Iterable[str] = None,
+                     min_share: float = MIN_SCRIPT_SHARE) -> List[str]:
+    """Languages of the scripts making up at least min_share of the letters, most used first ([] if too few letters)"""
+    if not text:
+        return []
+    points = codepoints(text)
+    counts = _script_counts(points)
+    total = sum(counts.values())
+    if total < MIN_SCRIPT_LETTERS:
+        return []
+    marathi_marker_share = (np.count_nonzero(points == MARATHI_MARKER) / counts['Devanagari']
+                            if 'Devanagari' in counts else 0.0)
+    supported = set(supported) if supported is not None else None
+    languages = []
+    for script, count in sorted(counts.items(), key=lambda item: -item[1]):
+        language = script_language(script, marathi_marker_share)
+        if count / total >= min_share and language and (supported is None or language in supported):
+            languages.append(language)
+    return languages
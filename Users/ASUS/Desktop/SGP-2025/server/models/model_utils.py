@@ -4,50 +4,125 @@ except Exception:
     torch = None
 from transformers import AutoTokenizer, AutoModel
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import PyPDF2
 import os
-from typing import List, Dict, Any, Tuple
+import threading
+import time
+import unicodedata
+from typing import List, Dict, Any, Tuple, Optional, Callable
+from concurrent.futures import Executor
 import asyncio
 
+from models.backends import create_backend
+from search.lru_cache import LRUCache
+from search.normalization import normalize_query
+from search.quantized_store import QuantizedEmbeddings, top_k_indices
+
+# A failed model load is not retried for this long (offline, each attempt waits out the hub timeouts)
+MODEL_RETRY_INTERVAL = 600
+
 class IndicBERTModel:
-    def __init__(self):
+    def __init__(self, document_store=None, suffix_arrays=None, embedding_cache=None, vector_index=None,
+                 batch_size: int = 16, query_cache_size: int = 1024, result_cache_size: int = 512,
+                 backend: str = "eager", num_threads: int = None, executor: Executor = None):
         """Initialize IndicBERT model for text processing"""
         self.model_name = "ai4bharat/indic-bert"
+        # Texts per forward pass; batches are built from texts of similar token length
+        self.batch_size = max(1, batch_size)
+        # Page text written at upload time (see storage.document_store.DocumentStore)
+        self.document_store = document_store
+        # Per-document substring indexes (see search.suffix_array.SuffixArrayCache)
+        self.suffix_arrays = suffix_arrays
+        # Page embeddings persisted per document and model (see storage.embedding_cache.EmbeddingCache)
+        self.embedding_cache = embedding_cache
+        # Corpus-wide ANN index over page embeddings (see search.vector_index.VectorIndex)
+        self.vector_index = vector_index
+        # Repeated queries skip the forward pass (keyed by NFC query) and the rescoring
+        # (keyed by document hash, normalized query and search type)
+        self.query_cache = LRUCache(query_cache_size)
+        self.result_cache = LRUCache(result_cache_size)
         self.tokenizer = None
         self.model = None
         # Use CPU device if torch is available; otherwise keep as string placeholder
         self.device = (torch.device("cuda" if torch and torch.cuda.is_available() else "cpu")
                        if torch else "cpu")
+        # Inference backend ('eager' or dynamically quantized 'int8', see models.backends)
+        self.backend = create_backend(backend, num_threads, self.device)
+        # Cached embeddings from different backends are not interchangeable
+        self.embedding_key = self.model_name if backend == "eager" else f"{self.model_name}+{backend}"
+        # Bounded thread pool the async methods run inference on (None = the event loop's default)
+        self.executor = executor
         self.model_loaded = False
+        # 'not_loaded', 'loading', 'warming_up', 'ready' or 'failed' (reported by /ready)
+        self.load_state = "not_loaded"
+        # Concurrent first requests must not load the model twice
+        self._load_lock = threading.Lock()
+        self._load_failed_at: Optional[float] = None
+        # Called once the model is loaded (e.g. to index documents uploaded before that)
+        self._load_listeners: List[Callable[[], None]] = []
         # Don't load model immediately - load it when needed
-        print("IndicBERT model initialized (will load on first use)")
+        print(f"IndicBERT model initialized (will load on first use, backend: {backend})")
     
     def _load_model(self):
         """Load the IndicBERT model and tokenizer"""
         if self.model_loaded:
             return True
+        
+        with self._load_lock:
+            # Another thread may have finished loading while we waited
+            if self.model_loaded:
+                return True
+            # Remember a failure instead of paying for it on every request
+            if self._load_failed_at is not None and time.monotonic() - self._load_failed_at < MODEL_RETRY_INTERVAL:
+                return False
             
+            try:
+                if not torch:
+                    raise RuntimeError("PyTorch not available; running in fallback mode")
+                print("Loading IndicBERT model...")
+                self.load_state = "loading"
+                tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                model = AutoModel.from_pretrained(self.model_name)
+                self.use_model(model, tokenizer)
+                print("IndicBERT model loaded successfully!")
+                return True
+            except Exception as e:
+                print(f"Error loading model: {e}")
+                print("Falling back to simple text search mode")
+                # Fallback to a simpler approach
+                self.model = None
+                self.tokenizer = None
+                self.model_loaded = False
+                self.load_state = "failed"
+                self._load_failed_at = time.monotonic()
+                return False
+    
+    def warm_up(self) -> bool:
+        """Load the model and run one dummy forward pass so the first real request is fast"""
+        if not self._load_model():
+            return False
+        self.load_state = "warming_up"
         try:
-            if not torch:
-                raise RuntimeError("PyTorch not available; running in fallback mode")
-            print("Loading IndicBERT model...")
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModel.from_pretrained(self.model_name)
-            if torch:
-                self.model.to(self.device)
-            self.model.eval()
-            self.model_loaded = True
-            print("IndicBERT model loaded successfully!")
-            return True
+            self.backend.embed(["ગુજરાતી warm-up"], 1)
         except Exception as e:
-            print(f"Error loading model: {e}")
-            print("Falling back to simple text search mode")
-            # Fallback to a simpler approach
-            self.model = None
-            self.tokenizer = None
-            self.model_loaded = False
-            return False
+            print(f"Error during model warm-up: {e}")
+        self.load_state = "ready"
+        return True
+    
+    def use_model(self, model, tokenizer) -> None:
+        """Run inference with an already loaded model and tokenizer through the configured backend"""
+        self.backend.load(model, tokenizer)
+        self.model = self.backend.model
+        self.tokenizer = tokenizer
+        self.model_loaded = True
+        self.load_state = "ready"
+        self._load_failed_at = None
+        for listener in self._load_listeners:
+            listener()
+    
+    def add_load_listener(self, listener: Callable[[], None]) -> None:
+        """Call listener() whenever a model has been loaded"""
+        self._load_listeners.append(listener)
     
     def extract_text_from_pdf(self, pdf_path: str) -> List[str]:
         """Extract text from PDF pages"""
@@ -66,103 +141,208 @@ class IndicBERTModel:
             print(f"Error extracting text from PDF: {e}")
         return text_pages
     
-    def get_embeddings(self, texts: List[str]) -> np.ndarray:
-        """Get embeddings for a list of texts"""
+    def get_text_pages(self, pdf_path: str) -> List[Dict[str, Any]]:
+        """Get page text from the document store, extracting from the PDF only if it was never ingested"""
+        if self.document_store is not None:
+            pages = self.document_store.get_pages(pdf_path)
+            if pages is not None:
+                return pages
+        return self.extract_text_from_pdf(pdf_path)
+    
+    def get_embeddings(self, texts: List[str], batch_size: int = None) -> np.ndarray:
+        """Get embeddings for a list of texts (length-bucketed batches, mean-pooled over the attention mask)"""
         # If model is not loaded or torch is unavailable, fallback to dummy embeddings
         if not self.model_loaded or not torch or self.model is None or self.tokenizer is None:
             if not self._load_model():
                 # Fallback: return simple TF-IDF like features
                 return np.random.rand(len(texts), 768)  # Dummy embeddings
         
-        embeddings = []
-        for text in texts:
+        return self.backend.embed(texts, max(1, batch_size or self.batch_size))
+    
+    def get_query_embedding(self, query: str) -> np.ndarray:
+        """Get the embedding of a query, reusing it for repeated queries"""
+        key = (self.embedding_key, unicodedata.normalize('NFC', query))
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        embedding = self.get_embeddings([key[1]])[0]
+        # Never cache the random fallback embeddings
+        if self.model_loaded:
+            self.query_cache.put(key, embedding)
+        return embedding
+    
+    def _result_cache_key(self, pdf_path: str, query: str, search_type: str) -> Optional[Tuple[str, str, str]]:
+        if self.document_store is None:
+            return None
+        doc_hash = self.document_store.resolve_hash(pdf_path)
+        if doc_hash is None:
+            return None
+        return (doc_hash, query, search_type)
+    
+    def _cached_search(self, pdf_path: str, query: str, search_type: str,
+                       search: Callable[[str, str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Serve a per-document search from the result cache, running it on a miss"""
+        # Search with the query the result is cached under, so equal keys always mean equal results
+        query = normalize_query(query)
+        key = self._result_cache_key(pdf_path, query, search_type)
+        if key is not None:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        results = search(pdf_path, query)
+        # Semantic results computed with fallback embeddings are random; don't keep them
+        if key is not None and (search_type != "semantic" or self.model_loaded):
+            self.result_cache.put(key, results)
+        return results
+    
+    def invalidate_document(self, doc_hash: str) -> int:
+        """Drop cached search results for a document (its file was replaced or backed up)"""
+        return self.result_cache.invalidate(lambda key: key[0] == doc_hash)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the query embedding and search result caches"""
+        return {
+            "query_embeddings": self.query_cache.stats(),
+            "search_results": self.result_cache.stats()
+        }
+    
+    def get_page_embeddings(self, pdf_path: str, page_texts: List[str]) -> QuantizedEmbeddings:
+        """Get (normalised, compact) page embeddings from the cache, computing and persisting them on first use"""
+        doc_hash = None
+        if self.embedding_cache is not None and self.document_store is not None:
+            doc_hash = self.document_store.resolve_hash(pdf_path)
+            if doc_hash is not None:
+                cached = self.embedding_cache.get(doc_hash, self.embedding_key)
+                if cached is not None and len(cached) == len(page_texts):
+                    return cached
+        
+        page_embeddings = self.get_embeddings(page_texts)
+        
+        # Never cache the random fallback embeddings
+        if doc_hash is not None and self.model_loaded:
             try:
-                inputs = self.tokenizer(
-                    text, 
-                    return_tensors="pt", 
-                    max_length=512, 
-                    truncation=True, 
-                    padding=True
-                )
-                if torch:
-                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                    with torch.no_grad():
-                        outputs = self.model(**inputs)
-                        # Use mean pooling
-                        embedding = outputs.last_hidden_state.mean(dim=1).cpu().numpy()
-                        embeddings.append(embedding.flatten())
-                else:
-                    # Fallback when torch is unavailable
-                    embeddings.append(np.random.rand(768))
+                return self.embedding_cache.put(doc_hash, self.embedding_key, page_embeddings)
             except Exception as e:
-                print(f"Error getting embedding: {e}")
-                # Add zero embedding as fallback
-                embeddings.append(np.zeros(768))
+                print(f"Error caching page embeddings: {e}")
+        return QuantizedEmbeddings.from_embeddings(page_embeddings, 'float32')
+    
+    def index_document_embeddings(self, pdf_path: str) -> bool:
+        """Add an uploaded document's page embeddings to the corpus vector index (False if the index is unchanged)"""
+        if self.vector_index is None or self.document_store is None:
+            return False
+        doc_hash = self.document_store.resolve_hash(pdf_path)
+        text_pages = self.get_text_pages(pdf_path)
+        if doc_hash is None:
+            return False
         
-        return np.array(embeddings)
+        page_numbers = [page['page'] for page in text_pages]
+        embeddings = None
+        if not self.vector_index.contains(doc_hash) and text_pages:
+            # Never triggers a model load; documents are indexed once a load listener reports the model
+            # (random fallback embeddings would only pollute the index)
+            if not self.model_loaded:
+                return False
+            embeddings = self.get_page_embeddings(pdf_path, [page['text'] for page in text_pages]).dequantize()
+        self.vector_index.add_document(doc_hash, os.path.basename(pdf_path), page_numbers, embeddings)
+        return True
+    
+    def search_corpus_semantic(self, query: str, top_k: int = 10) -> Dict[str, Any]:
+        """Semantic top-k pages across every indexed document"""
+        if self.vector_index is None:
+            return {"results": [], "message": "Vector index not available", "query": query}
+        
+        query_embedding = self.get_query_embedding(query)
+        if not self.model_loaded:
+            return {"results": [], "message": "Model not available", "query": query}
+        
+        results = []
+        for hit in self.vector_index.search(query_embedding, k=top_k):
+            document = self.document_store.get(hit['doc_hash']) if self.document_store else None
+            page_text = next((page['text'] for page in document['pages'] if page['page'] == hit['page']), "") if document else ""
+            hit['text'] = page_text[:300] + "..." if len(page_text) > 300 else page_text
+            hit['has_exact_match'] = False
+            results.append(hit)
+        
+        return {
+            "results": results,
+            "query": query,
+            "search_type": "semantic"
+        }
+    
+    async def run_in_executor(self, func: Callable, *args):
+        """Run blocking search/inference work on the inference thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
     
     async def search_text(self, pdf_path: str, query: str) -> Dict[str, Any]:
         """Search for text in PDF using semantic similarity (async version)"""
-        return self.search_text_sync(pdf_path, query)
+        return await self.run_in_executor(self.search_text_sync, pdf_path, query)
     
     def search_text_sync(self, pdf_path: str, query: str) -> Dict[str, Any]:
         """Search for text in PDF using hybrid semantic + exact text matching"""
-        # Extract text from PDF
-        text_pages = self.extract_text_from_pdf(pdf_path)
+        return self._cached_search(pdf_path, query, "semantic", self._search_text_uncached)
+    
+    def _search_text_uncached(self, pdf_path: str, query: str) -> Dict[str, Any]:
+        # Get page text (stored at upload, including OCR output)
+        text_pages = self.get_text_pages(pdf_path)
         
         if not text_pages:
             return {"results": [], "message": "No text found in PDF", "total_pages": 0, "query": query}
         
-        # Get embeddings for all pages
+        # Get embeddings for all pages (cached per document after the first search)
         page_texts = [page['text'] for page in text_pages]
-        page_embeddings = self.get_embeddings(page_texts)
+        page_embeddings = self.get_page_embeddings(pdf_path, page_texts)
         
         # Get embedding for query
-        query_embedding = self.get_embeddings([query])
+        query_embedding = self.get_query_embedding(query)
         
-        # Calculate similarities
-        similarities = cosine_similarity(query_embedding, page_embeddings)[0]
+        # Cosine similarities in one matrix-vector product over the normalised page embeddings
+        similarities = page_embeddings.scores(query_embedding)
+        
+        # Rank pages above the relevance threshold, exact matches first (scores are within [-1, 1])
+        query_lower = query.lower()
+        has_exact = np.array([query_lower in page['text'].lower() for page in text_pages])
+        priority = np.where(similarities > 0.1, similarities + 2.0 * has_exact, -np.inf)
+        top, top_priority = top_k_indices(priority, 10)
         
-        # Sort results by similarity
         results = []
-        for i, (page, similarity) in enumerate(zip(text_pages, similarities)):
-            if similarity > 0.1:  # Threshold for relevance
-                # Find the best matching text snippet around the query
-                page_text = page['text']
-                query_lower = query.lower()
-                page_text_lower = page_text.lower()
-                
-                # Try to find exact or partial matches
-                match_start = page_text_lower.find(query_lower)
-                if match_start != -1:
-                    # Found exact match, extract context around it
-                    context_start = max(0, match_start - 100)
-                    context_end = min(len(page_text), match_start + len(query) + 100)
-                    context_text = page_text[context_start:context_end]
-                    
-                    # Add ellipsis if we're not at the beginning/end
-                    if context_start > 0:
-                        context_text = "..." + context_text
-                    if context_end < len(page_text):
-                        context_text = context_text + "..."
-                else:
-                    # No exact match, use the beginning of the text
-                    context_text = page_text[:300] + "..." if len(page_text) > 300 else page_text
+        for i in top[np.isfinite(top_priority)]:
+            page = text_pages[i]
+            similarity = similarities[i]
+            # Find the best matching text snippet around the query
+            page_text = page['text']
+            page_text_lower = page_text.lower()
+            
+            # Try to find exact or partial matches
+            match_start = page_text_lower.find(query_lower)
+            if match_start != -1:
+                # Found exact match, extract context around it
+                context_start = max(0, match_start - 100)
+                context_end = min(len(page_text), match_start + len(query) + 100)
+                context_text = page_text[context_start:context_end]
                 
-                results.append({
-                    'page': page['page'],
-                    'text': context_text,
-                    'score': float(similarity),
-                    'full_text': page['text'],
-                    'match_position': match_start if match_start != -1 else -1,
-                    'has_exact_match': match_start != -1
-                })
-        
-        # Sort by similarity score, but prioritize exact matches
-        results.sort(key=lambda x: (not x['has_exact_match'], -x['score']))
+                # Add ellipsis if we're not at the beginning/end
+                if context_start > 0:
+                    context_text = "..." + context_text
+                if context_end < len(page_text):
+                    context_text = context_text + "..."
+            else:
+                # No exact match, use the beginning of the text
+                context_text = page_text[:300] + "..." if len(page_text) > 300 else page_text
+            
+            results.append({
+                'page': page['page'],
+                'text': context_text,
+                'score': float(similarity),
+                'full_text': page['text'],
+                'match_position': match_start if match_start != -1 else -1,
+                'has_exact_match': match_start != -1
+            })
         
         return {
-            "results": results[:10],  # Return top 10 results
+            "results": results,  # Top 10 results
             "total_pages": len(text_pages),
             "query": query
         }
@@ -212,20 +392,42 @@ class IndicBERTModel:
 
         return matches
 
+    def locate_exact_matches(self, pdf_path: str, text_pages: List[Dict[str, Any]], query: str):
+        """Locate the query in every page using the document's suffix array (None if unavailable)"""
+        if self.suffix_arrays is None or self.document_store is None:
+            return None
+        doc_hash = self.document_store.resolve_hash(pdf_path)
+        if doc_hash is None or not self.document_store.contains(doc_hash):
+            return None
+        suffix_array = self.suffix_arrays.get(doc_hash, text_pages)
+        return suffix_array.locate(query) if suffix_array is not None else None
+
     def search_with_exact_matching(self, pdf_path: str, query: str) -> Dict[str, Any]:
         """Search for text in PDF with exact text matching for highlighting"""
-        # Extract text from PDF
-        text_pages = self.extract_text_from_pdf(pdf_path)
+        return self._cached_search(pdf_path, query, "exact_match", self._search_with_exact_matching_uncached)
+    
+    def _search_with_exact_matching_uncached(self, pdf_path: str, query: str) -> Dict[str, Any]:
+        # Get page text (stored at upload, including OCR output)
+        text_pages = self.get_text_pages(pdf_path)
         
         if not text_pages:
             return {"results": [], "message": "No text found in PDF", "total_pages": 0, "query": query}
         
+        # Suffix array lookup when the document was ingested, regex scan otherwise
+        page_matches = self.locate_exact_matches(pdf_path, text_pages, query)
+        
         results = []
         for page in text_pages:
             page_text = page['text']
             
             # Find exact matches
-            exact_matches = self.find_exact_matches(page_text, query)
+            if page_matches is not None:
+                exact_matches = [
+                    {'position': start, 'length': end - start, 'text': page_text[start:end], 'query': query}
+                    for start, end in page_matches.get(page['page'], [])
+                ]
+            else:
+                exact_matches = self.find_exact_matches(page_text, query)
             
             if exact_matches:
                 # Calculate a simple relevance score based on match frequency
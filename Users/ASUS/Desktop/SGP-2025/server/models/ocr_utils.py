@@ -1,24 +1,284 @@
 import pytesseract
 from PIL import Image
 import fitz  # PyMuPDF
+import importlib.util
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple, Union
+from contextlib import contextmanager
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing
+import shutil
+import subprocess
+import tempfile
+import threading
 import numpy as np
-import io
 
-# Import EasyOCR for better Indic language support
-# Note: Catch any exception (not just ImportError) to avoid crashing on
-# mismatched torch/torchvision/safetensors installations during import.
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
+from models.language_detection import detect_languages, script_language
+from models.preprocessing import PreparedPage, upscaled_size
+from storage.ocr_cache import OCRCache, compute_image_hash
+
+# EasyOCR for better Indic language support, imported only when a page first falls back to it:
+# it pulls in torch, which ingestion and page workers otherwise never need
+EASYOCR_AVAILABLE = importlib.util.find_spec('easyocr') is not None
+if EASYOCR_AVAILABLE:
     print("✅ EasyOCR available for enhanced OCR")
-except Exception:
-    EASYOCR_AVAILABLE = False
+else:
     print("⚠️  EasyOCR not available, using Tesseract only")
 
+# Optional in-process Tesseract binding: no process spawn or traineddata reload per image
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except Exception:
+    TESSEROCR_AVAILABLE = False
+
+# Preprocessing variants tried by the OCR plan
+OCR_VARIANTS = ('standard', 'high_contrast', 'inverted')
+
+# Stop trying further OCR attempts once a page reaches this mean word confidence (0-1)
+OCR_CONFIDENCE_THRESHOLD = 0.85
+
+# Cache key of the EasyOCR fallback (its reader is always built for these languages)
+EASYOCR_CONFIG = 'easyocr -l gu+en'
+
+# Orientation and script detection (OSD) picks the language of pages without a text layer.
+# It only needs the shapes of the glyphs, so pages are rendered at a low resolution for it.
+OSD_DPI = 150
+OSD_CONFIG = f'--oem 3 --psm 0 -l osd --dpi {OSD_DPI}'
+# Scripts detected with less confidence than this are ignored
+MIN_OSD_SCRIPT_CONFIDENCE = 1.0
+
+# Languages OCR'd when neither a text layer nor script detection tells (the Gujarati+English corpus)
+DEFAULT_OCR_LANGUAGES = ('guj', 'eng')
+
+# Common OCR mistakes for Gujarati, fixed by clean_ocr_text (always one character for another)
+OCR_CHAR_REPLACEMENTS = {
+    '|': '।',  # Fix vertical bar to Gujarati danda
+    '॥': '॥',  # Fix double danda
+    '0': '૦',  # Fix English 0 to Gujarati 0
+    '1': '૧',  # Fix English 1 to Gujarati 1
+    '2': '૨',  # Fix English 2 to Gujarati 2
+    '3': '૩',  # Fix English 3 to Gujarati 3
+    '4': '૪',  # Fix English 4 to Gujarati 4
+    '5': '૫',  # Fix English 5 to Gujarati 5
+    '6': '૬',  # Fix English 6 to Gujarati 6
+    '7': '૭',  # Fix English 7 to Gujarati 7
+    '8': '૮',  # Fix English 8 to Gujarati 8
+    '9': '૯',  # Fix English 9 to Gujarati 9
+    '¥': 'ય',  # Fix common OCR mistake
+    '¢': 'ચ',  # Fix common OCR mistake
+    '£': 'ળ',  # Fix common OCR mistake
+    '§': 'સ',  # Fix common OCR mistake
+    '©': 'ગ',  # Fix common OCR mistake
+    '®': 'ર',  # Fix common OCR mistake
+    '°': 'દ',  # Fix common OCR mistake
+    '±': 'પ',  # Fix common OCR mistake
+    '²': 'બ',  # Fix common OCR mistake
+    '³': 'ભ',  # Fix common OCR mistake
+    '´': 'મ',  # Fix common OCR mistake
+    'µ': 'ન',  # Fix common OCR mistake
+    '¶': 'વ',  # Fix common OCR mistake
+    '·': 'શ',  # Fix common OCR mistake
+    '¸': 'ષ',  # Fix common OCR mistake
+    '¹': 'હ',  # Fix common OCR mistake
+    'º': 'જ',  # Fix common OCR mistake
+    '»': 'ઝ',  # Fix common OCR mistake
+    '¼': 'ઞ',  # Fix common OCR mistake
+    '½': 'ટ',  # Fix common OCR mistake
+    '¾': 'ઠ',  # Fix common OCR mistake
+    '¿': 'ડ',  # Fix common OCR mistake
+}
+OCR_CHAR_TRANSLATION = str.maketrans(OCR_CHAR_REPLACEMENTS)
+
+# A recognized word and its box relative to the page image: (text, x0, y0, x1, y1), coordinates in 0-1
+OCRWord = Tuple[str, float, float, float, float]
+
+# Columns of pytesseract's image_to_data dict that the engine fills in for every word
+TESSERACT_DATA_COLUMNS = ('page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                          'left', 'top', 'width', 'height', 'conf', 'text')
+
+
+def parse_tesseract_config(config: str) -> Dict[str, str]:
+    """Split a CLI config like '--oem 1 --psm 6 -l guj+eng --dpi 300' into its options"""
+    options = {}
+    parts = config.split()
+    for i in range(0, len(parts) - 1):
+        if parts[i] in ('--oem', '--psm', '-l', '--dpi'):
+            options[parts[i].lstrip('-')] = parts[i + 1]
+    return options
+
+
+class TesseractEngine:
+    def __init__(self, mode: str = 'auto'):
+        """Run Tesseract on batches of images ('tesserocr' in process, 'batch' CLI list file, or 'per_call')"""
+        if mode == 'auto':
+            mode = 'tesserocr' if TESSEROCR_AVAILABLE else 'batch'
+        if mode not in ('tesserocr', 'batch', 'per_call'):
+            raise ValueError(f"Unknown Tesseract engine mode '{mode}'")
+        if mode == 'tesserocr' and not TESSEROCR_AVAILABLE:
+            raise ValueError("tesserocr is not installed")
+        self.mode = mode
+        # tesserocr APIs are not thread-safe: one per thread and (language, psm, oem)
+        self._local = threading.local()
+    
+    def recognize(self, images: List[Image.Image], config: str) -> List[Dict[str, List[Any]]]:
+        """image_to_data-style word dicts, one per image"""
+        if not images:
+            return []
+        if self.mode == 'tesserocr':
+            return [self._recognize_in_process(image, config) for image in images]
+        if self.mode == 'per_call' or len(images) == 1:
+            return [pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+                    for image in images]
+        return self._recognize_batch(images, config)
+    
+    def _api(self, options: Dict[str, str]):
+        apis = getattr(self._local, 'apis', None)
+        if apis is None:
+            apis = self._local.apis = {}
+        key = (options.get('l', 'eng'), options.get('psm', '3'), options.get('oem', '1'))
+        if key not in apis:
+            # Loading the traineddata is the expensive part, so each API is kept for reuse
+            apis[key] = tesserocr.PyTessBaseAPI(lang=key[0], psm=int(key[1]), oem=int(key[2]))
+        return apis[key]
+    
+    def detect_script(self, image: Image.Image, config: str = OSD_CONFIG) -> Dict[str, Any]:
+        """Script of the text in an image from Tesseract OSD: {'script': name, 'script_conf': confidence}"""
+        options = parse_tesseract_config(config)
+        if self.mode == 'tesserocr':
+            api = self._api(options)
+            api.SetImage(image)
+            api.SetSourceResolution(int(options.get('dpi', OSD_DPI)))
+            result = api.DetectOrientationScript()
+            if not result:
+                return {}
+            return {'script': result['script_name'], 'script_conf': result['script_conf']}
+        osd = pytesseract.image_to_osd(image, config=f"--oem {options.get('oem', '3')} --dpi {options.get('dpi', OSD_DPI)}",
+                                       output_type=pytesseract.Output.DICT)
+        return {'script': osd.get('script'), 'script_conf': osd.get('script_conf', 0.0)}
+    
+    def _recognize_in_process(self, image: Image.Image, config: str) -> Dict[str, List[Any]]:
+        options = parse_tesseract_config(config)
+        api = self._api(options)
+        api.SetImage(image)
+        if 'dpi' in options:
+            api.SetSourceResolution(int(options['dpi']))
+        api.Recognize()
+        
+        data = {column: [] for column in TESSERACT_DATA_COLUMNS}
+        level = tesserocr.RIL.WORD
+        block_num = par_num = line_num = word_num = 0
+        iterator = api.GetIterator()
+        if iterator is None or iterator.Empty(level):
+            return data
+        while True:
+            if iterator.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block_num, par_num = block_num + 1, 0
+            if iterator.IsAtBeginningOf(tesserocr.RIL.PARA):
+                par_num, line_num = par_num + 1, 0
+            if iterator.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                line_num, word_num = line_num + 1, 0
+            word_num += 1
+            left, top, right, bottom = iterator.BoundingBox(level)
+            for column, value in zip(TESSERACT_DATA_COLUMNS, (
+                    1, block_num, par_num, line_num, word_num, left, top, right - left, bottom - top,
+                    iterator.Confidence(level), iterator.GetUTF8Text(level) or '')):
+                data[column].append(value)
+            if not iterator.Next(level):
+                break
+        return data
+    
+    def _recognize_batch(self, images: List[Image.Image], config: str) -> List[Dict[str, List[Any]]]:
+        """One tesseract process for all images: a list file in, one TSV out, split by page_num"""
+        work_dir = tempfile.mkdtemp(prefix='ocr_batch_')
+        try:
+            paths = []
+            for i, image in enumerate(images):
+                # Uncompressed PGM/PPM: far cheaper to write and read than PNG
+                path = os.path.join(work_dir, f"{i:05d}.{'pgm' if image.mode == 'L' else 'ppm'}")
+                (image if image.mode in ('L', 'RGB') else image.convert('RGB')).save(path, format='PPM')
+                paths.append(path)
+            list_path = os.path.join(work_dir, 'images.txt')
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(paths) + '\n')
+            
+            output_base = os.path.join(work_dir, 'output')
+            command = [pytesseract.pytesseract.tesseract_cmd, list_path, output_base] + config.split() + ['tsv']
+            completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if completed.returncode != 0:
+                raise RuntimeError(completed.stderr.decode('utf-8', 'replace').strip() or 'tesseract failed')
+            
+            results = [{column: [] for column in TESSERACT_DATA_COLUMNS} for _ in images]
+            with open(f"{output_base}.tsv", 'r', encoding='utf-8') as f:
+                header = f.readline().rstrip('\n').split('\t')
+                for line in f:
+                    row = dict(zip(header, line.rstrip('\n').split('\t')))
+                    # Each listed image is one page of the output
+                    page_index = int(row['page_num']) - 1
+                    if 0 <= page_index < len(results):
+                        data = results[page_index]
+                        for column in TESSERACT_DATA_COLUMNS:
+                            value = row.get(column, '')
+                            if column == 'conf':
+                                data[column].append(float(value or -1))
+                            elif column == 'text':
+                                data[column].append(value)
+                            else:
+                                data[column].append(int(value or 0))
+            return results
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# OCR processor of a page worker process, created by the pool initializer
+_page_worker = None
+
+def _init_page_worker(omp_thread_limit: int, cache_dir: str = None, cache_max_bytes: int = 0):
+    """Page pool initializer: cap Tesseract's OpenMP threads so parallel pages don't oversubscribe cores"""
+    global _page_worker
+    os.environ['OMP_THREAD_LIMIT'] = str(omp_thread_limit)
+    cache = OCRCache(cache_dir, cache_max_bytes) if cache_dir else None
+    _page_worker = OCRProcessor(cache=cache)
+
+def _ocr_shared_pages(pages: List[Tuple[str, str, Tuple[int, int], int]], languages: Optional[List[str]],
+                      fallback_languages: List[str]) -> List[Tuple[str, float, List[OCRWord], List[str]]]:
+    """OCR a chunk of rendered pages read from shared memory, batched per engine call (in a page worker process);
+    languages=None detects each page's languages on its image first (fallback_languages if undecided)"""
+    images = []
+    for shm_name, mode, size, stride in pages:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            pixels = bytes(shm.buf[:stride * size[1]])
+        finally:
+            shm.close()
+        images.append(Image.frombuffer(mode, size, pixels, 'raw', mode, stride, 1))
+    try:
+        if languages is None:
+            page_languages = [_page_worker.detect_image_languages(image) or fallback_languages for image in images]
+        else:
+            page_languages = [languages] * len(images)
+        return _page_worker.ocr_images_by_languages(images, page_languages)
+    except Exception as e:
+        print(f"Error in advanced OCR: {e}")
+        return [("", 0.0, [], languages or fallback_languages)] * len(images)
+
+@contextmanager
+def open_pdf(pdf: Union[str, "fitz.Document"]) -> Iterator["fitz.Document"]:
+    """Open a PDF by path, or pass through a document the caller already has open (and will close)"""
+    if isinstance(pdf, fitz.Document):
+        yield pdf
+        return
+    doc = fitz.open(pdf)
+    try:
+        yield doc
+    finally:
+        doc.close()
+
 class OCRProcessor:
-    def __init__(self):
+    def __init__(self, page_workers: int = 1, load_easyocr: bool = False, batch_size: int = 8,
+                 engine: TesseractEngine = None, cache: OCRCache = None, omp_thread_limit: int = None):
         """Initialize OCR processor for scanned PDFs"""
         # Configure Tesseract path for Windows
         if os.name == 'nt':  # Windows
@@ -55,225 +315,295 @@ class OCRProcessor:
                 print("   OCR functionality will not work")
                 print("   Please install Tesseract from: https://github.com/UB-Mannheim/tesseract/wiki")
         
-        # Initialize EasyOCR if available
+        # EasyOCR is loaded on the first page that falls back to it, unless asked for up front
         self.easyocr_reader = None
-        if EASYOCR_AVAILABLE:
-            try:
-                print("🔄 Initializing EasyOCR for Gujarati...")
-                self.easyocr_reader = easyocr.Reader(['gu', 'en'], gpu=False)
-                print("✅ EasyOCR initialized successfully!")
-            except Exception as e:
-                print(f"❌ EasyOCR initialization failed: {e}")
-                self.easyocr_reader = None
+        self._easyocr_loaded = False
+        self._easyocr_lock = threading.Lock()
+        if load_easyocr:
+            self._load_easyocr()
         
         self.supported_languages = ['eng', 'hin', 'tam', 'tel', 'kan', 'mal', 'ben', 'guj', 'mar', 'ori', 'pan']
+        self.engine_status = None
+        
+        # Pages OCR'd in parallel by a process pool (1 = one page at a time in this process)
+        self.page_workers = max(1, page_workers)
+        # OpenMP threads per Tesseract run in a page worker; callers running several processors at once
+        # (one per ingestion worker) pass their share, else the cores are split between the pages
+        self.omp_thread_limit = omp_thread_limit or max(1, (os.cpu_count() or 1) // self.page_workers)
+        # Pages sent to Tesseract together per OCR attempt when running in this process
+        self.batch_size = max(1, batch_size)
+        self.engine = engine or TesseractEngine()
+        # On-disk OCR results shared with the page workers (None = no caching)
+        self.cache = cache
+        self._page_pool = None
+        self._page_pool_lock = threading.Lock()
     
-    def pdf_to_images(self, pdf_path: str) -> List[Image.Image]:
-        """Convert PDF pages to PIL Images"""
-        images = []
+    def _load_easyocr(self):
+        with self._easyocr_lock:
+            if self._easyocr_loaded:
+                return
+            self._easyocr_loaded = True
+            if EASYOCR_AVAILABLE:
+                # Catch any exception (not just ImportError): mismatched torch/torchvision/safetensors
+                # installations fail during import
+                try:
+                    print("🔄 Initializing EasyOCR for Gujarati...")
+                    import easyocr
+                    self.easyocr_reader = easyocr.Reader(['gu', 'en'], gpu=False)
+                    print("✅ EasyOCR initialized successfully!")
+                except Exception as e:
+                    print(f"❌ EasyOCR initialization failed: {e}")
+                    self.easyocr_reader = None
+    
+    def _get_page_pool(self) -> ProcessPoolExecutor:
+        with self._page_pool_lock:
+            if self._page_pool is None:
+                self._page_pool = ProcessPoolExecutor(
+                    max_workers=self.page_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_page_worker,
+                    initargs=(self.omp_thread_limit,
+                              self.cache.cache_dir if self.cache else None,
+                              self.cache.max_bytes if self.cache else 0)
+                )
+            return self._page_pool
+    
+    def close(self):
+        """Shut down the page worker pool"""
+        with self._page_pool_lock:
+            if self._page_pool is not None:
+                self._page_pool.shutdown(wait=False, cancel_futures=True)
+                self._page_pool = None
+    
+    def check_engines(self) -> Dict[str, Any]:
+        """Probe which OCR engines are usable (the result is cached)"""
+        if self.engine_status is not None:
+            return self.engine_status
+        
+        status = {
+            "tesseract": False,
+            "tesseract_version": None,
+            "languages": [],
+            "gujarati": False,
+            # Installed; the reader itself is only loaded when a page needs it
+            "easyocr": self.easyocr_reader is not None or (EASYOCR_AVAILABLE and not self._easyocr_loaded)
+        }
         try:
-            doc = fitz.open(pdf_path)
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better OCR
-                img_data = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_data))
-                images.append(img)
-            doc.close()
+            status["tesseract_version"] = str(pytesseract.get_tesseract_version())
+            status["languages"] = pytesseract.get_languages()
+            status["tesseract"] = True
+            status["gujarati"] = 'guj' in status["languages"]
+        except Exception as e:
+            print(f"⚠️  Tesseract check failed: {e}")
+        self.engine_status = status
+        return status
+    
+    def render_pixmap(self, page, zoom: float = 2.0) -> "fitz.Pixmap":
+        """Render a page straight to an 8-bit grayscale pixmap (OCR never needs color)"""
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    
+    def pixmap_to_image(self, pix) -> Image.Image:
+        """Wrap a pixmap's samples as a PIL image without a PNG encode/decode round-trip"""
+        mode = "L" if pix.n == 1 else "RGB"
+        return Image.frombuffer(mode, (pix.width, pix.height), pix.samples, "raw", mode, pix.stride, 1)
+    
+    def pdf_to_images(self, pdf: Union[str, "fitz.Document"], max_pages: int = None,
+                      page_numbers: List[int] = None) -> Iterator[Image.Image]:
+        """Convert PDF pages (of a path or an open document) to PIL Images, one page at a time"""
+        try:
+            with open_pdf(pdf) as doc:
+                if page_numbers is None:
+                    page_numbers = range(len(doc) if max_pages is None else min(max_pages, len(doc)))
+                for page_num in page_numbers:
+                    # Only the page being processed is held in memory
+                    yield self.pixmap_to_image(self.render_pixmap(doc.load_page(page_num)))  # 2x zoom for better OCR
         except Exception as e:
             print(f"Error converting PDF to images: {e}")
-        return images
     
     def preprocess_image(self, image: Image.Image) -> Image.Image:
         """Preprocess image for better OCR results"""
         try:
-            # Convert to grayscale
-            if image.mode != 'L':
-                image = image.convert('L')
-            
-            # Enhance contrast for better text recognition
-            from PIL import ImageEnhance
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(3.0)  # Increased contrast for better text separation
-            
-            # Enhance sharpness
-            sharpness_enhancer = ImageEnhance.Sharpness(image)
-            image = sharpness_enhancer.enhance(2.0)  # Increased sharpness
-            
-            # Enhance brightness
-            brightness_enhancer = ImageEnhance.Brightness(image)
-            image = brightness_enhancer.enhance(1.2)  # Slightly brighter
-            
-            # Resize if too small (better for OCR)
-            if image.size[0] < 1500 or image.size[1] < 1200:
-                scale_factor = max(1500 / image.size[0], 1200 / image.size[1])
-                new_width = int(image.size[0] * scale_factor)
-                new_height = int(image.size[1] * scale_factor)
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            return image
+            return PreparedPage(image, min_size=(1500, 1200)).variant('basic')
         except Exception as e:
             print(f"Error preprocessing image: {e}")
             return image
     
+    def preprocess_variant(self, image: Image.Image, variant: str) -> Image.Image:
+        """One preprocessing variant for Gujarati OCR ('standard', 'high_contrast', 'inverted', ...)"""
+        return PreparedPage(image).variant(variant)
+    
     def advanced_preprocess_for_gujarati(self, image: Image.Image) -> List[Image.Image]:
         """Advanced preprocessing specifically for Gujarati OCR"""
-        processed_images = []
-        
         try:
-            # Convert to grayscale
-            if image.mode != 'L':
-                image = image.convert('L')
-            
-            # Method 1: Standard preprocessing
-            img1 = image.copy()
-            from PIL import ImageEnhance, ImageFilter
-            
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(img1)
-            img1 = enhancer.enhance(3.5)
-            
-            # Enhance sharpness
-            sharpness_enhancer = ImageEnhance.Sharpness(img1)
-            img1 = sharpness_enhancer.enhance(2.5)
-            
-            # Apply slight blur to reduce noise
-            img1 = img1.filter(ImageFilter.GaussianBlur(radius=0.5))
-            
-            # Resize for better OCR
-            if img1.size[0] < 2000 or img1.size[1] < 1500:
-                scale_factor = max(2000 / img1.size[0], 1500 / img1.size[1])
-                new_width = int(img1.size[0] * scale_factor)
-                new_height = int(img1.size[1] * scale_factor)
-                img1 = img1.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            processed_images.append(img1)
-            
-            # Method 2: High contrast preprocessing
-            img2 = image.copy()
-            
-            # Apply very high contrast
-            enhancer = ImageEnhance.Contrast(img2)
-            img2 = enhancer.enhance(4.0)
-            
-            # Enhance brightness
-            brightness_enhancer = ImageEnhance.Brightness(img2)
-            img2 = brightness_enhancer.enhance(1.3)
-            
-            # Apply edge enhancement
-            img2 = img2.filter(ImageFilter.EDGE_ENHANCE_MORE)
-            
-            # Resize
-            if img2.size[0] < 2000 or img2.size[1] < 1500:
-                scale_factor = max(2000 / img2.size[0], 1500 / img2.size[1])
-                new_width = int(img2.size[0] * scale_factor)
-                new_height = int(img2.size[1] * scale_factor)
-                img2 = img2.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            processed_images.append(img2)
-            
-            # Method 3: Inverted preprocessing (for dark text on light background)
-            img3 = image.copy()
-            
-            # Invert the image
-            img3 = Image.eval(img3, lambda x: 255 - x)
-            
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(img3)
-            img3 = enhancer.enhance(3.0)
-            
-            # Resize
-            if img3.size[0] < 2000 or img3.size[1] < 1500:
-                scale_factor = max(2000 / img3.size[0], 1500 / img3.size[1])
-                new_width = int(img3.size[0] * scale_factor)
-                new_height = int(img3.size[1] * scale_factor)
-                img3 = img3.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            processed_images.append(img3)
-            
+            # Grayscale conversion and resizing happen once for all variants
+            page = PreparedPage(image)
+            return [page.variant(variant) for variant in OCR_VARIANTS]
         except Exception as e:
             print(f"Error in advanced preprocessing: {e}")
-            processed_images.append(image)
+            return [image]
+    
+    def ocr_plan(self, languages: List[str]) -> List[Tuple[str, str]]:
+        """Distinct (preprocessing variant, Tesseract config) attempts for a page, cheapest first"""
+        language_sets = []
+        if 'guj' in languages:
+            language_sets.append('guj+eng')
+        language_sets.append('+'.join(languages))
+        language_sets.append('eng')
+        primary = language_sets[0]
         
-        return processed_images
-
-    def extract_text_with_advanced_ocr(self, image: Image.Image, languages: List[str] = None) -> str:
-        """Advanced OCR extraction with multiple preprocessing methods and EasyOCR fallback"""
+        plan = [
+            ('standard', f'--oem 1 --psm 6 -l {primary} --dpi 300'),
+            ('standard', f'--oem 1 --psm 3 -l {primary} --dpi 300'),
+            ('high_contrast', f'--oem 1 --psm 6 -l {primary} --dpi 300'),
+            ('inverted', f'--oem 1 --psm 6 -l {primary} --dpi 300'),
+        ]
+        if primary == 'guj+eng':
+            plan.append(('standard', '--oem 1 --psm 6 -l guj --dpi 300'))
+        for language_set in language_sets[1:]:
+            plan.append(('standard', f'--oem 1 --psm 6 -l {language_set} --dpi 300'))
+        # Language lists often overlap (e.g. ['eng'] gives 'eng' three times): run each attempt once
+        return list(dict.fromkeys(plan))
+    
+    def parse_tesseract_data(self, data: Dict[str, List[Any]]) -> Tuple[str, float]:
+        """Text and length-weighted mean word confidence (0-1) from image_to_data output"""
+        lines = {}
+        weighted_confidence = 0.0
+        total_chars = 0
+        for i, word in enumerate(data.get('text', [])):
+            word = (word or '').strip()
+            confidence = float(data['conf'][i])
+            if not word or confidence < 0:
+                continue
+            line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(line_key, []).append(word)
+            weighted_confidence += confidence * len(word)
+            total_chars += len(word)
+        text = '\n'.join(' '.join(words) for words in lines.values())
+        return text, (weighted_confidence / total_chars / 100.0 if total_chars else 0.0)
+    
+    def parse_tesseract_words(self, data: Dict[str, List[Any]],
+                              size: Tuple[int, int]) -> List[OCRWord]:
+        """Words with boxes relative to the image size (x0, y0, x1, y1 in 0-1), in the order parse_tesseract_data joins them"""
+        lines = {}
+        width, height = size
+        for i, word in enumerate(data.get('text', [])):
+            word = (word or '').strip()
+            if not word or float(data['conf'][i]) < 0:
+                continue
+            left, top = data['left'][i], data['top'][i]
+            line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            # Spelled the way clean_ocr_text writes it into the page text
+            lines.setdefault(line_key, []).append((
+                word.translate(OCR_CHAR_TRANSLATION), left / width, top / height,
+                (left + data['width'][i]) / width, (top + data['height'][i]) / height))
+        return [word for words in lines.values() for word in words]
+    
+    def ocr_images(self, images: List[Image.Image], languages: List[str] = None,
+                   on_stage: Callable[[str], None] = None) -> List[Tuple[str, float, List[OCRWord]]]:
+        """Run the OCR plan over several pages at once, each until it reaches the confidence threshold;
+        returns (text, confidence, words with relative boxes) per page"""
         if languages is None:
             languages = ['eng']
         
-        try:
-            # Get multiple preprocessed versions
-            processed_images = self.advanced_preprocess_for_gujarati(image)
-            
-            all_results = []
-            
-            for i, processed_image in enumerate(processed_images):
-                print(f"Trying preprocessing method {i+1}...")
-                
-                # Try different OCR configurations for each preprocessed image
-                configs = [
-                    ('--oem 1 --psm 6 -l guj+eng --dpi 300', f'LSTM Gujarati+English (Method {i+1})'),
-                    ('--oem 3 --psm 6 -l guj+eng --dpi 300', f'Neural Gujarati+English (Method {i+1})'),
-                    ('--oem 1 --psm 3 -l guj+eng --dpi 300', f'LSTM PSM3 Gujarati+English (Method {i+1})'),
-                    ('--oem 3 --psm 3 -l guj+eng --dpi 300', f'Neural PSM3 Gujarati+English (Method {i+1})'),
-                    ('--oem 1 --psm 6 -l guj --dpi 300', f'LSTM Gujarati Only (Method {i+1})'),
-                    ('--oem 3 --psm 6 -l guj --dpi 300', f'Neural Gujarati Only (Method {i+1})'),
-                ]
-                
-                for config, description in configs:
-                    try:
-                        text = pytesseract.image_to_string(processed_image, config=config)
-                        if text.strip():
-                            cleaned_text = self.clean_ocr_text(text.strip())
-                            if cleaned_text and len(cleaned_text) > 10:  # Only keep substantial results
-                                all_results.append((cleaned_text, description))
-                                print(f"✅ {description}: {len(cleaned_text)} characters")
-                    except Exception as e:
-                        print(f"❌ {description} failed: {e}")
-            
-            # If no good results, try EasyOCR as fallback
-            if not all_results and 'guj' in languages:
+        prepared = [None] * len(images)
+        # Results are cached per rendered page, so re-ingested or repeated pages skip OCR entirely
+        image_hashes = [compute_image_hash(image) for image in images] if self.cache else None
+        best = [("", 0.0)] * len(images)
+        # Engine output behind each page's best result, for its word boxes
+        best_data = [None] * len(images)
+        pending = list(range(len(images)))
+        for variant, config in self.ocr_plan(languages):
+            if not pending:
+                break
+            results = {}
+            if self.cache:
+                for i in pending:
+                    cached = self.cache.get(image_hashes[i], variant, config)
+                    if cached is not None:
+                        results[i] = cached
+            missing = [i for i in pending if i not in results]
+            if missing:
+                try:
+                    # Each page is prepared once; its variants are built from that base only when needed
+                    if on_stage:
+                        on_stage("preprocess")
+                    batch = []
+                    for i in missing:
+                        if prepared[i] is None:
+                            prepared[i] = PreparedPage(images[i])
+                        batch.append(prepared[i].variant(variant))
+                    if on_stage:
+                        on_stage("ocr")
+                    # All pages still short of the threshold go through one engine call
+                    for i, data in zip(missing, self.engine.recognize(batch, config)):
+                        results[i] = data
+                        if self.cache:
+                            self.cache.put(image_hashes[i], variant, config, data)
+                except Exception as e:
+                    print(f"❌ {variant} ({config}) failed: {e}")
+            
+            still_pending = []
+            for i in pending:
+                if i not in results:
+                    still_pending.append(i)
+                    continue
+                text, confidence = self.parse_tesseract_data(results[i])
+                cleaned_text = self.clean_ocr_text(text)
+                if cleaned_text and len(cleaned_text) > 10:  # Only keep substantial results
+                    print(f"✅ {variant} ({config}): {len(cleaned_text)} characters, confidence {confidence:.2f}")
+                    if (confidence, len(cleaned_text)) > (best[i][1], len(best[i][0])):
+                        best[i] = (cleaned_text, confidence)
+                        best_data[i] = results[i]
+                    if confidence >= OCR_CONFIDENCE_THRESHOLD:
+                        continue
+                still_pending.append(i)
+            pending = still_pending
+        
+        # If no good results, try EasyOCR as fallback
+        if 'guj' in languages:
+            for i, (text, _) in enumerate(best):
+                if text:
+                    continue
+                cached = self.cache.get(image_hashes[i], 'standard', EASYOCR_CONFIG) if self.cache else None
+                if cached is not None:
+                    best[i] = tuple(cached)
+                    continue
                 print("🔄 No good Tesseract results, trying EasyOCR...")
-                for i, processed_image in enumerate(processed_images):
-                    try:
-                        easyocr_text = self.extract_text_with_easyocr(processed_image)
-                        if easyocr_text and len(easyocr_text) > 10:
-                            all_results.append((easyocr_text, f'EasyOCR (Method {i+1})'))
-                            print(f"✅ EasyOCR (Method {i+1}): {len(easyocr_text)} characters")
-                    except Exception as e:
-                        print(f"❌ EasyOCR (Method {i+1}) failed: {e}")
-            
-            # If still no good results, try with English only
-            if not all_results:
-                print("🔄 No good Gujarati results, trying English...")
-                for processed_image in processed_images:
-                    try:
-                        text = pytesseract.image_to_string(processed_image, config='--oem 3 --psm 6 -l eng --dpi 300')
-                        if text.strip():
-                            cleaned_text = self.clean_ocr_text(text.strip())
-                            if cleaned_text and len(cleaned_text) > 10:
-                                all_results.append((cleaned_text, "English Fallback"))
-                    except Exception as e:
-                        print(f"English OCR failed: {e}")
-            
-            # Return the best result (longest text with most Gujarati characters)
-            if all_results:
-                # Score each result based on length and Gujarati character count
-                scored_results = []
-                for text, description in all_results:
-                    gujarati_chars = sum(1 for char in text if '\u0A80' <= char <= '\u0AFF')
-                    score = len(text) + (gujarati_chars * 3)  # Weight Gujarati characters more heavily
-                    scored_results.append((text, score, description))
-                
-                # Sort by score and return the best
-                scored_results.sort(key=lambda x: x[1], reverse=True)
-                best_text, score, description = scored_results[0]
-                print(f"🏆 Best result: {description} (score: {score})")
-                return best_text
-            
-            return ""
+                try:
+                    best[i] = self.read_with_easyocr((prepared[i] or PreparedPage(images[i])).variant('standard'))
+                    # Not cached without a reader, so installing EasyOCR later takes effect
+                    if self.cache and self.easyocr_reader:
+                        self.cache.put(image_hashes[i], 'standard', EASYOCR_CONFIG, list(best[i]))
+                except Exception as e:
+                    print(f"❌ EasyOCR failed: {e}")
         
+        # Boxes are relative to the preprocessed variant, which is the render upscaled to MIN_OCR_SIZE
+        return [(text, confidence, self.parse_tesseract_words(data, upscaled_size(image.size)) if data else [])
+                for (text, confidence), data, image in zip(best, best_data, images)]
+    
+    def ocr_images_by_languages(self, images: List[Image.Image],
+                                page_languages: List[List[str]]) -> List[Tuple[str, float, List[OCRWord], List[str]]]:
+        """OCR pages each with its own languages, pages of the same languages sharing engine calls;
+        returns (text, confidence, words, languages) per page"""
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        for i, languages in enumerate(page_languages):
+            groups.setdefault(tuple(languages), []).append(i)
+        results = [None] * len(images)
+        for languages, indices in groups.items():
+            for i, result in zip(indices, self.ocr_images([images[i] for i in indices], list(languages))):
+                results[i] = result + (list(languages),)
+        return results
+    
+    def ocr_image(self, image: Image.Image, languages: List[str] = None,
+                  on_stage: Callable[[str], None] = None) -> Tuple[str, float, List[OCRWord]]:
+        """Run the OCR plan until a result reaches the confidence threshold; returns (text, confidence, words)"""
+        return self.ocr_images([image], languages, on_stage)[0]
+    
+    def extract_text_with_advanced_ocr(self, image: Image.Image, languages: List[str] = None,
+                                       on_stage: Callable[[str], None] = None) -> str:
+        """Advanced OCR extraction with multiple preprocessing methods and EasyOCR fallback"""
+        try:
+            return self.ocr_image(image, languages, on_stage)[0]
         except Exception as e:
             print(f"Error in advanced OCR: {e}")
             return ""
@@ -289,47 +619,8 @@ class OCRProcessor:
         # Remove excessive whitespace
         cleaned_text = ' '.join(cleaned_text.split())
         
-        # Fix common OCR mistakes for Gujarati
-        replacements = {
-            '|': '।',  # Fix vertical bar to Gujarati danda
-            '॥': '॥',  # Fix double danda
-            '0': '૦',  # Fix English 0 to Gujarati 0
-            '1': '૧',  # Fix English 1 to Gujarati 1
-            '2': '૨',  # Fix English 2 to Gujarati 2
-            '3': '૩',  # Fix English 3 to Gujarati 3
-            '4': '૪',  # Fix English 4 to Gujarati 4
-            '5': '૫',  # Fix English 5 to Gujarati 5
-            '6': '૬',  # Fix English 6 to Gujarati 6
-            '7': '૭',  # Fix English 7 to Gujarati 7
-            '8': '૮',  # Fix English 8 to Gujarati 8
-            '9': '૯',  # Fix English 9 to Gujarati 9
-            '¥': 'ય',  # Fix common OCR mistake
-            '¢': 'ચ',  # Fix common OCR mistake
-            '£': 'ળ',  # Fix common OCR mistake
-            '§': 'સ',  # Fix common OCR mistake
-            '©': 'ગ',  # Fix common OCR mistake
-            '®': 'ર',  # Fix common OCR mistake
-            '°': 'દ',  # Fix common OCR mistake
-            '±': 'પ',  # Fix common OCR mistake
-            '²': 'બ',  # Fix common OCR mistake
-            '³': 'ભ',  # Fix common OCR mistake
-            '´': 'મ',  # Fix common OCR mistake
-            'µ': 'ન',  # Fix common OCR mistake
-            '¶': 'વ',  # Fix common OCR mistake
-            '·': 'શ',  # Fix common OCR mistake
-            '¸': 'ષ',  # Fix common OCR mistake
-            '¹': 'હ',  # Fix common OCR mistake
-            'º': 'જ',  # Fix common OCR mistake
-            '»': 'ઝ',  # Fix common OCR mistake
-            '¼': 'ઞ',  # Fix common OCR mistake
-            '½': 'ટ',  # Fix common OCR mistake
-            '¾': 'ઠ',  # Fix common OCR mistake
-            '¿': 'ડ',  # Fix common OCR mistake
-        }
-        
-        # Apply replacements
-        for old, new in replacements.items():
-            cleaned_text = cleaned_text.replace(old, new)
+        # Fix common OCR mistakes for Gujarati (one character for another)
+        cleaned_text = cleaned_text.translate(OCR_CHAR_TRANSLATION)
         
         # Remove lines with only numbers or special characters
         lines = cleaned_text.split('\n')
@@ -345,51 +636,173 @@ class OCRProcessor:
         
         return cleaned_text
 
-    def extract_text_with_ocr(self, image: Image.Image, languages: List[str] = None) -> str:
+    def extract_text_with_ocr(self, image: Image.Image, languages: List[str] = None,
+                              on_stage: Callable[[str], None] = None) -> str:
         """Extract text from image using advanced OCR"""
         if languages is None:
             languages = ['eng']
         
         # Use the advanced OCR method for better results
-        return self.extract_text_with_advanced_ocr(image, languages)
+        return self.extract_text_with_advanced_ocr(image, languages, on_stage)
+    
+    def ocr_page(self, image: Image.Image, languages: List[str],
+                 on_stage: Callable[[str], None] = None) -> Tuple[str, float, List[OCRWord]]:
+        """OCR one page image; returns (text, mean word confidence, words with relative boxes)"""
+        try:
+            return self.ocr_image(image, languages, on_stage)
+        except Exception as e:
+            print(f"Error in advanced OCR: {e}")
+            return "", 0.0, []
+    
+    def _ocr_pages_sequential(self, doc: "fitz.Document", page_languages: Dict[int, Optional[List[str]]],
+                              page_numbers: List[int], languages: List[str],
+                              progress: Callable[[str, int, int], None] = None) -> Iterator[Tuple[int, str, float, List[OCRWord], List[str]]]:
+        """OCR pages in this process, batch_size pages of the same languages per engine call
+        (pages without languages get them from script detection on their render, else languages)"""
+        total_pages = len(page_numbers)
+        
+        batch = []
+        batch_languages = None
+        pages_done = 0
+        for page_num, image in zip(page_numbers, self.pdf_to_images(doc, page_numbers=page_numbers)):
+            image_languages = page_languages[page_num] or self.detect_image_languages(image) or languages
+            if batch and image_languages != batch_languages:
+                yield from self._ocr_batch(batch, pages_done, batch_languages, total_pages, progress)
+                pages_done += len(batch)
+                batch = []
+            batch.append((page_num, image))
+            batch_languages = image_languages
+            if len(batch) == self.batch_size:
+                yield from self._ocr_batch(batch, pages_done, batch_languages, total_pages, progress)
+                pages_done += len(batch)
+                batch = []
+        if batch:
+            yield from self._ocr_batch(batch, pages_done, batch_languages, total_pages, progress)
+        
+        if progress:
+            progress("ocr", total_pages, total_pages)
+    
+    def _ocr_batch(self, pages: List[Tuple[int, Image.Image]], pages_done: int, languages: List[str], total_pages: int,
+                   progress: Callable[[str, int, int], None] = None) -> Iterator[Tuple[int, str, float, List[OCRWord], List[str]]]:
+        print(f"Processing pages {pages[0][0] + 1}-{pages[-1][0] + 1} ({'+'.join(languages)})...")
+        on_stage = (lambda stage: progress(stage, pages_done, total_pages)) if progress else None
+        images = [image for _, image in pages]
+        for (page_num, _), (text, confidence, words) in zip(pages, self.ocr_images(images, languages, on_stage)):
+            yield page_num, text, confidence, words, languages
+    
+    def _ocr_pages_parallel(self, doc: "fitz.Document", page_languages: Dict[int, Optional[List[str]]],
+                            page_numbers: List[int], languages: List[str],
+                            progress: Callable[[str, int, int], None] = None) -> Iterator[Tuple[int, str, float, List[OCRWord], List[str]]]:
+        """Render pages here and OCR them in the page pool, yielding results in page order; each task is a
+        chunk of same-language pages (or pages whose languages the worker detects) sent through one engine call"""
+        pool = self._get_page_pool()
+        total_pages = len(page_numbers)
+        # Up to batch_size pages per task, but never so many that a worker is left idle
+        chunk_size = max(1, min(self.batch_size, -(-total_pages // self.page_workers)))
+        # Chunks waiting for or in OCR; bounds the shared memory in use
+        max_in_flight = 2 * self.page_workers
+        pending = deque()
+        chunk = []
+        try:
+            for index, page_num in enumerate(page_numbers):
+                if chunk and page_languages[page_num] != page_languages[chunk[0][1]]:
+                    pending.append(self._submit_chunk(pool, chunk, page_languages, languages))
+                    chunk = []
+                pix = self.render_pixmap(doc.load_page(page_num))  # 2x zoom for better OCR
+                mode = "L" if pix.n == 1 else "RGB"
+                samples = pix.samples_mv if hasattr(pix, 'samples_mv') else pix.samples
+                # Hand the raw pixels to the worker through shared memory instead of pickling an image
+                shm = shared_memory.SharedMemory(create=True, size=max(1, len(samples)))
+                shm.buf[:len(samples)] = samples
+                chunk.append((index, page_num, shm, (shm.name, mode, (pix.width, pix.height), pix.stride)))
+                if len(chunk) == chunk_size:
+                    pending.append(self._submit_chunk(pool, chunk, page_languages, languages))
+                    chunk = []
+                
+                while len(pending) >= max_in_flight:
+                    yield from self._collect_chunk(pending.popleft(), total_pages, progress)
+            if chunk:
+                pending.append(self._submit_chunk(pool, chunk, page_languages, languages))
+                chunk = []
+            
+            while pending:
+                yield from self._collect_chunk(pending.popleft(), total_pages, progress)
+        finally:
+            # Only left over if the caller stopped early
+            for pages, future, _ in pending:
+                future.cancel()
+                self._release_chunk(pages)
+            self._release_chunk(chunk)
+    
+    def _submit_chunk(self, pool: ProcessPoolExecutor, chunk, page_languages: Dict[int, Optional[List[str]]],
+                      languages: List[str]):
+        chunk_languages = page_languages[chunk[0][1]]
+        future = pool.submit(_ocr_shared_pages, [page for _, _, _, page in chunk], chunk_languages, languages)
+        return chunk, future, chunk_languages or languages
+    
+    def _release_chunk(self, chunk) -> None:
+        for _, _, shm, _ in chunk:
+            shm.close()
+            shm.unlink()
+    
+    def _collect_chunk(self, item, total_pages: int,
+                       progress: Callable[[str, int, int], None] = None) -> Iterator[Tuple[int, str, float, List[OCRWord], List[str]]]:
+        chunk, future, languages = item
+        try:
+            results = future.result()
+        except Exception as e:
+            print(f"Error processing pages {chunk[0][1] + 1}-{chunk[-1][1] + 1}: {e}")
+            results = [("", 0.0, [], languages)] * len(chunk)
+        finally:
+            self._release_chunk(chunk)
+        if progress:
+            progress("ocr", chunk[-1][0] + 1, total_pages)
+        for (_, page_num, _, _), (text, confidence, words, page_languages) in zip(chunk, results):
+            yield page_num, text, confidence, words, page_languages
     
-    def process_scanned_pdf(self, pdf_path: str, languages: List[str] = None) -> List[Dict[str, Any]]:
-        """Process a scanned PDF and extract text using OCR"""
+    def process_scanned_pdf(self, pdf: Union[str, "fitz.Document"], languages: List[str] = None,
+                            progress: Callable[[str, int, int], None] = None,
+                            page_numbers: List[int] = None,
+                            page_languages: Dict[int, List[str]] = None,
+                            page_words: Dict[int, List[OCRWord]] = None,
+                            detect: bool = False) -> List[Dict[str, Any]]:
+        """Process a scanned PDF (path or open document) and extract text using OCR (progress(stage, pages_done, total_pages));
+        page_words, if given, receives the words and relative boxes of each page with text; with detect, pages missing
+        from page_languages get theirs from script detection on the image rendered for OCR (languages if undecided)"""
         if languages is None:
             languages = ['eng']
         
         results = []
         try:
             # Convert PDF to images
-            images = self.pdf_to_images(pdf_path)
-            
-            for page_num, image in enumerate(images):
-                print(f"Processing page {page_num + 1}...")
-                
-                # Try multiple language combinations for better results
-                text = ""
-                
-                # First try with Gujarati + English
-                if 'guj' in languages:
-                    text = self.extract_text_with_ocr(image, ['guj', 'eng'])
-                
-                # If no text found, try with all specified languages
-                if not text.strip():
-                    text = self.extract_text_with_ocr(image, languages)
-                
-                # If still no text, try with English only
-                if not text.strip():
-                    text = self.extract_text_with_ocr(image, ['eng'])
-                
-                if text.strip():  # Only add pages with extracted text
-                    results.append({
-                        'page': page_num + 1,
-                        'text': text,
-                        'confidence': 0.8  # Placeholder confidence score
-                    })
-                    print(f"Page {page_num + 1}: Extracted {len(text)} characters")
+            if progress:
+                progress("render", 0, 0)
+            with open_pdf(pdf) as doc:
+                # All pages unless the caller picked the ones without a usable text layer (0-based)
+                if page_numbers is None:
+                    page_numbers = list(range(len(doc)))
+                # Tesseract languages per page (detected per page where given, else the document's; None = detect)
+                page_languages = {page_num: (page_languages or {}).get(page_num) or (None if detect else languages)
+                                  for page_num in page_numbers}
+                if self.page_workers > 1:
+                    pages = self._ocr_pages_parallel(doc, page_languages, page_numbers, languages, progress)
                 else:
-                    print(f"Page {page_num + 1}: No text extracted")
+                    pages = self._ocr_pages_sequential(doc, page_languages, page_numbers, languages, progress)
+                
+                for page_num, text, confidence, words, text_languages in pages:
+                    if text.strip():  # Only add pages with extracted text
+                        results.append({
+                            'page': page_num + 1,
+                            'text': text,
+                            'confidence': round(confidence, 4),  # Mean word confidence of the chosen OCR result
+                            'method': 'ocr',
+                            'languages': text_languages
+                        })
+                        if page_words is not None:
+                            page_words[page_num + 1] = words
+                        print(f"Page {page_num + 1}: Extracted {len(text)} characters")
+                    else:
+                        print(f"Page {page_num + 1}: No text extracted")
         
         except Exception as e:
             print(f"Error processing scanned PDF: {e}")
@@ -397,31 +810,52 @@ class OCRProcessor:
         return results
     
     def detect_language(self, text: str) -> str:
-        """Detect the language of the text (simple implementation)"""
-        # This is a simple implementation - could be enhanced with proper language detection
-        # For now, return English as default
-        return 'eng'
+        """Detect the main language of the text from its script histogram ('eng' if undecided)"""
+        languages = detect_languages(text, self.supported_languages)
+        return languages[0] if languages else 'eng'
     
-    def is_scanned_pdf(self, pdf_path: str) -> bool:
+    def detect_image_languages(self, image: Image.Image) -> List[str]:
+        """OCR languages of a page image from one OSD (script detection) pass; [] if undecided"""
+        image_hash = compute_image_hash(image) if self.cache else None
+        result = self.cache.get(image_hash, 'osd', OSD_CONFIG) if self.cache else None
+        if result is None:
+            try:
+                result = self.engine.detect_script(image, OSD_CONFIG)
+            except Exception as e:
+                # Also raised for pages with too few characters, or without osd.traineddata
+                print(f"⚠️  Script detection failed: {e}")
+                return []
+            if self.cache:
+                self.cache.put(image_hash, 'osd', OSD_CONFIG, result)
+        
+        language = script_language(result.get('script') or '')
+        if not language or language not in self.supported_languages:
+            return []
+        if result.get('script_conf', 0.0) < MIN_OSD_SCRIPT_CONFIDENCE:
+            return []
+        # Scanned Indic pages still carry English words and Latin digits
+        return [language] if language == 'eng' else [language, 'eng']
+    
+    def detect_page_languages(self, page: "fitz.Page") -> List[str]:
+        """OCR languages of a page without a text layer, from a low-resolution render; [] if undecided"""
+        return self.detect_image_languages(self.pixmap_to_image(self.render_pixmap(page, zoom=OSD_DPI / 72)))
+    
+    def is_scanned_pdf(self, pdf: Union[str, "fitz.Document"]) -> bool:
         """Check if PDF is scanned (contains images rather than text)"""
         try:
-            doc = fitz.open(pdf_path)
-            scanned = True
-            
-            for page_num in range(min(3, len(doc))):  # Check first 3 pages
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                if len(text.strip()) > 50:  # If significant text found
-                    scanned = False
-                    break
-            
-            doc.close()
-            return scanned
+            with open_pdf(pdf) as doc:
+                # Check first 3 pages
+                return self.is_scanned_text([doc.load_page(page_num).get_text() for page_num in range(min(3, len(doc)))])
         
         except Exception as e:
             print(f"Error checking if PDF is scanned: {e}")
             return False
     
+    def is_scanned_text(self, page_texts: List[str]) -> bool:
+        """Scanned-PDF check on already extracted page texts (first 3 pages)"""
+        # If significant text found on any of them, the PDF has a text layer
+        return not any(len(text.strip()) > 50 for text in page_texts[:3])
+    
     def detect_gujarati_text(self, text: str) -> bool:
         """Detect if text contains Gujarati characters"""
         if not text:
@@ -443,67 +877,70 @@ class OCRProcessor:
         
         return False
     
-    def auto_detect_language(self, pdf_path: str) -> List[str]:
-        """Automatically detect the language of the PDF content"""
+    def auto_detect_language(self, pdf: Union[str, "fitz.Document"], sample_text: str = None,
+                             page_languages: List[List[str]] = None) -> List[str]:
+        """Automatically detect the languages of the PDF content (sample_text: text layer already extracted,
+        page_languages: languages already detected on scanned pages)"""
         try:
-            # First try to extract text directly from PDF
-            import PyPDF2
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                sample_text = ""
-                for page in pdf_reader.pages[:2]:  # Check first 2 pages
-                    text = page.extract_text()
-                    if text:
-                        sample_text += text[:1000]  # First 1000 chars
-            
-            # If we found text, check if it's Gujarati
-            if sample_text and self.detect_gujarati_text(sample_text):
-                print("Detected Gujarati text in PDF")
-                return ['guj', 'eng']
-            
-            # If no text or not Gujarati, try OCR on a sample page
-            images = self.pdf_to_images(pdf_path)
-            if images:
-                # Try OCR on first page with English first
-                sample_text = self.extract_text_with_ocr(images[0], ['eng'])
-                if sample_text and self.detect_gujarati_text(sample_text):
-                    print("Detected Gujarati text via OCR")
-                    return ['guj', 'eng']
+            with open_pdf(pdf) as doc:
+                if sample_text is None:
+                    # First try the text layer of the first 2 pages
+                    sample_text = ""
+                    for page_num in range(min(2, len(doc))):
+                        sample_text += doc.load_page(page_num).get_text()[:1000]  # First 1000 chars
+                
+                languages = detect_languages(sample_text, self.supported_languages)
+                if languages:
+                    print(f"Detected {'+'.join(languages)} text in PDF")
+                    return languages
+                
+                # No text to go by: one low-resolution script detection pass on the first page
+                if page_languages is None:
+                    page_languages = [self.detect_page_languages(doc.load_page(0))] if len(doc) else []
+                detected = Counter(tuple(languages) for languages in page_languages if languages)
+                if detected:
+                    languages = list(detected.most_common(1)[0][0])
+                    print(f"Detected {'+'.join(languages)} script via OSD")
+                    return languages
             
-            # Default to English
-            return ['eng']
+            return list(DEFAULT_OCR_LANGUAGES)
             
         except Exception as e:
             print(f"Error in language detection: {e}")
-            return ['eng']
+            return list(DEFAULT_OCR_LANGUAGES)
 
-    def extract_text_with_easyocr(self, image: Image.Image) -> str:
-        """Extract text using EasyOCR (often better for Indic languages)"""
+    def read_with_easyocr(self, image: Image.Image) -> Tuple[str, float]:
+        """EasyOCR text and mean confidence of the kept results"""
+        if not self._easyocr_loaded:
+            self._load_easyocr()
         if not self.easyocr_reader:
-            return ""
+            return "", 0.0
+        
+        # Convert PIL image to numpy array
+        img_array = np.array(image)
+        
+        # Perform OCR
+        results = self.easyocr_reader.readtext(img_array)
         
+        # Extract text from results
+        texts = []
+        confidences = []
+        for (bbox, text, confidence) in results:
+            if confidence > 0.3:  # Filter low confidence results
+                texts.append(text)
+                confidences.append(confidence)
+        
+        # Join all text
+        full_text = ' '.join(texts).strip()
+        if not full_text:
+            return "", 0.0
+        print(f"✅ EasyOCR extracted {len(full_text)} characters")
+        return full_text, float(np.mean(confidences))
+    
+    def extract_text_with_easyocr(self, image: Image.Image) -> str:
+        """Extract text using EasyOCR (often better for Indic languages)"""
         try:
-            # Convert PIL image to numpy array
-            img_array = np.array(image)
-            
-            # Perform OCR
-            results = self.easyocr_reader.readtext(img_array)
-            
-            # Extract text from results
-            texts = []
-            for (bbox, text, confidence) in results:
-                if confidence > 0.3:  # Filter low confidence results
-                    texts.append(text)
-            
-            # Join all text
-            full_text = ' '.join(texts)
-            
-            if full_text.strip():
-                print(f"✅ EasyOCR extracted {len(full_text)} characters")
-                return full_text.strip()
-            
-            return ""
-            
+            return self.read_with_easyocr(image)[0]
         except Exception as e:
             print(f"❌ EasyOCR failed: {e}")
             return ""
@@ -0,0 +1,123 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+# Preprocessed variants smaller than this are upscaled (LANCZOS) as their last step
+MIN_OCR_SIZE = (2000, 1500)
+
+# Steps of each preprocessing variant, in order. Point operations ('contrast', 'brightness',
+# 'invert', 'threshold') are folded into a single 256-entry lookup table applied in one pass;
+# 'sharpen', 'blur' and 'edge_enhance' look at neighbouring pixels and run as PIL filters.
+VARIANT_STEPS = {
+    'standard': (('contrast', 3.5), ('sharpen', 2.5), ('blur', 0.5)),
+    'high_contrast': (('contrast', 4.0), ('brightness', 1.3), ('edge_enhance', None)),
+    'inverted': (('invert', None), ('contrast', 3.0)),
+    'basic': (('contrast', 3.0), ('sharpen', 2.0), ('brightness', 1.2)),
+    'binarized': (('contrast', 2.0), ('threshold', None)),
+}
+
+POINT_OPS = ('contrast', 'brightness', 'invert', 'threshold')
+
+_IDENTITY = np.arange(256, dtype=np.uint8)
+# float32, like PIL's blend arithmetic, so the tables reproduce ImageEnhance exactly
+_LEVELS = np.arange(256, dtype=np.float32)
+
+
+def upscaled_size(size: Tuple[int, int], min_size: Tuple[int, int] = MIN_OCR_SIZE) -> Tuple[int, int]:
+    """Size of an image of this size after upscale()"""
+    if size[0] < min_size[0] or size[1] < min_size[1]:
+        scale_factor = max(min_size[0] / size[0], min_size[1] / size[1])
+        return int(size[0] * scale_factor), int(size[1] * scale_factor)
+    return size
+
+
+def upscale(image: Image.Image, min_size: Tuple[int, int] = MIN_OCR_SIZE) -> Image.Image:
+    """Resize (LANCZOS) so the image is at least min_size"""
+    new_size = upscaled_size(image.size, min_size)
+    if new_size != image.size:
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+    return image
+
+
+def otsu_threshold(histogram: np.ndarray) -> int:
+    """Gray level that best separates the histogram into two classes (Otsu's method)"""
+    total = histogram.sum()
+    if not total:
+        return 127
+    weight_below = np.cumsum(histogram)
+    weight_above = total - weight_below
+    sum_below = np.cumsum(histogram * np.arange(256))
+    mean_below = sum_below / np.maximum(weight_below, 1)
+    mean_above = (sum_below[-1] - sum_below) / np.maximum(weight_above, 1)
+    between_class = weight_below * weight_above * (mean_below - mean_above) ** 2
+    return int(np.argmax(between_class))
+
+
+def point_lut(op: str, value: Optional[float], histogram: np.ndarray) -> np.ndarray:
+    """Lookup table for one point operation, matching the PIL ImageEnhance equivalent"""
+    if op == 'invert':
+        return 255 - _IDENTITY
+    if op == 'threshold':
+        level = otsu_threshold(histogram) if value is None else int(value)
+        return np.where(_IDENTITY > level, 255, 0).astype(np.uint8)
+    if op == 'contrast':
+        # Blend towards the mean gray level, like ImageEnhance.Contrast
+        mean = np.float32(int((histogram * np.arange(256)).sum() / max(histogram.sum(), 1) + 0.5))
+        table = mean + np.float32(value) * (_LEVELS - mean)
+    elif op == 'brightness':
+        table = np.float32(value) * _LEVELS
+    else:
+        raise ValueError(f"Unknown point operation '{op}', expected one of {POINT_OPS}")
+    return np.clip(table, 0, 255).astype(np.uint8)
+
+
+def apply_filter(image: Image.Image, op: str, value: Optional[float]) -> Image.Image:
+    if op == 'sharpen':
+        return ImageEnhance.Sharpness(image).enhance(value)
+    if op == 'blur':
+        return image.filter(ImageFilter.GaussianBlur(radius=value))
+    if op == 'edge_enhance':
+        return image.filter(ImageFilter.EDGE_ENHANCE_MORE)
+    raise ValueError(f"Unknown filter '{op}'")
+
+
+def apply_steps(image: Image.Image, steps: Sequence[Tuple[str, Optional[float]]],
+                histogram: np.ndarray = None) -> Image.Image:
+    """Run preprocessing steps on a grayscale image; consecutive point operations cost one table lookup"""
+    lut = _IDENTITY
+    for op, value in steps:
+        if op in POINT_OPS:
+            if histogram is None:
+                histogram = np.asarray(image.histogram())
+            # Histogram of the image as transformed so far, without touching the pixels
+            current = np.bincount(lut, weights=histogram, minlength=256)
+            lut = point_lut(op, value, current)[lut]
+        else:
+            if lut is not _IDENTITY:
+                image = image.point(lut.tolist())
+                lut = _IDENTITY
+            image = apply_filter(image, op, value)
+            histogram = None
+    if lut is not _IDENTITY:
+        image = image.point(lut.tolist())
+    return image
+
+
+class PreparedPage:
+    def __init__(self, image: Image.Image, min_size: Tuple[int, int] = MIN_OCR_SIZE):
+        """Grayscale page and its histogram, computed once and shared by all preprocessing variants"""
+        self.image = image if image.mode == 'L' else image.convert('L')
+        self.histogram = np.asarray(self.image.histogram())
+        self.min_size = min_size
+        self._variants: Dict[str, Image.Image] = {}
+
+    def variant(self, name: str) -> Image.Image:
+        """A preprocessing variant of the page (built on first use)"""
+        if name not in self._variants:
+            if name not in VARIANT_STEPS:
+                raise ValueError(f"Unknown preprocessing variant '{name}', expected one of {tuple(VARIANT_STEPS)}")
+            # Filters run at render resolution (upscaling first would multiply their cost); resize last
+            processed = apply_steps(self.image, VARIANT_STEPS[name], self.histogram)
+            self._variants[name] = upscale(processed, self.min_size)
+        return self._variants[name]
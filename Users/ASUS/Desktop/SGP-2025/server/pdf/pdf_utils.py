@@ -1,98 +1,370 @@
-import PyPDF2
 import fitz  # PyMuPDF
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Tuple, Union
+from concurrent.futures import Executor
+import asyncio
+import itertools
 import json
+import multiprocessing
+import shutil
+import threading
+import unicodedata
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from models.ocr_utils import OCRProcessor
+from models.language_detection import detect_languages
+from models.ocr_utils import DEFAULT_OCR_LANGUAGES, OCRProcessor, open_pdf
+from search.inverted_index import InvertedIndex
+from search.suffix_array import DocumentSuffixArray, SuffixArrayCache
+from storage.document_store import DocumentStore, compute_file_hash
+from storage.ocr_cache import OCRCache
+from storage.word_boxes import DocumentWordBoxes, PageWord, WordBoxStore
+
+# One extraction-only processor per ingestion worker process, created on first use
+_worker_processor = None
+
+# Per-page routing between the text layer and OCR
+GARBLED_CHAR_RATIO = 0.3      # A text layer with this share of unmapped glyphs is not usable
+SCANNED_IMAGE_COVERAGE = 0.5  # Pages mostly covered by images are treated as scans...
+MIN_TEXT_DENSITY = 1.0        # ...unless they carry this many characters per 1000 pt² (~500 on an A4 page)
+# Unicode categories of glyphs a broken font maps to nothing readable (control, private use, unassigned)
+_UNMAPPED_CATEGORIES = {'Cc', 'Co', 'Cn', 'Cs'}
+
+def image_coverage(page: "fitz.Page") -> float:
+    """Fraction of the page area covered by images (overlaps counted twice, capped at 1)"""
+    page_rect = page.rect
+    page_area = abs(page_rect)
+    if not page_area:
+        return 0.0
+    covered = sum(abs(fitz.Rect(info['bbox']) & page_rect) for info in page.get_image_info())
+    return min(1.0, covered / page_area)
+
+def text_layer_garbled(text: str) -> bool:
+    """Whether a text layer is mostly glyphs without a Unicode mapping (U+FFFD, private use, control)"""
+    chars = [char for char in text if not char.isspace()]
+    if not chars:
+        return False
+    unmapped = sum(1 for char in chars if char == '\ufffd' or unicodedata.category(char) in _UNMAPPED_CATEGORIES)
+    return unmapped >= GARBLED_CHAR_RATIO * len(chars)
+
+def page_needs_ocr(page: "fitz.Page", text: str) -> bool:
+    """Whether a page's text has to come from OCR rather than its text layer"""
+    text = text.strip()
+    if not text or text_layer_garbled(text):
+        # No usable text layer: OCR it unless the page is blank (no images, no vector graphics such as outlined text)
+        return image_coverage(page) > 0 or bool(page.get_drawings())
+    # Dense text is used as is; image coverage is only looked up for sparse pages
+    if len(text) / max(abs(page.rect), 1) * 1000 >= MIN_TEXT_DENSITY:
+        return False
+    # A short but readable text layer (a title over a chart, a caption) is kept unless the page is
+    # mostly a scanned image and the text only a header or stamp on it
+    return image_coverage(page) >= SCANNED_IMAGE_COVERAGE
+
+def layer_words(page: "fitz.Page", textpage: "fitz.TextPage" = None) -> List[PageWord]:
+    """Words of a page's text layer with their boxes as displayed (rotation applied), in PDF points"""
+    words = page.get_text('words', textpage=textpage)
+    if page.rotation:
+        matrix = page.rotation_matrix
+        return [tuple(fitz.Rect(word[:4]) * matrix) + (word[4],) for word in words]
+    # (x0, y0, x1, y1, text, block, line, word): the trailing numbers are ignored
+    return words
+
+def init_ingest_worker(ocr_page_workers: int = 1, ocr_thread_limit: int = None,
+                       ocr_cache_dir: str = None, ocr_cache_max_bytes: int = 0):
+    """Ingestion pool initializer: build the worker's processor with its own OCR page pool"""
+    global _worker_processor
+    if ocr_thread_limit:
+        # Pages OCR'd in this process (no page pool) get the same share of the cores as pooled ones
+        os.environ['OMP_THREAD_LIMIT'] = str(ocr_thread_limit)
+    # Every worker opens the same cache directory; entries are written atomically
+    ocr_cache = OCRCache(ocr_cache_dir, ocr_cache_max_bytes) if ocr_cache_dir else None
+    _worker_processor = PDFProcessor(ocr_processor=OCRProcessor(page_workers=ocr_page_workers, cache=ocr_cache,
+                                                                omp_thread_limit=ocr_thread_limit))
+
+def extract_pdf_in_worker(pdf_path: str, progress_queue=None, task_id: int = None) -> Dict[str, Any]:
+    """Extract text/OCR pages in an ingestion worker process, reporting progress on a shared queue"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = PDFProcessor()
+    progress = None
+    if progress_queue is not None:
+        progress = lambda stage, done, total: progress_queue.put((task_id, stage, done, total))
+    return _worker_processor.extract_pdf(pdf_path, progress)
 
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, document_store: DocumentStore = None, word_index: InvertedIndex = None,
+                 suffix_arrays: SuffixArrayCache = None, ocr_processor: OCRProcessor = None,
+                 executor: Executor = None, word_boxes: WordBoxStore = None):
         """Initialize PDF processor"""
-        self.ocr_processor = OCRProcessor()
+        # Share the caller's OCR processor so EasyOCR is only initialized once
+        self.ocr_processor = ocr_processor or OCRProcessor()
+        self.document_store = document_store
+        self.word_index = word_index
+        self.suffix_arrays = suffix_arrays
+        self.word_boxes = word_boxes
+        # Process pool that runs text extraction/OCR (None = a thread of the event loop's default pool)
+        self.executor = executor
+        # Worker processes report progress on a managed queue, relayed to callbacks by a thread
+        self._progress_lock = threading.Lock()
+        self._progress_manager = None
+        self._progress_queue = None
+        self._progress_callbacks: Dict[int, Callable[[str, int, int], None]] = {}
+        self._task_ids = itertools.count()
     
-    async def process_pdf(self, pdf_path: str) -> Dict[str, Any]:
-        """Process a PDF file and extract text (async version)"""
-        return self.process_pdf_sync(pdf_path)
+    def _get_progress_queue(self):
+        with self._progress_lock:
+            if self._progress_queue is None:
+                self._progress_manager = multiprocessing.get_context("spawn").Manager()
+                self._progress_queue = self._progress_manager.Queue()
+                threading.Thread(target=self._relay_progress, args=(self._progress_queue,),
+                                 name="ingest-progress", daemon=True).start()
+            return self._progress_queue
     
-    def process_pdf_sync(self, pdf_path: str) -> Dict[str, Any]:
+    def _relay_progress(self, progress_queue):
+        while True:
+            try:
+                task_id, stage, done, total = progress_queue.get()
+            except Exception:
+                return  # Manager shut down
+            callback = self._progress_callbacks.get(task_id)
+            if callback:
+                callback(stage, done, total)
+    
+    def close(self):
+        """Stop the progress relay's manager process and the OCR page pool"""
+        self.ocr_processor.close()
+        with self._progress_lock:
+            if self._progress_manager is not None:
+                self._progress_manager.shutdown()
+                self._progress_manager = None
+                self._progress_queue = None
+    
+    async def process_pdf(self, pdf_path: str, progress: Callable[[str, int, int], None] = None,
+                          doc_hash: str = None) -> Dict[str, Any]:
+        """Process a PDF file and extract text (async version, progress(stage, pages_done, total_pages))"""
+        loop = asyncio.get_running_loop()
+        if doc_hash:
+            stored = await loop.run_in_executor(None, self.reuse_result, pdf_path, doc_hash)
+            if stored is not None:
+                return stored
+        task_id = None
+        try:
+            if self.executor is not None:
+                progress_queue = None
+                if progress:
+                    task_id = next(self._task_ids)
+                    self._progress_callbacks[task_id] = progress
+                    progress_queue = self._get_progress_queue()
+                result = await loop.run_in_executor(self.executor, extract_pdf_in_worker,
+                                                    pdf_path, progress_queue, task_id)
+            else:
+                result = await loop.run_in_executor(None, self.extract_pdf, pdf_path, progress)
+        except Exception as e:
+            return {"error": f"Error processing PDF: {str(e)}"}
+        finally:
+            self._progress_callbacks.pop(task_id, None)
+        
+        if "error" in result:
+            return result
+        if progress:
+            progress("index", result["total_pages"], result["total_pages"])
+        # The store and indexes live in this process, so results are persisted here
+        return await loop.run_in_executor(None, self.store_result, pdf_path, result, doc_hash)
+    
+    def process_pdf_sync(self, pdf_path: str, doc_hash: str = None) -> Dict[str, Any]:
         """Process a PDF file and extract text (synchronous version)"""
+        if doc_hash:
+            stored = self.reuse_result(pdf_path, doc_hash)
+            if stored is not None:
+                return stored
+        result = self.extract_pdf(pdf_path)
+        if "error" in result:
+            return result
+        return self.store_result(pdf_path, result, doc_hash)
+    
+    def reuse_result(self, pdf_path: str, doc_hash: str) -> Dict[str, Any]:
+        """Result of an already ingested document bound to a new filename, or None if the content is new"""
+        if self.document_store is None:
+            return None
+        document = self.document_store.get(doc_hash)
+        if document is None:
+            return None
+        
+        self.document_store.bind_filename(pdf_path, doc_hash)
+        # Indexes are keyed by content hash: only the filename binding is added
+        if self.word_index is not None:
+            self.word_index.add_document(doc_hash, os.path.basename(pdf_path), document['pages'])
+        print(f"♻️  {os.path.basename(pdf_path)} matches already ingested document {doc_hash[:12]}, skipping processing")
+        return {
+            "success": True,
+            "filename": os.path.basename(pdf_path),
+            "total_pages": document['total_pages'],
+            "processing_method": document['processing_method'],
+            "detected_languages": document['detected_languages'],
+            "pdf_info": document['pdf_info'],
+            "pages": document['pages'],
+            "document_hash": doc_hash,
+            "deduplicated": True
+        }
+    
+    def extract_pdf(self, pdf_path: str, progress: Callable[[str, int, int], None] = None) -> Dict[str, Any]:
+        """Extract page text (directly or with OCR) without touching the store or indexes"""
         try:
             # Check if file exists
             if not os.path.exists(pdf_path):
                 return {"error": "PDF file not found"}
             
-            # Auto-detect language first
-            detected_languages = self.ocr_processor.auto_detect_language(pdf_path)
-            print(f"Detected languages: {detected_languages}")
-            
-            # Check if it's a scanned PDF
-            is_scanned = self.ocr_processor.is_scanned_pdf(pdf_path)
-            
-            if is_scanned:
-                # Use OCR for scanned PDFs with detected languages
-                text_pages = self.ocr_processor.process_scanned_pdf(pdf_path, detected_languages)
-                processing_method = f"OCR ({'+'.join(detected_languages)})"
-            else:
-                # Extract text directly for text-based PDFs
-                text_pages = self.extract_text_from_pdf(pdf_path)
-                processing_method = "Direct Text Extraction"
+            # One handle for the whole pass: text layer, page routing, language sample, OCR and metadata
+            with fitz.open(pdf_path) as doc:
+                if progress:
+                    progress("detect", 0, 0)
+                page_texts = []
+                page_words: Dict[int, List[PageWord]] = {}  # Word boxes in PDF points per page number
+                page_sizes = {}
+                ocr_page_numbers = []
+                for page in doc:
+                    # One text extraction serves both the page text and its word boxes
+                    textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+                    page_texts.append(page.get_text(textpage=textpage))
+                    page_sizes[page.number + 1] = (page.rect.width, page.rect.height)
+                    # Decide per page: mixed documents keep their text layer where it exists
+                    if page_needs_ocr(page, page_texts[-1]):
+                        ocr_page_numbers.append(page.number)
+                    else:
+                        page_words[page.number + 1] = layer_words(page, textpage)
                 
-                # If direct extraction didn't work well, try OCR as fallback
-                if not text_pages or all(len(page['text']) < 50 for page in text_pages):
-                    print("Direct extraction failed, trying OCR as fallback...")
-                    text_pages = self.ocr_processor.process_scanned_pdf(pdf_path, detected_languages)
-                    processing_method = f"OCR Fallback ({'+'.join(detected_languages)})"
-            
-            # Get basic PDF info
-            pdf_info = self.get_pdf_info(pdf_path)
+                routed = set(ocr_page_numbers)
+                text_page_count = len(page_texts) - len(ocr_page_numbers)
+                print(f"Routing: {text_page_count} pages from the text layer, {len(ocr_page_numbers)} pages to OCR")
+                
+                # Document languages from the text layer; the pages to OCR get theirs from script detection (OSD)
+                # in the OCR pass, on the image it renders anyway, and fall back to these when undecided
+                text_layer = [text for page_num, text in enumerate(page_texts) if page_num not in routed]
+                sample_text = "".join(text[:1000] for text in text_layer[:2])  # First 1000 chars of the first 2 pages
+                text_layer_languages = detect_languages(sample_text, self.ocr_processor.supported_languages)
+                detected_languages = text_layer_languages or list(DEFAULT_OCR_LANGUAGES)
+                
+                if progress:
+                    progress("extract", 0, 0)
+                text_pages = self.text_pages_from_layer(
+                    "" if page_num in routed else text for page_num, text in enumerate(page_texts))
+                
+                if ocr_page_numbers:
+                    # Use OCR for the scanned pages, each with its own languages (the document's if undecided)
+                    ocr_words = {}
+                    ocr_pages = self.ocr_processor.process_scanned_pdf(doc, detected_languages, progress,
+                                                                       ocr_page_numbers, page_words=ocr_words,
+                                                                       detect=True)
+                    if not text_layer_languages:
+                        # Nothing to go by but the scanned pages: the languages most of them were OCR'd with
+                        detected_languages = self.ocr_processor.auto_detect_language(
+                            doc, "", [page['languages'] for page in ocr_pages])
+                    for page_num, words in ocr_words.items():
+                        # OCR boxes are relative to the rendered page image
+                        width, height = page_sizes[page_num]
+                        page_words[page_num] = [(x0 * width, y0 * height, x1 * width, y1 * height, text)
+                                                for text, x0, y0, x1, y1 in words]
+                    # OCR found nothing on a routed page: keep whatever its text layer had
+                    found = {page['page'] for page in ocr_pages}
+                    missed = self.text_pages_from_layer(
+                        text if page_num in routed and page_num + 1 not in found else ""
+                        for page_num, text in enumerate(page_texts))
+                    for page in missed:
+                        page_words[page['page']] = layer_words(doc.load_page(page['page'] - 1))
+                    text_pages = sorted(text_pages + ocr_pages + missed, key=lambda page: page['page'])
+                
+                print(f"Detected languages: {detected_languages}")
+                # Every language some page was OCR'd with
+                languages = '+'.join(dict.fromkeys(
+                    language for page in text_pages if page['method'] == 'ocr' for language in page['languages'])
+                ) or '+'.join(detected_languages)
+                if not ocr_page_numbers:
+                    processing_method = "Direct Text Extraction"
+                elif not text_page_count:
+                    processing_method = f"OCR ({languages})"
+                else:
+                    processing_method = (f"Hybrid (text layer on {text_page_count} pages, "
+                                         f"OCR ({languages}) on {len(ocr_page_numbers)} pages)")
+                
+                # Get basic PDF info
+                pdf_info = self.get_pdf_info(doc, pdf_path)
             
-            return {
+            result = {
                 "success": True,
                 "filename": os.path.basename(pdf_path),
                 "total_pages": len(text_pages),
                 "processing_method": processing_method,
                 "detected_languages": detected_languages,
                 "pdf_info": pdf_info,
-                "pages": text_pages
+                "pages": text_pages,
+                # Popped by store_result: persisted alongside the pages, never part of a response
+                "word_boxes": DocumentWordBoxes.build(text_pages, page_words, page_sizes)
             }
+            return result
         
         except Exception as e:
             return {"error": f"Error processing PDF: {str(e)}"}
     
-    def extract_text_from_pdf(self, pdf_path: str) -> List[Dict[str, Any]]:
-        """Extract text from PDF using PyPDF2"""
-        text_pages = []
+    def store_result(self, pdf_path: str, result: Dict[str, Any], doc_hash: str = None) -> Dict[str, Any]:
+        """Persist extracted pages and make them searchable (doc_hash: content hash if already known)"""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
+            text_pages = result["pages"]
+            word_boxes = result.pop("word_boxes", None)
+            
+            # Persist the extracted/OCR text once so searches never re-parse the PDF
+            if self.document_store is not None:
+                doc_hash = doc_hash or compute_file_hash(pdf_path)
+                self.document_store.put(doc_hash, pdf_path, result)
+                result["document_hash"] = doc_hash
                 
-                for page_num, page in enumerate(pdf_reader.pages):
-                    text = page.extract_text()
-                    if text.strip():  # Only add non-empty pages
-                        text_pages.append({
-                            'page': page_num + 1,
-                            'text': text.strip(),
-                            'confidence': 1.0  # High confidence for direct text extraction
-                        })
+                if self.word_boxes is not None and word_boxes is not None:
+                    self.word_boxes.put(doc_hash, word_boxes)
+                
+                # Build the substring index once, while the pages are at hand
+                if self.suffix_arrays is not None:
+                    self.suffix_arrays.build(doc_hash, text_pages)
+            
+            # Make the new pages visible to corpus-wide search
+            if self.word_index is not None:
+                doc_hash = doc_hash or compute_file_hash(pdf_path)
+                self.word_index.add_document(doc_hash, os.path.basename(pdf_path), text_pages)
+            
+            return result
         
         except Exception as e:
-            print(f"Error extracting text from PDF: {e}")
+            return {"error": f"Error processing PDF: {str(e)}"}
+    
+    def extract_text_from_pdf(self, pdf_path: str) -> List[Dict[str, Any]]:
+        """Extract text from PDF using PyMuPDF"""
+        try:
+            with fitz.open(pdf_path) as doc:
+                return self.text_pages_from_layer([page.get_text() for page in doc])
         
+        except Exception as e:
+            print(f"Error extracting text from PDF: {e}")
+            return []
+    
+    def text_pages_from_layer(self, page_texts: Iterable[str]) -> List[Dict[str, Any]]:
+        """Page entries from the text layer of each page"""
+        text_pages = []
+        for page_num, text in enumerate(page_texts):
+            if text.strip():  # Only add non-empty pages
+                text_pages.append({
+                    'page': page_num + 1,
+                    'text': text.strip(),
+                    'confidence': 1.0,  # High confidence for direct text extraction
+                    'method': 'text'
+                })
         return text_pages
     
-    def get_pdf_info(self, pdf_path: str) -> Dict[str, Any]:
-        """Get basic information about the PDF"""
+    def get_pdf_info(self, pdf: Union[str, "fitz.Document"], pdf_path: str = None) -> Dict[str, Any]:
+        """Get basic information about the PDF (path or open document)"""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
+            with open_pdf(pdf) as doc:
                 info = {
-                    'num_pages': len(pdf_reader.pages),
-                    'file_size': os.path.getsize(pdf_path),
+                    'num_pages': len(doc),
+                    'file_size': os.path.getsize(pdf_path or doc.name),
                     'title': '',
                     'author': '',
                     'subject': '',
@@ -100,12 +372,12 @@ class PDFProcessor:
                 }
                 
                 # Get metadata if available
-                if pdf_reader.metadata:
-                    metadata = pdf_reader.metadata
-                    info['title'] = metadata.get('/Title', '')
-                    info['author'] = metadata.get('/Author', '')
-                    info['subject'] = metadata.get('/Subject', '')
-                    info['creator'] = metadata.get('/Creator', '')
+                if doc.metadata:
+                    metadata = doc.metadata
+                    info['title'] = metadata.get('title') or ''
+                    info['author'] = metadata.get('author') or ''
+                    info['subject'] = metadata.get('subject') or ''
+                    info['creator'] = metadata.get('creator') or ''
                 
                 return info
         
@@ -144,7 +416,62 @@ class PDFProcessor:
         except Exception as e:
             print(f"Error highlighting PDF: {e}")
             return None
-    
+
+    def highlight_stored_matches(self, pdf_path: str, terms: List[str], output_path: str,
+                                 doc_hash: str = None) -> Dict[str, Any]:
+        """Highlight the terms using the stored text and word boxes, touching only pages with hits"""
+        try:
+            if self.document_store is None:
+                return {"error": "No document store"}
+            doc_hash = doc_hash or self.document_store.resolve_hash(pdf_path)
+            document = self.document_store.get(doc_hash) if doc_hash else None
+            if document is None:
+                return {"error": "PDF has not been processed"}
+
+            # Hits from the suffix array over the stored text: pages without one are never loaded
+            suffix_array = (self.suffix_arrays.get(doc_hash, document['pages']) if self.suffix_arrays is not None
+                            else DocumentSuffixArray.build(document['pages']))
+            page_spans: Dict[int, List[Tuple[int, int]]] = {}
+            for term in terms:
+                for page_number, spans in suffix_array.locate(term).items():
+                    page_spans.setdefault(page_number, []).extend(spans)
+            boxes = self.word_boxes.get(doc_hash) if self.word_boxes is not None else None
+
+            # Annotate a copy and append only the changed objects instead of rewriting the whole file
+            shutil.copyfile(pdf_path, output_path)
+            matches = 0
+            with fitz.open(output_path) as doc:
+                for page_number in sorted(page_spans):
+                    page = doc.load_page(page_number - 1)
+                    rects = [rect for start, end in page_spans[page_number] for rect in
+                             (boxes.rects(page_number, start, end) if boxes is not None else [])]
+                    if rects and page.rotation:
+                        # Stored boxes are as displayed; annotations take unrotated page coordinates
+                        matrix = page.derotation_matrix
+                        rects = [fitz.Rect(rect) * matrix for rect in rects]
+                    if not rects:
+                        # No stored boxes for this page (e.g. ingested before they were kept): search it alone
+                        rects = [rect for term in terms for rect in page.search_for(term)]
+                    if not rects:
+                        continue
+                    # One annotation per page covering every hit; its appearance is built once, in the default yellow
+                    page.add_highlight_annot(rects)
+                    matches += len(page_spans[page_number])
+
+                data = None
+                if doc.can_save_incrementally():
+                    doc.saveIncr()
+                else:
+                    data = doc.tobytes()  # Repaired on open: must be rewritten whole
+            if data is not None:
+                with open(output_path, 'wb') as file:
+                    file.write(data)
+
+            return {"pages": sorted(page_spans), "matches": matches, "output_path": output_path}
+
+        except Exception as e:
+            return {"error": f"Error highlighting PDF: {str(e)}"}
+
     def get_page_as_image(self, pdf_path: str, page_num: int, zoom: float = 2.0) -> bytes:
         """Get a specific page as image bytes"""
         try:
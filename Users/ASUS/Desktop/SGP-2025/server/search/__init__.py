@@ -0,0 +1 @@
+# Search index package for PDF search application 
\ No newline at end of file
@@ -0,0 +1,83 @@
+from typing import List, Dict, Any, Optional, Set
+
+
+class DocumentRegistry:
+    def __init__(self):
+        """Track dense document ids and which uploaded filenames point at each document"""
+        self.doc_hashes: List[str] = []           # doc_id -> content hash
+        self._doc_ids: Dict[str, int] = {}        # content hash -> live doc_id
+        self._doc_filenames: Dict[int, Set[str]] = {}
+        self._filenames: Dict[str, int] = {}      # filename -> doc_id
+
+    @property
+    def live_count(self) -> int:
+        return len(self._doc_filenames)
+
+    def lookup(self, doc_hash: str) -> Optional[int]:
+        """Get the live doc_id for a content hash"""
+        doc_id = self._doc_ids.get(doc_hash)
+        return doc_id if doc_id in self._doc_filenames else None
+
+    def register(self, doc_hash: str) -> int:
+        """Allocate a new doc_id for a content hash"""
+        doc_id = len(self.doc_hashes)
+        self.doc_hashes.append(doc_hash)
+        self._doc_ids[doc_hash] = doc_id
+        self._doc_filenames[doc_id] = set()
+        return doc_id
+
+    def bind(self, filename: str, doc_id: int) -> Optional[int]:
+        """Point a filename at a document; returns a doc_id left with no filenames, if any"""
+        previous = self._filenames.get(filename)
+        if previous == doc_id:
+            return None
+        self._filenames[filename] = doc_id
+        self._doc_filenames[doc_id].add(filename)
+        if previous is None:
+            return None
+        return self._release(previous, filename)
+
+    def unbind(self, filename: str) -> Optional[int]:
+        """Remove a filename; returns its doc_id if no other filename refers to that document"""
+        doc_id = self._filenames.pop(filename, None)
+        if doc_id is None:
+            return None
+        return self._release(doc_id, filename)
+
+    def _release(self, doc_id: int, filename: str) -> Optional[int]:
+        filenames = self._doc_filenames.get(doc_id)
+        if filenames is None:
+            return None
+        filenames.discard(filename)
+        if filenames:
+            return None
+        del self._doc_filenames[doc_id]
+        return doc_id
+
+    def forget(self, doc_id: int) -> None:
+        """Drop the hash -> id mapping of a removed document once its data is gone"""
+        doc_hash = self.doc_hashes[doc_id]
+        if self._doc_ids.get(doc_hash) == doc_id:
+            del self._doc_ids[doc_hash]
+
+    def filenames(self, doc_id: int) -> List[str]:
+        return sorted(self._doc_filenames.get(doc_id, ()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialisable state for saving alongside an index"""
+        return {
+            'doc_hashes': self.doc_hashes,
+            'filenames': self._filenames
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DocumentRegistry':
+        registry = cls()
+        registry.doc_hashes = list(data['doc_hashes'])
+        for filename, doc_id in data['filenames'].items():
+            if doc_id not in registry._doc_filenames:
+                registry._doc_filenames[doc_id] = set()
+                registry._doc_ids[registry.doc_hashes[doc_id]] = doc_id
+            registry._doc_filenames[doc_id].add(filename)
+            registry._filenames[filename] = doc_id
+        return registry
@@ -0,0 +1,206 @@
+import threading
+from array import array
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+from search.document_registry import DocumentRegistry
+from search.normalization import tokenize
+
+# Each posting is stored as 4 consecutive uint32 values in a per-term array:
+# (doc_id, page, token position within the page, character offset in the page text)
+POSTING_STRIDE = 4
+
+# Bit layout used to pack (doc_id, page, position) into one int64 for set operations
+_POSITION_BITS = 20
+_PAGE_BITS = 20
+_PAGE_MASK = (1 << _PAGE_BITS) - 1
+
+# Rewrite posting arrays once this share of indexed documents has been removed
+COMPACTION_RATIO = 0.25
+
+
+def _pack(doc_id: int, page: int, position: int) -> int:
+    """Sortable int64 key of a posting: doc_id, then page, then position"""
+    return (doc_id << (_PAGE_BITS + _POSITION_BITS)) | (page << _POSITION_BITS) | position
+
+
+def _intersect(candidates: np.ndarray, sorted_keys: np.ndarray) -> np.ndarray:
+    """Candidates (sorted, distinct) that occur in a sorted key array"""
+    if len(candidates) * 4 > len(sorted_keys):
+        # Comparable sizes: one linear merge (a stable sort of two sorted runs) beats a binary search each
+        merged = np.concatenate((candidates, sorted_keys))
+        merged.sort(kind='stable')
+        return merged[:-1][merged[1:] == merged[:-1]]
+    found = np.minimum(np.searchsorted(sorted_keys, candidates), len(sorted_keys) - 1)
+    return candidates[sorted_keys[found] == candidates]
+
+
+class InvertedIndex:
+    def __init__(self):
+        """Initialize an in-process word index over every ingested document"""
+        self._lock = threading.RLock()
+        self._postings: Dict[str, array] = {}
+        # Packed key of every posting, parallel to _postings; ascending, since doc_ids only grow
+        self._keys: Dict[str, array] = {}
+        self._registry = DocumentRegistry()
+        self._deleted: Set[int] = set()
+
+    @property
+    def document_count(self) -> int:
+        with self._lock:
+            return self._registry.live_count
+
+    @property
+    def term_count(self) -> int:
+        with self._lock:
+            return len(self._postings)
+
+    def add_document(self, doc_hash: str, filename: str, pages: List[Dict[str, Any]]) -> int:
+        """Index the pages of a document (a no-op apart from the filename binding if already indexed)"""
+        with self._lock:
+            doc_id = self._registry.lookup(doc_hash)
+            if doc_id is None:
+                doc_id = self._registry.register(doc_hash)
+                self._index_pages(doc_id, pages)
+            self._tombstone(self._registry.bind(filename, doc_id))
+            return doc_id
+
+    def _index_pages(self, doc_id: int, pages: List[Dict[str, Any]]) -> None:
+        for page in sorted(pages, key=lambda page: page['page']):
+            for position, (token, offset) in enumerate(tokenize(page['text'])):
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = array('I')
+                    self._keys[token] = array('q')
+                postings.extend((doc_id, page['page'], position, offset))
+                self._keys[token].append(_pack(doc_id, page['page'], position))
+
+    def _tombstone(self, doc_id: Optional[int]) -> None:
+        """Hide a document nothing points at any more, compacting once enough have piled up"""
+        if doc_id is None:
+            return
+        self._deleted.add(doc_id)
+        if len(self._deleted) > COMPACTION_RATIO * len(self._registry.doc_hashes):
+            self._compact()
+
+    def remove_filename(self, filename: str) -> None:
+        """Drop a filename from the index, removing its document if nothing else refers to it"""
+        with self._lock:
+            self._tombstone(self._registry.unbind(filename))
+
+    def _compact(self) -> None:
+        """Rewrite posting arrays without tombstoned documents"""
+        deleted = np.fromiter(self._deleted, dtype=np.int64)
+        for token in list(self._postings):
+            keys = np.frombuffer(self._keys[token], dtype=np.int64)
+            keep = ~np.isin(keys >> (_PAGE_BITS + _POSITION_BITS), deleted)
+            if keep.all():
+                continue
+            if keep.any():
+                postings = np.frombuffer(self._postings[token], dtype=np.uint32).reshape(-1, POSTING_STRIDE)
+                self._postings[token] = array('I', postings[keep].tobytes())
+                self._keys[token] = array('q', keys[keep].tobytes())
+            else:
+                del self._postings[token]
+                del self._keys[token]
+        for doc_id in self._deleted:
+            self._registry.forget(doc_id)
+        self._deleted.clear()
+
+    def _view(self, token: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Sorted packed keys and (n, 4) postings of a token, viewed in place: only valid under the lock"""
+        postings = self._postings.get(token)
+        if postings is None:
+            return None
+        keys = np.frombuffer(self._keys[token], dtype=np.int64)
+        return keys, np.frombuffer(postings, dtype=np.uint32).reshape(-1, POSTING_STRIDE)
+
+    def search(self, query: str, phrase: bool = True, limit: int = 20) -> Dict[str, Any]:
+        """Find pages matching a term or phrase query across the whole corpus"""
+        terms = [token for token, _ in tokenize(query)]
+        with self._lock:
+            # The views into the posting arrays must be gone before ingestion may grow them again
+            return self._search(query, terms, phrase, limit)
+
+    def _search(self, query: str, terms: List[str], phrase: bool, limit: int) -> Dict[str, Any]:
+        views = [self._view(term) for term in terms]
+        if not terms or any(view is None for view in views):
+            return {"results": [], "total_hits": 0, "query": query, "terms": terms}
+        keys = [term_keys for term_keys, _ in views]
+        # Rarest term first, so the candidates only shrink as the longer posting lists are checked
+        by_size = sorted(range(len(terms)), key=lambda i: len(keys[i]))
+        rarest = by_size[0]
+
+        if len(terms) == 1 or phrase:
+            # Positions where the phrase would start, from the rarest term's postings
+            # (a shift past position 0 borrows from the page bits, a key no posting has, so the intersection drops it)
+            starts = keys[rarest] - rarest if rarest else keys[rarest]
+            for i in by_size[1:]:
+                starts = _intersect(starts + i, keys[i]) - i
+            if not len(starts):
+                return {"results": [], "total_hits": 0, "query": query, "terms": terms}
+            # Still sorted, so each page's matches are one run
+            page_keys = starts >> _POSITION_BITS
+            run_starts = np.flatnonzero(np.r_[True, page_keys[1:] != page_keys[:-1]])
+            unique_keys = page_keys[run_starts]
+            counts = np.diff(np.r_[run_starts, len(starts)])
+
+            def page_offsets(j: int) -> List[int]:
+                rows = np.searchsorted(keys[0], starts[run_starts[j]:run_starts[j] + counts[j]])
+                return views[0][1][rows, 3].tolist()
+        else:
+            # All terms on the same page, in any order: the rarest term's pages that every other term has
+            page_keys = keys[rarest] >> _POSITION_BITS
+            unique_keys = page_keys[np.r_[True, page_keys[1:] != page_keys[:-1]]]
+            for i in by_size[1:]:
+                first = np.minimum(np.searchsorted(keys[i], unique_keys << _POSITION_BITS), len(keys[i]) - 1)
+                unique_keys = unique_keys[(keys[i][first] >> _POSITION_BITS) == unique_keys]
+            # Each term's postings on those pages, as [low, high) row ranges
+            ranges = [(np.searchsorted(keys[i], unique_keys << _POSITION_BITS),
+                       np.searchsorted(keys[i], (unique_keys + 1) << _POSITION_BITS)) for i in range(len(terms))]
+            counts = sum(high - low for low, high in ranges)
+
+            def page_offsets(j: int) -> List[int]:
+                return [offset for (_, postings), (low, high) in zip(views, ranges)
+                        for offset in postings[low[j]:high[j], 3].tolist()]
+
+        live = np.arange(len(unique_keys))
+        if self._deleted:
+            # Tombstoned documents are dropped per page, not per posting
+            live = live[~np.isin(unique_keys >> _PAGE_BITS, np.fromiter(self._deleted, dtype=np.int64))]
+        if not len(live):
+            return {"results": [], "total_hits": 0, "query": query, "terms": terms}
+
+        # Most matches first, then corpus order
+        order = live[np.lexsort((unique_keys[live], -counts[live]))[:limit]]
+        results = []
+        for j in order:
+            doc_id = int(unique_keys[j] >> _PAGE_BITS)
+            results.append({
+                'doc_hash': self._registry.doc_hashes[doc_id],
+                'filenames': self._registry.filenames(doc_id),
+                'page': int(unique_keys[j] & _PAGE_MASK),
+                'match_count': int(counts[j]),
+                'offsets': page_offsets(j)
+            })
+
+        return {
+            "results": results,
+            "total_hits": int(counts[live].sum()),
+            "total_pages": int(len(live)),
+            "query": query,
+            "terms": terms,
+            "search_type": "phrase" if phrase and len(terms) > 1 else "term"
+        }
+
+    def build_from_store(self, document_store) -> None:
+        """Index every document bound to an uploaded filename in the document store"""
+        for filename, doc_hash in document_store.filename_bindings().items():
+            document = document_store.get(doc_hash)
+            if document is None:
+                continue
+            with self._lock:
+                # An upload may have rebound the filename while the store was being read
+                if document_store.filename_bindings().get(filename) == doc_hash:
+                    self.add_document(doc_hash, filename, document['pages'])
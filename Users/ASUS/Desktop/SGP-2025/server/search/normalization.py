@@ -0,0 +1,70 @@
+import re
+import unicodedata
+from typing import List, Tuple
+
+import numpy as np
+
+# Zero-width space, ZWNJ, ZWJ and BOM show up inside OCR'd Gujarati words
+ZERO_WIDTH_CHARS = '\u200B\u200C\u200D\uFEFF'
+
+# Python's \w stops at Indic vowel signs and viramas, so include the whole
+# Devanagari..Malayalam range explicitly (minus the danda punctuation marks)
+TOKEN_PATTERN = re.compile(r"[\w\u0900-\u0963\u0966-\u0D7F\u200B-\u200D\uFEFF]+", re.UNICODE)
+
+# OCR cleanup rewrites ASCII digits as Gujarati digits; fold both to ASCII
+DIGIT_TRANSLATION = str.maketrans({
+    **{chr(0x0AE6 + i): str(i) for i in range(10)},  # Gujarati
+    **{chr(0x0966 + i): str(i) for i in range(10)},  # Devanagari
+})
+
+_ZERO_WIDTH_TRANSLATION = str.maketrans('', '', ZERO_WIDTH_CHARS)
+_ZERO_WIDTH_CODES = np.array([ord(ch) for ch in ZERO_WIDTH_CHARS], dtype=np.uint32)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for matching: NFC, no zero-width characters, case-folded, ASCII digits"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFC', text)
+    text = text.translate(_ZERO_WIDTH_TRANSLATION)
+    return text.casefold().translate(DIGIT_TRANSLATION)
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """Split text into normalized tokens with their character offsets in the original text"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text or ''):
+        token = normalize_text(match.group())
+        if token:
+            tokens.append((token, match.start()))
+    return tokens
+
+
+def fold_with_offsets(text: str) -> Tuple[str, np.ndarray]:
+    """Strip zero-width characters and case-fold, keeping each output character's offset in the original text"""
+    text = text or ''
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    kept = np.flatnonzero(~np.isin(codes, _ZERO_WIDTH_CODES))
+    stripped = text.translate(_ZERO_WIDTH_TRANSLATION)
+    folded = stripped.casefold()
+    if len(folded) == len(stripped):
+        return folded, kept.astype(np.int32)
+
+    # Rare: case folding expanded a character (e.g. 'ß' -> 'ss'), map each piece back
+    chars = []
+    offsets = []
+    for offset in kept:
+        piece = text[offset].casefold()
+        chars.append(piece)
+        offsets.extend([offset] * len(piece))
+    return ''.join(chars), np.array(offsets, dtype=np.int32)
+
+
+def fold_query(query: str) -> str:
+    """Normalize a query the same way as fold_with_offsets"""
+    return (query or '').translate(_ZERO_WIDTH_TRANSLATION).casefold()
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query for cache keys: NFC, trimmed, single spaces"""
+    return ' '.join(unicodedata.normalize('NFC', query or '').split())
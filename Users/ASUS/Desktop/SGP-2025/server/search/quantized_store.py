@@ -0,0 +1,95 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Supported storage precisions for L2-normalised embeddings
+PRECISIONS = ('float32', 'float16', 'int8')
+
+# Rows de-quantized per block while scoring (bounds the temporary float32 buffer)
+SCORE_BLOCK_SIZE = 4096
+
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalise rows so a dot product is the cosine similarity"""
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+class QuantizedEmbeddings:
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray] = None):
+        """Compact, L2-normalised embedding matrix (float32, float16, or int8 with a per-vector scale)"""
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def from_embeddings(cls, embeddings: np.ndarray, precision: str = 'int8') -> 'QuantizedEmbeddings':
+        """Normalise and quantize a float embedding matrix"""
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported precision '{precision}', expected one of {PRECISIONS}")
+        normalized = normalize_embeddings(embeddings)
+        if precision == 'float32':
+            return cls(normalized)
+        if precision == 'float16':
+            return cls(normalized.astype(np.float16))
+
+        # Symmetric int8: each row uses its own scale so small and large components keep precision
+        scales = np.abs(normalized).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        codes = np.clip(np.rint(normalized / scales[:, None]), -127, 127).astype(np.int8)
+        return cls(codes, scales)
+
+    @property
+    def precision(self) -> str:
+        return str(self.codes.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def dequantize(self) -> np.ndarray:
+        """Approximate float32 (normalised) embeddings"""
+        vectors = self.codes.astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[:, None]
+        return vectors
+
+    def scores(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against every row (one matrix-vector product per block)"""
+        query = normalize_embeddings(query_embedding)[0]
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), SCORE_BLOCK_SIZE):
+            block = self.codes[start:start + SCORE_BLOCK_SIZE]
+            scores[start:start + len(block)] = block.astype(np.float32, copy=False) @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def top_k(self, query_embedding: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices and scores of the k most similar rows, best first"""
+        return top_k_indices(self.scores(query_embedding), k)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Select the k largest scores with argpartition (O(n)) and sort only those"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=scores.dtype)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return top, scores[top]
+
+
+def recall_at_k(reference: np.ndarray, store: QuantizedEmbeddings, queries: np.ndarray, k: int = 10) -> float:
+    """Average overlap between the store's top-k and the exact float32 top-k"""
+    reference = normalize_embeddings(reference)
+    queries = normalize_embeddings(queries)
+    overlaps = []
+    for query in queries:
+        exact, _ = top_k_indices(reference @ query, k)
+        approx, _ = store.top_k(query, k)
+        overlaps.append(len(set(exact.tolist()) & set(approx.tolist())) / max(1, len(exact)))
+    return float(np.mean(overlaps)) if overlaps else 1.0
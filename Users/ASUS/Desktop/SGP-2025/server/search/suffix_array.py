@@ -0,0 +1,208 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from search.normalization import fold_with_offsets, fold_query
+
+# Placed between pages so no match can span a page break
+PAGE_SEPARATOR = '\x00'
+
+
+def build_suffix_array(text: str) -> np.ndarray:
+    """Build a suffix array by prefix doubling (O(n log^2 n), vectorised with NumPy)"""
+    n = len(text)
+    if n == 0:
+        return np.zeros(0, dtype=np.int32)
+
+    rank = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    k = 1
+    while True:
+        # Sort by (rank of first k chars, rank of next k chars)
+        second = np.full(n, -1, dtype=np.int64)
+        second[:n - k] = rank[k:]
+        suffix_array = np.lexsort((second, rank))
+
+        sorted_first = rank[suffix_array]
+        sorted_second = second[suffix_array]
+        changed = (sorted_first[1:] != sorted_first[:-1]) | (sorted_second[1:] != sorted_second[:-1])
+        new_rank = np.empty(n, dtype=np.int64)
+        new_rank[suffix_array] = np.concatenate(([0], np.cumsum(changed)))
+        rank = new_rank
+
+        # Every suffix has a distinct rank: the order is final
+        if rank[suffix_array[-1]] == n - 1 or k >= n:
+            return suffix_array.astype(np.int32)
+        k *= 2
+
+
+class DocumentSuffixArray:
+    def __init__(self, text: str, suffix_array: np.ndarray, offsets: np.ndarray,
+                 page_starts: np.ndarray, page_numbers: np.ndarray):
+        """Suffix array over the folded text of every page of one document"""
+        self.text = text
+        self.suffix_array = suffix_array
+        self.offsets = offsets              # folded char -> char offset in the original page text
+        self.page_starts = page_starts      # start of each page in the folded text
+        self.page_numbers = page_numbers
+
+    @classmethod
+    def build(cls, pages: List[Dict[str, Any]]) -> 'DocumentSuffixArray':
+        """Build the suffix array for a document's stored pages"""
+        parts = []
+        offsets = []
+        page_starts = []
+        position = 0
+        for page in pages:
+            folded, page_offsets = fold_with_offsets(page['text'])
+            page_starts.append(position)
+            parts.append(folded + PAGE_SEPARATOR)
+            offsets.append(page_offsets)
+            offsets.append(np.array([len(page['text'])], dtype=np.int32))
+            position += len(folded) + 1
+
+        text = ''.join(parts)
+        return cls(
+            text,
+            build_suffix_array(text),
+            np.concatenate(offsets) if offsets else np.zeros(0, dtype=np.int32),
+            np.array(page_starts, dtype=np.int64),
+            np.array([page['page'] for page in pages], dtype=np.int32)
+        )
+
+    def save(self, path: str) -> None:
+        """Save to an .npz file (written to a temp name first, then renamed)"""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            text=np.array(self.text),
+            suffix_array=self.suffix_array,
+            offsets=self.offsets,
+            page_starts=self.page_starts,
+            page_numbers=self.page_numbers
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'DocumentSuffixArray':
+        """Load a suffix array saved with save()"""
+        with np.load(path) as data:
+            suffix_array = data['suffix_array']
+            # NumPy strings drop trailing NULs: restore the separator ending the last page
+            text = str(data['text'])
+            text += PAGE_SEPARATOR * (len(suffix_array) - len(text))
+            return cls(
+                text,
+                suffix_array,
+                data['offsets'],
+                data['page_starts'],
+                data['page_numbers']
+            )
+
+    def _bounds(self, query: str) -> Tuple[int, int]:
+        """Binary search for the range of suffixes starting with the query (O(m log n))"""
+        text = self.text
+        suffix_array = self.suffix_array
+        m = len(query)
+
+        lo, hi = 0, len(suffix_array)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = suffix_array[mid]
+            if text[start:start + m] < query:
+                lo = mid + 1
+            else:
+                hi = mid
+        first = lo
+
+        hi = len(suffix_array)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = suffix_array[mid]
+            if text[start:start + m] <= query:
+                lo = mid + 1
+            else:
+                hi = mid
+        return first, lo
+
+    def count(self, query: str) -> int:
+        """Count occurrences of a substring"""
+        query = fold_query(query)
+        if not query:
+            return 0
+        first, last = self._bounds(query)
+        return last - first
+
+    def locate(self, query: str) -> Dict[int, List[Tuple[int, int]]]:
+        """Find non-overlapping occurrences, as (start, end) offsets into each original page text"""
+        query = fold_query(query)
+        if not query:
+            return {}
+        first, last = self._bounds(query)
+        if first == last:
+            return {}
+
+        starts = np.sort(self.suffix_array[first:last])
+        page_indexes = np.searchsorted(self.page_starts, starts, side='right') - 1
+        original_starts = self.offsets[starts]
+        original_ends = self.offsets[starts + len(query) - 1] + 1
+
+        matches: Dict[int, List[Tuple[int, int]]] = {}
+        previous_end = {}
+        for page_index, start, end in zip(page_indexes.tolist(), original_starts.tolist(), original_ends.tolist()):
+            # Same semantics as re.finditer: skip matches overlapping the previous one
+            if start < previous_end.get(page_index, 0):
+                continue
+            previous_end[page_index] = end
+            matches.setdefault(int(self.page_numbers[page_index]), []).append((start, end))
+        return matches
+
+
+class SuffixArrayCache:
+    def __init__(self, cache_dir: str, max_in_memory: int = 32):
+        """Build-once, on-disk cache of document suffix arrays with a small in-memory LRU"""
+        self.cache_dir = cache_dir
+        self.max_in_memory = max_in_memory
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._arrays: 'OrderedDict[str, DocumentSuffixArray]' = OrderedDict()
+
+    def _path(self, doc_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{doc_hash}.npz")
+
+    def _remember(self, doc_hash: str, suffix_array: DocumentSuffixArray) -> None:
+        with self._lock:
+            self._arrays[doc_hash] = suffix_array
+            self._arrays.move_to_end(doc_hash)
+            while len(self._arrays) > self.max_in_memory:
+                self._arrays.popitem(last=False)
+
+    def build(self, doc_hash: str, pages: List[Dict[str, Any]]) -> DocumentSuffixArray:
+        """Build and persist the suffix array for a document"""
+        suffix_array = DocumentSuffixArray.build(pages)
+        suffix_array.save(self._path(doc_hash))
+        self._remember(doc_hash, suffix_array)
+        return suffix_array
+
+    def get(self, doc_hash: str, pages: Optional[List[Dict[str, Any]]] = None) -> Optional[DocumentSuffixArray]:
+        """Get a document's suffix array from memory or disk, building it from pages if missing"""
+        with self._lock:
+            suffix_array = self._arrays.get(doc_hash)
+            if suffix_array is not None:
+                self._arrays.move_to_end(doc_hash)
+                return suffix_array
+
+        path = self._path(doc_hash)
+        if os.path.exists(path):
+            try:
+                suffix_array = DocumentSuffixArray.load(path)
+                self._remember(doc_hash, suffix_array)
+                return suffix_array
+            except Exception as e:
+                print(f"Error loading suffix array {path}: {e}")
+
+        if pages is None:
+            return None
+        return self.build(doc_hash, pages)
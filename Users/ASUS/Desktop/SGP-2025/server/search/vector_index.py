@@ -0,0 +1,334 @@
+import json
+import os
+import threading
+from array import array
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+from search.document_registry import DocumentRegistry
+from storage.document_store import write_json_atomic
+
+# Below this many live vectors a brute-force scan is both exact and fast enough
+MIN_TRAIN_SIZE = 4096
+
+# Re-cluster once the index has grown this many times past the size it was trained on
+RETRAIN_GROWTH = 4
+
+# Rewrite the vector matrix once this share of rows belongs to removed documents
+COMPACTION_RATIO = 0.25
+
+# Rows scored per chunk when assigning vectors to centroids (bounds temporary memory)
+ASSIGN_CHUNK_SIZE = 65536
+
+
+def _save_npy_atomic(path: str, array: np.ndarray) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by inner product) for every row"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_SIZE):
+        chunk = vectors[start:start + ASSIGN_CHUNK_SIZE]
+        assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def _spherical_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        # Re-seed empty clusters from random points
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+class VectorIndex:
+    def __init__(self, nprobe: int = 8, seed: int = 0):
+        """Initialize an IVF (inverted file) index over page embeddings for cosine top-k search"""
+        self.nprobe = nprobe
+        self.seed = seed
+        self._lock = threading.RLock()
+        self._registry = DocumentRegistry()
+        self._deleted: Set[int] = set()
+
+        self._dim: Optional[int] = None
+        self._size = 0
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._doc_ids = np.zeros(0, dtype=np.int32)
+        self._pages = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+
+        # IVF state, empty until enough vectors exist to train on
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists: List[array] = []
+        self._trained_size = 0
+
+        # Vector rows already on disk as (start, end, file name) segments; a save only writes new rows
+        self._segments: List[Tuple[int, int, str]] = []
+        self._save_count = 0
+
+    @property
+    def document_count(self) -> int:
+        with self._lock:
+            return self._registry.live_count
+
+    @property
+    def vector_count(self) -> int:
+        with self._lock:
+            return int(self._alive[:self._size].sum())
+
+    def contains(self, doc_hash: str) -> bool:
+        with self._lock:
+            return self._registry.lookup(doc_hash) is not None
+
+    def _reserve(self, extra: int) -> None:
+        """Grow the backing arrays geometrically so inserts are amortised O(1)"""
+        needed = self._size + extra
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        vectors = np.zeros((capacity, self._dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        for name, dtype in (('_doc_ids', np.int32), ('_pages', np.int32), ('_assignments', np.int32), ('_alive', bool)):
+            grown = np.zeros(capacity, dtype=dtype)
+            grown[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, grown)
+
+    def add_document(self, doc_hash: str, filename: str, page_numbers: List[int], embeddings: np.ndarray) -> int:
+        """Insert a document's page embeddings (only the filename binding changes if already indexed)"""
+        with self._lock:
+            doc_id = self._registry.lookup(doc_hash)
+            if doc_id is None and len(page_numbers):
+                vectors = _normalize_rows(embeddings)
+                if self._dim is None:
+                    self._dim = vectors.shape[1]
+                    self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+                elif vectors.shape[1] != self._dim:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self._dim}")
+
+                doc_id = self._registry.register(doc_hash)
+                self._reserve(len(vectors))
+                rows = slice(self._size, self._size + len(vectors))
+                self._vectors[rows] = vectors
+                self._doc_ids[rows] = doc_id
+                self._pages[rows] = page_numbers
+                self._alive[rows] = True
+                if self._centroids is not None:
+                    assignments = _assign(vectors, self._centroids)
+                    self._assignments[rows] = assignments
+                    for row, cluster in enumerate(assignments.tolist(), start=self._size):
+                        self._lists[cluster].append(row)
+                self._size += len(vectors)
+                self._maybe_train()
+            if doc_id is None:
+                # Nothing to index: the filename no longer points at its old pages either
+                self._tombstone(self._registry.unbind(filename))
+                return -1
+            self._tombstone(self._registry.bind(filename, doc_id))
+            return doc_id
+
+    def remove_filename(self, filename: str) -> None:
+        """Drop a filename, removing its vectors if no other filename refers to the document"""
+        with self._lock:
+            self._tombstone(self._registry.unbind(filename))
+
+    def _tombstone(self, doc_id: Optional[int]) -> None:
+        if doc_id is None:
+            return
+        self._deleted.add(doc_id)
+        self._alive[:self._size][self._doc_ids[:self._size] == doc_id] = False
+        dead = self._size - int(self._alive[:self._size].sum())
+        if dead > COMPACTION_RATIO * self._size:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop rows of removed documents and rebuild the inverted lists"""
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._vectors = self._vectors[keep].copy()
+        self._doc_ids = self._doc_ids[keep].copy()
+        self._pages = self._pages[keep].copy()
+        self._assignments = self._assignments[keep].copy()
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._size = len(keep)
+        # Row numbers changed: the next save rewrites the vectors
+        self._segments = []
+        for doc_id in self._deleted:
+            self._registry.forget(doc_id)
+        self._deleted.clear()
+        if self._centroids is not None:
+            self._rebuild_lists()
+
+    def _maybe_train(self) -> None:
+        live = int(self._alive[:self._size].sum())
+        if live < MIN_TRAIN_SIZE:
+            return
+        if self._centroids is not None and live < RETRAIN_GROWTH * self._trained_size:
+            return
+        self.train()
+
+    def train(self) -> None:
+        """(Re)cluster the live vectors into ~4*sqrt(n) inverted lists"""
+        with self._lock:
+            live_rows = np.flatnonzero(self._alive[:self._size])
+            if not len(live_rows):
+                return
+            n_clusters = int(min(4096, max(1, 4 * np.sqrt(len(live_rows)))))
+            rng = np.random.default_rng(self.seed)
+            sample_size = min(len(live_rows), 64 * n_clusters)
+            sample = self._vectors[rng.choice(live_rows, sample_size, replace=False)]
+            self._centroids = _spherical_kmeans(sample, min(n_clusters, sample_size), seed=self.seed)
+            self._assignments[:self._size] = _assign(self._vectors[:self._size], self._centroids)
+            self._trained_size = len(live_rows)
+            self._rebuild_lists()
+
+    def _rebuild_lists(self) -> None:
+        order = np.argsort(self._assignments[:self._size], kind='stable')
+        bounds = np.searchsorted(self._assignments[:self._size][order], np.arange(len(self._centroids) + 1))
+        self._lists = [array('I', order[bounds[i]:bounds[i + 1]].astype(np.uint32).tobytes())
+                       for i in range(len(self._centroids))]
+
+    def search(self, query_embedding: np.ndarray, k: int = 10, nprobe: int = None) -> List[Dict[str, Any]]:
+        """Top-k pages by cosine similarity across the corpus"""
+        with self._lock:
+            if self._size == 0:
+                return []
+            query = _normalize_rows(np.asarray(query_embedding).reshape(1, -1))[0]
+
+            if self._centroids is None:
+                candidates = np.arange(self._size)
+            else:
+                nprobe = min(nprobe or self.nprobe, len(self._centroids))
+                probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+                candidates = np.concatenate([np.frombuffer(self._lists[p], dtype=np.uint32) for p in probes]).astype(np.int64)
+            candidates = candidates[self._alive[candidates]]
+            if not len(candidates):
+                return []
+
+            scores = self._vectors[candidates] @ query
+            k = min(k, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            results = []
+            for idx in top:
+                row = candidates[idx]
+                doc_id = int(self._doc_ids[row])
+                results.append({
+                    'doc_hash': self._registry.doc_hashes[doc_id],
+                    'filenames': self._registry.filenames(doc_id),
+                    'page': int(self._pages[row]),
+                    'score': float(scores[idx])
+                })
+            return results
+
+    def save(self, index_dir: str) -> None:
+        """Save the index: rows added since the last save as a new vector segment, per-row arrays and bookkeeping"""
+        with self._lock:
+            os.makedirs(index_dir, exist_ok=True)
+            segments: List[Tuple[int, int, Optional[str]]] = list(self._segments)
+            saved = segments[-1][1] if segments else 0
+            if self._size > saved:
+                segments.append((saved, self._size, None))
+            # Merge the newest segment into the previous one while it is at least as large: every row
+            # is rewritten O(log n) times in total and the segment count stays logarithmic
+            while len(segments) >= 2 and segments[-1][1] - segments[-1][0] >= segments[-2][1] - segments[-2][0]:
+                end = segments.pop()[1]
+                start = segments.pop()[0]
+                segments.append((start, end, None))
+
+            self._save_count += 1
+            written = []
+            for start, end, name in segments:
+                if name is None:
+                    name = f"vectors-{self._save_count}-{start}-{end}.npy"
+                    _save_npy_atomic(os.path.join(index_dir, name), self._vectors[start:end])
+                written.append((start, end, name))
+
+            # Small per-row arrays are rewritten whole (a few bytes per page against ~3 KB of vector)
+            rows_name = f"rows-{self._save_count}.npz"
+            rows_path = os.path.join(index_dir, rows_name)
+            tmp_path = f"{rows_path}.{os.getpid()}.tmp.npz"
+            np.savez(
+                tmp_path,
+                doc_ids=self._doc_ids[:self._size],
+                pages=self._pages[:self._size],
+                alive=self._alive[:self._size],
+                assignments=self._assignments[:self._size],
+                centroids=self._centroids if self._centroids is not None else np.zeros((0, 0), dtype=np.float32)
+            )
+            os.replace(tmp_path, rows_path)
+            # The bookkeeping names the files of this save, so it is written last
+            write_json_atomic(os.path.join(index_dir, 'documents.json'), {
+                'registry': self._registry.to_dict(),
+                'deleted': sorted(self._deleted),
+                'trained_size': self._trained_size,
+                'nprobe': self.nprobe,
+                'segments': [list(segment) for segment in written],
+                'rows': rows_name,
+                'save_count': self._save_count
+            })
+            self._segments = written
+
+            # Files of earlier saves
+            current = {name for _, _, name in written} | {rows_name}
+            for name in os.listdir(index_dir):
+                if name.startswith(('vectors', 'rows-')) and name not in current:
+                    try:
+                        os.unlink(os.path.join(index_dir, name))
+                    except OSError:
+                        pass
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional['VectorIndex']:
+        """Load an index saved with save(), or None if there is none"""
+        meta_path = os.path.join(index_dir, 'documents.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        index = cls(nprobe=meta.get('nprobe', 8))
+        index._registry = DocumentRegistry.from_dict(meta['registry'])
+        index._deleted = set(meta['deleted'])
+        index._trained_size = meta['trained_size']
+        rows_path = os.path.join(index_dir, meta['rows'])
+        if not os.path.exists(rows_path):
+            return None
+        segments = [tuple(segment) for segment in meta['segments']]
+        vectors = [np.load(os.path.join(index_dir, name)) for _, _, name in segments]
+        index._segments = segments
+        index._save_count = meta['save_count']
+        with np.load(rows_path) as data:
+            index._doc_ids = data['doc_ids']
+            index._pages = data['pages']
+            index._alive = data['alive']
+            index._assignments = data['assignments']
+            centroids = data['centroids']
+        index._vectors = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        index._size = len(index._vectors)
+        index._dim = index._vectors.shape[1] if index._size else None
+        if centroids.size:
+            index._centroids = centroids
+            index._rebuild_lists()
+        return index
@@ -0,0 +1 @@
+# Storage package for PDF search application 
\ No newline at end of file
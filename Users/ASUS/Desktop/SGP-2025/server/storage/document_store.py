@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import List, Dict, Any, Optional
+
+# Read files in 1MB chunks when hashing so large PDFs never sit in memory
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_file_hash(file_path: str) -> str:
+    """Compute the SHA-256 content hash of a file"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """Write JSON to a temp file and rename it over the target so readers never see a partial file"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+            json.dump(data, tmp_file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class DocumentStore:
+    def __init__(self, store_dir: str = os.path.join('uploads', '.store')):
+        """Initialize the per-document page-text store (keyed by content hash)"""
+        self.store_dir = store_dir
+        self.documents_dir = os.path.join(store_dir, 'documents')
+        self.filenames_path = os.path.join(store_dir, 'filenames.json')
+        os.makedirs(self.documents_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._filenames: Dict[str, Dict[str, Any]] = self._load_json(self.filenames_path) or {}
+
+    def _load_json(self, path: str) -> Optional[Any]:
+        """Load a JSON file, returning None if it is missing or unreadable"""
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading document store file {path}: {e}")
+            return None
+
+    def _document_path(self, doc_hash: str) -> str:
+        return os.path.join(self.documents_dir, f"{doc_hash}.json")
+
+    def put(self, doc_hash: str, pdf_path: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Store the processing result of a PDF and bind its filename to the content hash"""
+        pages = [
+            {
+                'page': page['page'],
+                'text': page['text'],
+                'confidence': page.get('confidence', 1.0),
+                'method': page.get('method', 'text')
+            }
+            for page in result.get('pages', [])
+        ]
+        confidence = (sum(page['confidence'] for page in pages) / len(pages)) if pages else 0.0
+
+        document = {
+            'doc_hash': doc_hash,
+            'filename': os.path.basename(pdf_path),
+            'total_pages': len(pages),
+            'processing_method': result.get('processing_method', ''),
+            'detected_languages': result.get('detected_languages', []),
+            'confidence': confidence,
+            'pdf_info': result.get('pdf_info', {}),
+            'pages': pages
+        }
+
+        with self._lock:
+            write_json_atomic(self._document_path(doc_hash), document)
+            self._documents[doc_hash] = document
+            self.bind_filename(pdf_path, doc_hash)
+
+        return document
+
+    def get(self, doc_hash: str) -> Optional[Dict[str, Any]]:
+        """Get a stored document by content hash"""
+        with self._lock:
+            document = self._documents.get(doc_hash)
+            if document is None:
+                document = self._load_json(self._document_path(doc_hash))
+                if document is not None:
+                    self._documents[doc_hash] = document
+            return document
+
+    def contains(self, doc_hash: str) -> bool:
+        """Check whether a document with this content hash has been stored"""
+        with self._lock:
+            return doc_hash in self._documents or os.path.exists(self._document_path(doc_hash))
+
+    def bind_filename(self, pdf_path: str, doc_hash: str) -> None:
+        """Remember which content hash an uploaded file currently holds"""
+        stat = os.stat(pdf_path)
+        with self._lock:
+            self._filenames[os.path.basename(pdf_path)] = {
+                'doc_hash': doc_hash,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime
+            }
+            write_json_atomic(self.filenames_path, self._filenames)
+
+    def filename_bindings(self) -> Dict[str, str]:
+        """Get the content hash currently bound to each uploaded filename"""
+        with self._lock:
+            return {filename: binding['doc_hash'] for filename, binding in self._filenames.items()}
+
+    def resolve_hash(self, pdf_path: str) -> Optional[str]:
+        """Resolve an uploaded file to its content hash, re-hashing only if the file changed on disk"""
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return None
+
+        filename = os.path.basename(pdf_path)
+        with self._lock:
+            binding = self._filenames.get(filename)
+            if binding and binding['size'] == stat.st_size and binding['mtime'] == stat.st_mtime:
+                return binding['doc_hash']
+
+        # File was replaced outside the upload path (or uploaded before the store existed)
+        doc_hash = compute_file_hash(pdf_path)
+        if self.contains(doc_hash):
+            self.bind_filename(pdf_path, doc_hash)
+        return doc_hash
+
+    def get_by_path(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        """Get the stored document for an uploaded file"""
+        doc_hash = self.resolve_hash(pdf_path)
+        if doc_hash is None:
+            return None
+        return self.get(doc_hash)
+
+    def get_pages(self, pdf_path: str) -> Optional[List[Dict[str, Any]]]:
+        """Get the stored per-page text for an uploaded file, or None if it was never ingested"""
+        document = self.get_by_path(pdf_path)
+        if document is None:
+            return None
+        return document['pages']
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from search.quantized_store import QuantizedEmbeddings
+
+
+def _save_npy_atomic(path: str, array: np.ndarray) -> None:
+    """Write an .npy file under a temp name and rename it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            np.save(tmp_file, np.ascontiguousarray(array))
+        # Atomic rename: concurrent workers either see the whole file or none of it
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: str = os.path.join('uploads', '.store', 'embeddings'), precision: str = 'int8'):
+        """Initialize the on-disk page embedding cache (one matrix per document, model and precision)"""
+        self.cache_dir = cache_dir
+        self.precision = precision
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Memory maps are backed by the OS page cache, so every worker shares the same pages
+        self._matrices: Dict[Tuple[str, str], QuantizedEmbeddings] = {}
+
+    def _paths(self, doc_hash: str, model_name: str) -> Tuple[str, str]:
+        safe_model_name = model_name.replace('/', '__').replace('\\', '__')
+        base = os.path.join(self.cache_dir, f"{doc_hash}.{safe_model_name}.{self.precision}")
+        return f"{base}.npy", f"{base}.scales.npy"
+
+    def get(self, doc_hash: str, model_name: str) -> Optional[QuantizedEmbeddings]:
+        """Get read-only memory-mapped page embeddings, or None if not cached"""
+        key = (doc_hash, model_name)
+        with self._lock:
+            matrix = self._matrices.get(key)
+        if matrix is not None:
+            return matrix
+
+        codes_path, scales_path = self._paths(doc_hash, model_name)
+        if not os.path.exists(codes_path):
+            return None
+        try:
+            codes = np.load(codes_path, mmap_mode='r')
+            scales = np.load(scales_path, mmap_mode='r') if self.precision == 'int8' else None
+        except Exception as e:
+            print(f"Error loading cached embeddings {codes_path}: {e}")
+            return None
+
+        matrix = QuantizedEmbeddings(codes, scales)
+        with self._lock:
+            self._matrices[key] = matrix
+        return matrix
+
+    def put(self, doc_hash: str, model_name: str, embeddings: np.ndarray) -> QuantizedEmbeddings:
+        """Quantize and persist page embeddings, returning them memory-mapped"""
+        quantized = QuantizedEmbeddings.from_embeddings(embeddings, self.precision)
+        codes_path, scales_path = self._paths(doc_hash, model_name)
+        # Scales first: a reader that finds the codes file can rely on the scales being there
+        if quantized.scales is not None:
+            _save_npy_atomic(scales_path, quantized.scales)
+        _save_npy_atomic(codes_path, quantized.codes)
+
+        with self._lock:
+            self._matrices.pop((doc_hash, model_name), None)
+        return self.get(doc_hash, model_name)
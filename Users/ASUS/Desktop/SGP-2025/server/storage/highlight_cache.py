@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from search.normalization import fold_query, normalize_query
+
+# After an eviction the cache is trimmed to this fraction of its size bound
+EVICTION_TARGET = 0.9
+
+
+def normalize_terms(terms: Iterable[str]) -> Tuple[str, ...]:
+    """Distinct, sorted, case-folded terms: the same highlights whatever their order, case or spacing"""
+    return tuple(sorted({fold_query(normalize_query(term)) for term in terms} - {''}))
+
+
+class HighlightCache:
+    def __init__(self, cache_dir: str = os.path.join('uploads', '.store', 'highlights'),
+                 max_bytes: int = 256 * 1024 * 1024):
+        """On-disk LRU cache of highlighted PDFs, keyed by document hash and normalized term set"""
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Cached file -> size, least recently used first (restored from modification times)
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._total_bytes = 0
+        files = []
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if name.endswith('.tmp.pdf'):
+                os.unlink(path)  # Left over by an interrupted write
+            elif name.endswith('.pdf'):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        for _, size, path in sorted(files):
+            self._entries[path] = size
+            self._total_bytes += size
+
+    def _path(self, doc_hash: str, terms: Tuple[str, ...]) -> str:
+        key = hashlib.sha256('\0'.join((doc_hash,) + terms).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get(self, doc_hash: str, terms: Tuple[str, ...]) -> Optional[bytes]:
+        """Contents of the cached highlighted PDF, or None on a miss"""
+        path = self._path(doc_hash, terms)
+        with self._lock:
+            if path not in self._entries:
+                return None
+            self._entries.move_to_end(path)
+            # Opened under the lock: a concurrent put() can't evict the file between the lookup and the open
+            try:
+                file = open(path, 'rb')
+            except OSError:
+                return None
+        with file:
+            content = file.read()
+        try:
+            # The modification time doubles as the last-used time after a restart
+            os.utime(path)
+        except OSError:
+            pass  # Evicted since it was opened
+        return content
+    
+    def temp_path(self) -> str:
+        """A fresh file in the cache directory to write a highlighted PDF to before put()"""
+        fd, path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp.pdf')
+        os.close(fd)
+        return path
+
+    def put(self, doc_hash: str, terms: Tuple[str, ...], tmp_path: str) -> str:
+        """Move a highlighted PDF into the cache, evicting the least recently used past the size bound"""
+        path = self._path(doc_hash, terms)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        target = int(self.max_bytes * EVICTION_TARGET)
+        removed = 0
+        for path in list(self._entries):
+            if self._total_bytes <= target:
+                break
+            if path == keep:
+                continue  # Just added, even if it alone exceeds the bound
+            self._total_bytes -= self._entries.pop(path)
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError:
+                pass
+        print(f"🧹 Highlight cache: evicted {removed} files ({self._total_bytes / 1024 / 1024:.1f} MB left)")
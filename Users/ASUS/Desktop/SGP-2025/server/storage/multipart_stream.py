@@ -0,0 +1,75 @@
+from typing import Dict, List, Optional
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+class MultipartError(ValueError):
+    """Request body is not a usable multipart/form-data upload"""
+
+
+class MultipartFileReader:
+    def __init__(self, content_type: str, field_name: str = 'file'):
+        """Incremental multipart/form-data parser handing out one file field's bytes as they arrive"""
+        content_type_value, params = parse_options_header(content_type or '')
+        boundary = params.get(b'boundary')
+        if content_type_value != b'multipart/form-data' or not boundary:
+            raise MultipartError("Expected a multipart/form-data upload")
+
+        self.field_name = field_name
+        # Set once the headers of the file field have been parsed
+        self.filename: Optional[str] = None
+        self.finished = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b''
+        self._header_value = b''
+        self._in_field = False
+        self._chunks: List[bytes] = []
+        self._parser = MultipartParser(boundary, callbacks={
+            'on_part_begin': self._on_part_begin,
+            'on_header_field': self._on_header_field,
+            'on_header_value': self._on_header_value,
+            'on_header_end': self._on_header_end,
+            'on_headers_finished': self._on_headers_finished,
+            'on_part_data': self._on_part_data,
+            'on_part_end': self._on_part_end,
+        })
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Parse the next piece of the request body; returns the file bytes it contained"""
+        self._parser.write(data)
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b''
+
+    def _on_headers_finished(self):
+        disposition, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+        name = options.get(b'name', b'').decode('utf-8', 'replace')
+        # Only the first matching file field is read; other fields are skipped
+        self._in_field = (name == self.field_name and b'filename' in options
+                          and self.filename is None and not self.finished)
+        if self._in_field:
+            self.filename = options[b'filename'].decode('utf-8', 'replace')
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_field:
+            self._chunks.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        if self._in_field:
+            self.finished = True
+            self._in_field = False
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, List, Optional, Tuple
+
+from PIL import Image
+
+from storage.document_store import write_json_atomic
+
+# After an eviction the cache is trimmed to this fraction of its size bound
+EVICTION_TARGET = 0.9
+
+
+def compute_image_hash(image: Image.Image) -> str:
+    """Hash of a rendered page's pixels (with its mode and size)"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class OCRCache:
+    def __init__(self, cache_dir: str = os.path.join('uploads', '.store', 'ocr_cache'),
+                 max_bytes: int = 512 * 1024 * 1024):
+        """Initialize the on-disk OCR result cache (keyed by page pixels, preprocessing variant and engine config)"""
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Bytes on disk as last measured plus what this process wrote since (None = not measured yet)
+        self._total_bytes: Optional[int] = None
+
+    def _path(self, image_hash: str, variant: str, config: str) -> str:
+        key = hashlib.sha256(f"{image_hash}\0{variant}\0{config}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, image_hash: str, variant: str, config: str) -> Optional[Any]:
+        """Get a cached OCR result, or None on a miss"""
+        path = self._path(image_hash, variant, config)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading OCR cache entry {path}: {e}")
+            return None
+        try:
+            # The modification time doubles as the last-used time for LRU eviction
+            os.utime(path)
+        except OSError:
+            pass  # Evicted by another worker in the meantime
+        return entry['result']
+
+    def put(self, image_hash: str, variant: str, config: str, result: Any) -> None:
+        """Store an OCR result, evicting the least recently used entries past the size bound"""
+        path = self._path(image_hash, variant, config)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Atomic rename: workers sharing the directory never read a partial entry
+        write_json_atomic(path, {'variant': variant, 'config': config, 'result': result})
+        size = os.path.getsize(path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(entry_size for _, entry_size, _ in self._entries())
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(last used, size, path) of every cache entry"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        # Re-measure: other workers write to the same directory
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * EVICTION_TARGET)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError:
+                pass  # Already evicted by another worker
+            total -= size
+        self._total_bytes = total
+        print(f"🧹 OCR cache: evicted {removed} entries ({total / 1024 / 1024:.1f} MB left)")
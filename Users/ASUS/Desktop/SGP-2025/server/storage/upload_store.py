@@ -0,0 +1,149 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from typing import AsyncIterator, BinaryIO, Optional, Tuple
+
+import aiofiles
+
+from storage.document_store import HASH_CHUNK_SIZE, DocumentStore
+
+# PDF readers accept the '%PDF-' header anywhere in the first 1KB of the file
+PDF_MAGIC = b'%PDF-'
+PDF_MAGIC_WINDOW = 1024
+
+
+class InvalidUploadError(ValueError):
+    """Upload rejected while streaming (not a PDF)"""
+
+
+class UploadTooLargeError(InvalidUploadError):
+    """Upload exceeded the size limit"""
+
+
+class UploadValidator:
+    def __init__(self, max_bytes: Optional[int] = None):
+        """Hash, size limit and PDF header check applied to an upload chunk by chunk"""
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self._head = b''
+        self._is_pdf = False
+
+    def feed(self, chunk: bytes) -> None:
+        """Account for the next chunk; raises as soon as the upload is known to be invalid"""
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise UploadTooLargeError(f"File exceeds the maximum size of {self.max_bytes / (1024 * 1024):.3g}MB")
+        if not self._is_pdf:
+            self._head = (self._head + chunk)[:PDF_MAGIC_WINDOW]
+            self._is_pdf = PDF_MAGIC in self._head
+            if not self._is_pdf and len(self._head) >= PDF_MAGIC_WINDOW:
+                raise InvalidUploadError("File is not a PDF")
+        self.digest.update(chunk)
+
+    def finish(self) -> str:
+        """Content hash of the complete upload"""
+        if not self._is_pdf:
+            raise InvalidUploadError("File is not a PDF")
+        return self.digest.hexdigest()
+
+
+class UploadStore:
+    def __init__(self, uploads_dir: str, document_store: DocumentStore, blobs_dir: str = None):
+        """Content-addressed upload storage: each distinct PDF is kept once, filenames are hard links to it"""
+        self.uploads_dir = uploads_dir
+        self.document_store = document_store
+        self.blobs_dir = blobs_dir or os.path.join(uploads_dir, '.store', 'blobs')
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def blob_path(self, doc_hash: str) -> str:
+        return os.path.join(self.blobs_dir, f"{doc_hash}.pdf")
+
+    def save(self, stream: BinaryIO, filename: str, max_bytes: int = None) -> Tuple[str, str]:
+        """Write an upload to disk, hashing and validating it as it streams; returns (file path, content hash)"""
+        validator = UploadValidator(max_bytes)
+        fd, tmp_path = tempfile.mkstemp(dir=self.blobs_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+                    validator.feed(chunk)
+                    tmp_file.write(chunk)
+            doc_hash = validator.finish()
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return self.commit(tmp_path, doc_hash, filename)
+
+    async def receive(self, chunks: AsyncIterator[bytes], max_bytes: int = None) -> Tuple[str, str]:
+        """Stream an upload into a temp file with non-blocking writes; returns (temp path, content hash) for commit()"""
+        validator = UploadValidator(max_bytes)
+        fd, tmp_path = tempfile.mkstemp(dir=self.blobs_dir, suffix='.part')
+        os.close(fd)
+        buffer = bytearray()
+        try:
+            async with aiofiles.open(tmp_path, 'wb') as tmp_file:
+                async for chunk in chunks:
+                    # Validated before it is written: a bad upload is dropped on its first chunks
+                    validator.feed(chunk)
+                    buffer += chunk
+                    # Network chunks are small; write in HASH_CHUNK_SIZE blocks to limit thread hand-offs
+                    if len(buffer) >= HASH_CHUNK_SIZE:
+                        await tmp_file.write(bytes(buffer))
+                        buffer.clear()
+                if buffer:
+                    await tmp_file.write(bytes(buffer))
+            doc_hash = validator.finish()
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path, doc_hash
+
+    def commit(self, tmp_path: str, doc_hash: str, filename: str) -> Tuple[str, str]:
+        """Move a fully written upload into the blob store and point the filename at it"""
+        blob_path = self.blob_path(doc_hash)
+        file_path = os.path.join(self.uploads_dir, filename)
+        with self._lock:
+            if os.path.exists(blob_path):
+                # Same bytes already on disk: drop the new copy
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, blob_path)
+            if os.path.exists(file_path) and not os.path.samefile(file_path, blob_path):
+                self._adopt(file_path)
+            self._link(blob_path, file_path)
+        return file_path, doc_hash
+
+    def _adopt(self, file_path: str) -> None:
+        """Keep the bytes of a file about to be replaced in the blob store (instead of a .backup copy)"""
+        if os.stat(file_path).st_nlink > 1:
+            return  # Already a link to a blob
+        doc_hash = self.document_store.resolve_hash(file_path)
+        blob_path = self.blob_path(doc_hash)
+        if not os.path.exists(blob_path):
+            os.replace(file_path, blob_path)
+            print(f"📦 Moved replaced upload into the blob store: {os.path.basename(file_path)} -> {doc_hash[:12]}")
+
+    def _link(self, blob_path: str, file_path: str) -> None:
+        if os.path.exists(file_path) and os.path.samefile(file_path, blob_path):
+            return
+        link_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.link"
+        try:
+            os.link(blob_path, link_path)
+        except OSError:
+            # No hard links on this filesystem: fall back to a copy
+            shutil.copyfile(blob_path, link_path)
+        # Atomic rename: readers see the old file or the new one, never a missing path
+        os.replace(link_path, file_path)
+
+    def remove(self, file_path: str, doc_hash: str = None) -> None:
+        """Remove an upload (after failed processing), and its blob if nothing else links to it"""
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+        if doc_hash and not self.document_store.contains(doc_hash):
+            blob_path = self.blob_path(doc_hash)
+            with self._lock:
+                if os.path.exists(blob_path) and os.stat(blob_path).st_nlink == 1:
+                    os.unlink(blob_path)
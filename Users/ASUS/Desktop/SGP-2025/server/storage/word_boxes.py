@@ -0,0 +1,190 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# A word of a page and its box in PDF points (origin top-left, as displayed): (x0, y0, x1, y1, text, ...)
+PageWord = Tuple[float, float, float, float, str]
+
+# A word is looked for at most this many characters past the end of the previous one
+ALIGN_WINDOW = 64
+# Boxes whose vertical extents overlap by this share of the smaller height are on the same line
+LINE_OVERLAP = 0.5
+
+
+# Code points str.split() splits on (all of them are below U+3001)
+_WHITESPACE = np.array([point for point in range(0x3001) if chr(point).isspace()], dtype=np.uint32)
+
+
+def token_offsets(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end offsets of the whitespace-separated tokens of a text (those of text.split())"""
+    space = np.isin(np.frombuffer(text.encode('utf-32-le'), dtype='<u4'), _WHITESPACE)
+    edges = np.diff(np.concatenate(([True], space, [True])).astype(np.int8))
+    return np.flatnonzero(edges == -1).astype(np.int32), np.flatnonzero(edges == 1).astype(np.int32)
+
+
+def align_words(text: str, words: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end offsets of each word in the page text, found in reading order (-1 where not found)"""
+    if text.split() == list(words):
+        # Text layers: the words are exactly the text's tokens, no search needed
+        return token_offsets(text)
+    starts = np.full(len(words), -1, dtype=np.int32)
+    ends = np.full(len(words), -1, dtype=np.int32)
+    cursor = 0
+    for i, word in enumerate(words):
+        position = text.find(word, cursor, cursor + ALIGN_WINDOW + len(word)) if word else -1
+        if position < 0:
+            # Empty, or dropped or rewritten by text cleanup: skip it without losing our place
+            continue
+        starts[i] = position
+        ends[i] = cursor = position + len(word)
+    return starts, ends
+
+
+class DocumentWordBoxes:
+    def __init__(self, page_numbers: np.ndarray, page_sizes: np.ndarray, page_starts: np.ndarray,
+                 starts: np.ndarray, ends: np.ndarray, boxes: np.ndarray):
+        """Word boxes of every page of one document, aligned to the stored page text"""
+        self.page_numbers = page_numbers    # 1-based page number of each page
+        self.page_sizes = page_sizes        # (width, height) of each page in PDF points
+        self.page_starts = page_starts      # first word of each page (one extra entry: total words)
+        self.starts = starts                # char offset of each word in its page text
+        self.ends = ends
+        self.boxes = boxes                  # (x0, y0, x1, y1) of each word in PDF points
+        self._page_index = {int(page): index for index, page in enumerate(page_numbers.tolist())}
+
+    @classmethod
+    def build(cls, pages: List[Dict[str, Any]], page_words: Dict[int, Sequence[PageWord]],
+              page_sizes: Dict[int, Tuple[float, float]]) -> 'DocumentWordBoxes':
+        """Align each stored page's words to its text; words not found in the text are dropped"""
+        page_numbers, sizes, page_starts = [], [], [0]
+        starts, ends, boxes = [], [], []
+        for page in pages:
+            words = page_words.get(page['page'], [])
+            word_starts, word_ends = align_words(page['text'], [word[4] for word in words])
+            found = word_starts >= 0
+            page_numbers.append(page['page'])
+            sizes.append(page_sizes.get(page['page'], (0.0, 0.0)))
+            page_starts.append(page_starts[-1] + int(np.count_nonzero(found)))
+            starts.append(word_starts[found])
+            ends.append(word_ends[found])
+            boxes.append(np.array([word[:4] for word in words], dtype=np.float32).reshape(-1, 4)[found])
+
+        return cls(
+            np.array(page_numbers, dtype=np.int32),
+            np.array(sizes, dtype=np.float32).reshape(-1, 2),
+            np.array(page_starts, dtype=np.int64),
+            np.concatenate(starts) if starts else np.zeros(0, dtype=np.int32),
+            np.concatenate(ends) if ends else np.zeros(0, dtype=np.int32),
+            np.concatenate(boxes) if boxes else np.zeros((0, 4), dtype=np.float32)
+        )
+
+    def save(self, path: str) -> None:
+        """Save to an .npz file (written to a temp name first, then renamed)"""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            page_numbers=self.page_numbers,
+            page_sizes=self.page_sizes,
+            page_starts=self.page_starts,
+            starts=self.starts,
+            ends=self.ends,
+            boxes=self.boxes
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'DocumentWordBoxes':
+        """Load word boxes saved with save()"""
+        with np.load(path) as data:
+            return cls(
+                data['page_numbers'],
+                data['page_sizes'],
+                data['page_starts'],
+                data['starts'],
+                data['ends'],
+                data['boxes']
+            )
+
+    def page_size(self, page: int) -> Optional[Tuple[float, float]]:
+        """(width, height) of a page in PDF points, or None if the page has no entry"""
+        index = self._page_index.get(page)
+        if index is None:
+            return None
+        width, height = self.page_sizes[index].tolist()
+        return width, height
+
+    def rects(self, page: int, start: int, end: int) -> List[List[float]]:
+        """Rectangles covering the text [start, end) of a page, one per line it spans"""
+        index = self._page_index.get(page)
+        if index is None:
+            return []
+        lo, hi = int(self.page_starts[index]), int(self.page_starts[index + 1])
+        # Words are in text order, so both their starts and ends are sorted
+        first = lo + int(np.searchsorted(self.ends[lo:hi], start, side='right'))
+        last = lo + int(np.searchsorted(self.starts[lo:hi], end, side='left'))
+
+        rects: List[List[float]] = []
+        for word_start, word_end, (x0, y0, x1, y1) in zip(self.starts[first:last].tolist(),
+                                                          self.ends[first:last].tolist(),
+                                                          self.boxes[first:last].tolist()):
+            # Partly covered words: clip the box in proportion to the characters covered
+            length = word_end - word_start
+            left = (max(start, word_start) - word_start) / length
+            right = (min(end, word_end) - word_start) / length
+            x0, x1 = x0 + (x1 - x0) * left, x0 + (x1 - x0) * right
+
+            if rects:
+                previous = rects[-1]
+                overlap = min(previous[3], y1) - max(previous[1], y0)
+                if x0 >= previous[0] and overlap >= LINE_OVERLAP * min(previous[3] - previous[1], y1 - y0):
+                    previous[1], previous[2], previous[3] = min(previous[1], y0), max(previous[2], x1), max(previous[3], y1)
+                    continue
+            rects.append([x0, y0, x1, y1])
+        return [[round(value, 2) for value in rect] for rect in rects]
+
+
+class WordBoxStore:
+    def __init__(self, cache_dir: str, max_in_memory: int = 32):
+        """On-disk word boxes per document (keyed by content hash) with a small in-memory LRU"""
+        self.cache_dir = cache_dir
+        self.max_in_memory = max_in_memory
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._boxes: 'OrderedDict[str, DocumentWordBoxes]' = OrderedDict()
+
+    def _path(self, doc_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{doc_hash}.npz")
+
+    def _remember(self, doc_hash: str, word_boxes: DocumentWordBoxes) -> None:
+        with self._lock:
+            self._boxes[doc_hash] = word_boxes
+            self._boxes.move_to_end(doc_hash)
+            while len(self._boxes) > self.max_in_memory:
+                self._boxes.popitem(last=False)
+
+    def put(self, doc_hash: str, word_boxes: DocumentWordBoxes) -> None:
+        """Persist a document's word boxes"""
+        word_boxes.save(self._path(doc_hash))
+        self._remember(doc_hash, word_boxes)
+
+    def get(self, doc_hash: str) -> Optional[DocumentWordBoxes]:
+        """Get a document's word boxes from memory or disk, or None if none were stored"""
+        with self._lock:
+            word_boxes = self._boxes.get(doc_hash)
+            if word_boxes is not None:
+                self._boxes.move_to_end(doc_hash)
+                return word_boxes
+
+        path = self._path(doc_hash)
+        if not os.path.exists(path):
+            return None
+        try:
+            word_boxes = DocumentWordBoxes.load(path)
+        except Exception as e:
+            print(f"Error loading word boxes {path}: {e}")
+            return None
+        self._remember(doc_hash, word_boxes)
+        return word_boxes
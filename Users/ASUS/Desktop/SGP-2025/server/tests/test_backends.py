@@ -0,0 +1,39 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from models.backends import build_tiny_bert, check_parity, create_backend
+
+GUJARATI_TEXTS = ["ગુજરાત ભાષા", "નવલકથા ઇતિહાસ વિશે છે", "લેખક", "ભારત ગામ રાજ કથા પુસ્તક " * 8]
+
+
+@pytest.fixture(scope="module")
+def tiny_bert():
+    return build_tiny_bert([text for text in GUJARATI_TEXTS], hidden_size=64, num_layers=2)
+
+
+def test_eager_backend_is_deterministic(tiny_bert):
+    result = check_parity(*tiny_bert, GUJARATI_TEXTS, candidate="eager", reference="eager", num_threads=1)
+    assert result["max_abs_diff"] == 0.0
+    assert result["min_cosine"] == pytest.approx(1.0)
+
+
+def test_int8_backend_matches_eager(tiny_bert):
+    result = check_parity(*tiny_bert, GUJARATI_TEXTS, candidate="int8", reference="eager", num_threads=1)
+    assert result["texts"] == len(GUJARATI_TEXTS)
+    assert result["min_cosine"] > 0.99
+
+
+def test_embeddings_do_not_depend_on_batching(tiny_bert):
+    backend = create_backend("eager", num_threads=1)
+    backend.load(*tiny_bert)
+    batched = backend.embed(GUJARATI_TEXTS, batch_size=16)
+    single = backend.embed(GUJARATI_TEXTS, batch_size=1)
+    assert batched.shape == (len(GUJARATI_TEXTS), backend.hidden_size)
+    assert abs(batched - single).max() < 1e-4
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_backend("fp8")
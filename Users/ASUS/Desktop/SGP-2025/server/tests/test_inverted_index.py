@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from search.inverted_index import InvertedIndex
+from search.normalization import tokenize
+
+GUJARATI_WORDS = ["ગુજરાત", "ભાષા", "નવલકથા", "ઇતિહાસ", "લેખક", "પુસ્તક", "ગામ", "રાજ", "કથા", "ભારત"]
+
+
+def brute_force_pages(documents, query, phrase):
+    """(doc_hash, page) -> match count by scanning every page's tokens"""
+    terms = [token for token, _ in tokenize(query)]
+    matches = {}
+    for doc_hash, pages in documents.items():
+        for page in pages:
+            tokens = [token for token, _ in tokenize(page['text'])]
+            if phrase or len(terms) == 1:
+                count = sum(tokens[i:i + len(terms)] == terms for i in range(len(tokens) - len(terms) + 1))
+            elif all(term in tokens for term in terms):
+                count = sum(tokens.count(term) for term in terms)
+            else:
+                count = 0
+            if count:
+                matches[(doc_hash, page['page'])] = count
+    return matches
+
+
+def page_counts(result):
+    return {(hit['doc_hash'], hit['page']): hit['match_count'] for hit in result['results']}
+
+
+@pytest.fixture
+def corpus():
+    rng = random.Random(0)
+    return {f"doc{d}": [{'page': page_num, 'text': ' '.join(rng.choice(GUJARATI_WORDS) for _ in range(60))}
+                        for page_num in range(1, 4)]
+            for d in range(12)}
+
+
+@pytest.fixture
+def index(corpus):
+    index = InvertedIndex()
+    for doc_hash, pages in corpus.items():
+        index.add_document(doc_hash, f"{doc_hash}.pdf", pages)
+    return index
+
+
+@pytest.mark.parametrize("query", ["ગુજરાત", "ગુજરાત ભાષા", "કથા ગામ રાજ", "ભાષા ભાષા", "ભારત નવલકથા"])
+@pytest.mark.parametrize("phrase", [True, False])
+def test_search_matches_brute_force(corpus, index, query, phrase):
+    expected = brute_force_pages(corpus, query, phrase)
+    result = index.search(query, phrase=phrase, limit=1000)
+    assert page_counts(result) == expected
+    assert result['total_hits'] == sum(expected.values())
+    assert result.get('total_pages', 0) == len(expected)
+
+
+def test_results_are_ranked_and_offsets_point_at_matches(corpus, index):
+    result = index.search("ગુજરાત ભાષા", limit=5)
+    counts = [hit['match_count'] for hit in result['results']]
+    assert counts == sorted(counts, reverse=True)
+    for hit in result['results']:
+        text = corpus[hit['doc_hash']][hit['page'] - 1]['text']
+        assert len(hit['offsets']) == hit['match_count']
+        assert all(text.startswith("ગુજરાત ભાષા", offset) for offset in hit['offsets'])
+
+
+def test_phrase_needs_adjacent_terms():
+    index = InvertedIndex()
+    index.add_document("a", "a.pdf", [{'page': 1, 'text': "ગુજરાત ની ભાષા"}, {'page': 2, 'text': "ભાષા ગુજરાત"}])
+    assert index.search("ગુજરાત ભાષા")['results'] == []
+    assert [hit['page'] for hit in index.search("ગુજરાત ભાષા", phrase=False)['results']] == [1, 2]
+    assert index.search("ભાષા ગુજરાત")['results'][0]['page'] == 2
+    assert index.search("અજાણ્યો")['total_hits'] == 0
+    assert index.search("   ")['results'] == []
+
+
+def test_removed_and_rebound_documents_are_hidden(corpus, index):
+    index.remove_filename("doc0.pdf")
+    # Same content under another name is indexed once and keeps matching under the new name
+    index.add_document("doc1", "copy.pdf", corpus["doc1"])
+    # Rebinding a filename to new content hides the old content
+    index.add_document("new", "doc2.pdf", [{'page': 1, 'text': "ગુજરાત"}])
+
+    hits = index.search("ગુજરાત", limit=1000)['results']
+    doc_hashes = {hit['doc_hash'] for hit in hits}
+    assert "doc0" not in doc_hashes and "doc2" not in doc_hashes
+    assert {"doc1", "new"} <= doc_hashes
+    assert next(hit for hit in hits if hit['doc_hash'] == "doc1")['filenames'] == ["copy.pdf", "doc1.pdf"]
+    assert index.document_count == 11
+
+
+def test_compaction_keeps_live_documents(corpus, index):
+    before = page_counts(index.search("ગુજરાત ભાષા", limit=1000))
+    removed = [f"doc{d}" for d in range(4)]
+    for doc_hash in removed:
+        index.remove_filename(f"{doc_hash}.pdf")
+    # Past COMPACTION_RATIO the posting arrays are rewritten without the removed documents
+    assert not index._deleted
+    assert page_counts(index.search("ગુજરાત ભાષા", limit=1000)) == {
+        key: count for key, count in before.items() if key[0] not in removed}
+
+    # Re-uploading removed content indexes it again
+    index.add_document("doc0", "doc0.pdf", corpus["doc0"])
+    assert page_counts(index.search("ગુજરાત ભાષા", limit=1000)) == {
+        key: count for key, count in before.items() if key[0] not in removed[1:]}
@@ -0,0 +1,45 @@
+import pytest
+
+from models.language_detection import MIN_SCRIPT_LETTERS, detect_languages, script_histogram
+
+GUJARATI = "ગુજરાતી ભાષા ભારતના ગુજરાત રાજ્યની મુખ્ય ભાષા છે "
+HINDI = "हिन्दी भारत की एक प्रमुख भाषा है और इसे देवनागरी लिपि में लिखा जाता है "
+# 'ळ' is routine in Marathi text
+MARATHI = "मराठी महाराष्ट्राची भाषा आहे. शाळा, बाळ, कळले, पळून, टाळी "
+ENGLISH = "The quick brown fox jumps over the lazy dog "
+
+
+def test_script_histogram_counts_letters_only():
+    assert script_histogram("abc ગુજ 123 !") == {'Latin': 3, 'Gujarati': 3}
+    assert script_histogram("") == {}
+
+
+@pytest.mark.parametrize("text, languages", [
+    (GUJARATI, ['guj']),
+    (HINDI, ['hin']),
+    (MARATHI, ['mar']),
+    (ENGLISH, ['eng']),
+    (GUJARATI * 3 + ENGLISH, ['guj', 'eng']),
+    (ENGLISH * 3 + HINDI, ['eng', 'hin']),
+])
+def test_detect_languages(text, languages):
+    assert detect_languages(text) == languages
+
+
+def test_marathi_marker_needs_a_minimum_share():
+    # A single 'ळ' in a long Hindi text stays Hindi
+    assert detect_languages(HINDI * 20 + "ळ") == ['hin']
+    assert detect_languages(HINDI * 20 + "ळ" * 20) == ['mar']
+
+
+def test_minor_scripts_and_unsupported_languages_are_dropped():
+    # Under MIN_SCRIPT_SHARE of the letters
+    assert detect_languages(GUJARATI * 20 + "abc") == ['guj']
+    assert detect_languages(GUJARATI + ENGLISH, min_share=0.9) == []
+    assert detect_languages(GUJARATI * 3 + ENGLISH, supported=['eng']) == ['eng']
+
+
+def test_too_few_letters():
+    assert detect_languages("") == []
+    assert detect_languages("ab" * (MIN_SCRIPT_LETTERS // 2 - 1) + " 12345 ...") == []
+    assert detect_languages("a" * MIN_SCRIPT_LETTERS) == ['eng']
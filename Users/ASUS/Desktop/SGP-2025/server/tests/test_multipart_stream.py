@@ -0,0 +1,99 @@
+import asyncio
+import os
+
+import pytest
+
+from storage.document_store import DocumentStore
+from storage.multipart_stream import MultipartError, MultipartFileReader
+from storage.upload_store import PDF_MAGIC_WINDOW, InvalidUploadError, UploadStore, UploadTooLargeError
+
+BOUNDARY = 'testboundary'
+CONTENT_TYPE = f'multipart/form-data; boundary={BOUNDARY}'
+PDF = b'%PDF-1.4\n' + bytes(range(256)) * 40
+
+
+def multipart_body(*parts):
+    """Encode (field name, filename or None, bytes) parts as a multipart/form-data body"""
+    body = b''
+    for name, filename, data in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else '')
+        body += f'--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n'.encode() + data + b'\r\n'
+    return body + f'--{BOUNDARY}--\r\n'.encode()
+
+
+def read_file(body, piece_size):
+    reader = MultipartFileReader(CONTENT_TYPE)
+    chunks = []
+    for start in range(0, len(body), piece_size):
+        chunks.extend(reader.feed(body[start:start + piece_size]))
+    return reader, b''.join(chunks)
+
+
+@pytest.mark.parametrize("piece_size", [1, 7, 100, 1 << 20])
+def test_file_field_bytes_are_streamed(piece_size):
+    body = multipart_body(('note', None, b'hello'), ('file', 'a.pdf', PDF), ('file', 'b.pdf', b'second'))
+    reader, data = read_file(body, piece_size)
+    # Only the first file field is read
+    assert reader.filename == 'a.pdf'
+    assert reader.finished
+    assert data == PDF
+
+
+def test_missing_file_part():
+    reader, data = read_file(multipart_body(('note', None, b'hello'), ('file', None, b'not a file')), 64)
+    assert reader.filename is None and not reader.finished
+    assert data == b''
+
+
+def test_non_multipart_request_is_rejected():
+    with pytest.raises(MultipartError):
+        MultipartFileReader('application/pdf')
+    with pytest.raises(MultipartError):
+        MultipartFileReader('multipart/form-data')
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path), DocumentStore(str(tmp_path / '.store')))
+
+
+def receive(store, data, max_bytes=None, chunk_size=4096):
+    async def chunks():
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+    return asyncio.run(store.receive(chunks(), max_bytes))
+
+
+def test_receive_then_commit(store):
+    tmp_path, doc_hash = receive(store, PDF)
+    file_path, _ = store.commit(tmp_path, doc_hash, 'a.pdf')
+    assert not os.path.exists(tmp_path)
+    with open(file_path, 'rb') as f:
+        assert f.read() == PDF
+
+
+def test_oversize_upload_is_rejected(store):
+    with pytest.raises(UploadTooLargeError):
+        receive(store, PDF, max_bytes=len(PDF) - 1)
+    assert os.listdir(store.blobs_dir) == []
+
+
+def test_non_pdf_is_rejected_after_the_magic_window(store):
+    consumed = []
+
+    async def chunks():
+        for _ in range(100):
+            consumed.append(1)
+            yield b'x' * 256
+
+    with pytest.raises(InvalidUploadError):
+        asyncio.run(store.receive(chunks()))
+    # Dropped once the first PDF_MAGIC_WINDOW bytes have no '%PDF-' header, not at the end of the body
+    assert len(consumed) == PDF_MAGIC_WINDOW // 256
+    assert os.listdir(store.blobs_dir) == []
+
+
+def test_short_non_pdf_is_rejected(store):
+    with pytest.raises(InvalidUploadError):
+        receive(store, b'hello')
+    assert os.listdir(store.blobs_dir) == []
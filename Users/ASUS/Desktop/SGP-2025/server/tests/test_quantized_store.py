@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from search.quantized_store import PRECISIONS, QuantizedEmbeddings, recall_at_k, top_k_indices
+
+
+@pytest.fixture
+def embeddings():
+    """Clustered random vectors, roughly like page embeddings of related documents"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 64))
+    pages = centers[rng.integers(0, len(centers), size=2000)] + 0.6 * rng.normal(size=(2000, 64))
+    queries = centers[rng.integers(0, len(centers), size=30)] + 0.6 * rng.normal(size=(30, 64))
+    return pages, queries
+
+
+def test_top_k_indices_orders_best_first():
+    scores = np.array([0.1, 0.9, -0.5, 0.7, 0.9, 0.3], dtype=np.float32)
+    indices, top_scores = top_k_indices(scores, 4)
+    # Ties keep index order
+    assert indices.tolist() == [1, 4, 3, 5]
+    assert top_scores.tolist() == pytest.approx([0.9, 0.9, 0.7, 0.3])
+
+    indices, _ = top_k_indices(scores, 100)
+    assert indices.tolist() == np.argsort(-scores, kind='stable').tolist()
+    assert len(top_k_indices(scores, 0)[0]) == 0
+
+
+@pytest.mark.parametrize("precision", PRECISIONS)
+def test_top_k_recall(embeddings, precision):
+    pages, queries = embeddings
+    store = QuantizedEmbeddings.from_embeddings(pages, precision)
+    assert store.precision == precision
+    assert recall_at_k(pages, store, queries, k=10) >= (1.0 if precision == 'float32' else 0.9)
+
+
+def test_int8_store_is_compact_and_close(embeddings):
+    pages, queries = embeddings
+    store = QuantizedEmbeddings.from_embeddings(pages, 'int8')
+    exact = QuantizedEmbeddings.from_embeddings(pages, 'float32')
+    assert store.nbytes < exact.nbytes / 3
+    assert np.abs(store.scores(queries[0]) - exact.scores(queries[0])).max() < 0.02
+
+
+def test_unknown_precision_raises():
+    with pytest.raises(ValueError):
+        QuantizedEmbeddings.from_embeddings(np.ones((2, 4)), 'int4')
@@ -0,0 +1,65 @@
+import random
+
+import numpy as np
+import pytest
+
+from search.suffix_array import DocumentSuffixArray, build_suffix_array
+
+GUJARATI_WORDS = ["ગુજરાત", "ભાષા", "નવલકથા", "ઇતિહાસ", "લેખક", "પુસ્તક", "ગામ", "રાજ", "કથા", "ભારત"]
+
+
+def brute_force_locate(pages, query):
+    """Non-overlapping occurrences of the query in each page, found with str.find"""
+    matches = {}
+    for page in pages:
+        start = page['text'].find(query)
+        while start != -1:
+            matches.setdefault(page['page'], []).append((start, start + len(query)))
+            start = page['text'].find(query, start + len(query))
+    return matches
+
+
+@pytest.fixture(scope="module")
+def gujarati_pages():
+    rng = random.Random(0)
+    return [{'page': page_num, 'text': ' '.join(rng.choice(GUJARATI_WORDS) for _ in range(200))}
+            for page_num in range(1, 6)]
+
+
+def test_suffix_order_matches_sorted_suffixes():
+    text = "ગુજરાત ભાષા ગુજરાતી ભાષાઓ\x00કથા નવલકથા"
+    expected = sorted(range(len(text)), key=lambda i: text[i:])
+    assert build_suffix_array(text).tolist() == expected
+
+
+@pytest.mark.parametrize("query", GUJARATI_WORDS + ["ગુજરાત ભાષા", "કથા ", "ા", "રાજ રાજ", "અમદાવાદ"])
+def test_locate_matches_brute_force(gujarati_pages, query):
+    suffix_array = DocumentSuffixArray.build(gujarati_pages)
+    expected = brute_force_locate(gujarati_pages, query)
+    assert suffix_array.locate(query) == expected
+    assert suffix_array.count(query) >= sum(len(spans) for spans in expected.values())
+
+
+def test_matches_do_not_span_pages():
+    pages = [{'page': 1, 'text': "આ ગુજરાત"}, {'page': 2, 'text': "ભાષા છે"}]
+    suffix_array = DocumentSuffixArray.build(pages)
+    assert suffix_array.locate("ગુજરાતભાષા") == {}
+    assert suffix_array.locate("ભાષા") == {2: [(0, 4)]}
+
+
+def test_offsets_skip_zero_width_characters_and_case():
+    # OCR output carries ZWJ/ZWNJ inside words; offsets must point into the original text
+    pages = [{'page': 3, 'text': "ગુજ‍રાત and Gujarat"}]
+    suffix_array = DocumentSuffixArray.build(pages)
+    assert suffix_array.locate("ગુજરાત") == {3: [(0, 7)]}
+    assert suffix_array.locate("GUJARAT") == {3: [(12, 19)]}
+
+
+def test_save_and_load_round_trip(tmp_path, gujarati_pages):
+    suffix_array = DocumentSuffixArray.build(gujarati_pages)
+    path = str(tmp_path / "doc.npz")
+    suffix_array.save(path)
+    loaded = DocumentSuffixArray.load(path)
+    assert loaded.text == suffix_array.text
+    assert np.array_equal(loaded.suffix_array, suffix_array.suffix_array)
+    assert loaded.locate("નવલકથા") == suffix_array.locate("નવલકથા")
@@ -0,0 +1,82 @@
+import io
+import os
+
+import pytest
+
+from storage.document_store import DocumentStore
+from storage.upload_store import InvalidUploadError, UploadStore, UploadTooLargeError
+
+PDF_A = b'%PDF-1.4\n' + b'a' * 5000
+PDF_B = b'%PDF-1.4\n' + b'b' * 5000
+
+
+@pytest.fixture
+def store(tmp_path):
+    uploads_dir = tmp_path / 'uploads'
+    uploads_dir.mkdir()
+    return UploadStore(str(uploads_dir), DocumentStore(str(uploads_dir / '.store')))
+
+
+def blobs(store):
+    return sorted(os.listdir(store.blobs_dir))
+
+
+def test_identical_uploads_share_one_blob(store):
+    path_a, hash_a = store.save(io.BytesIO(PDF_A), 'a.pdf')
+    path_b, hash_b = store.save(io.BytesIO(PDF_A), 'b.pdf')
+
+    assert hash_a == hash_b
+    assert blobs(store) == [f"{hash_a}.pdf"]
+    assert os.path.samefile(path_a, path_b)
+    assert os.path.samefile(path_a, store.blob_path(hash_a))
+    with open(path_b, 'rb') as f:
+        assert f.read() == PDF_A
+
+
+def test_replacing_a_filename_keeps_both_contents(store):
+    path, hash_a = store.save(io.BytesIO(PDF_A), 'a.pdf')
+    _, hash_b = store.save(io.BytesIO(PDF_B), 'a.pdf')
+
+    assert hash_a != hash_b
+    assert os.path.samefile(path, store.blob_path(hash_b))
+    assert blobs(store) == sorted([f"{hash_a}.pdf", f"{hash_b}.pdf"])
+    with open(store.blob_path(hash_a), 'rb') as f:
+        assert f.read() == PDF_A
+
+
+def test_replaced_plain_file_is_adopted_into_the_blob_store(store):
+    # A file uploaded before the blob store existed is not a link to any blob
+    path = os.path.join(store.uploads_dir, 'old.pdf')
+    with open(path, 'wb') as f:
+        f.write(PDF_A)
+    old_hash = store.document_store.resolve_hash(path)
+
+    _, new_hash = store.save(io.BytesIO(PDF_B), 'old.pdf')
+
+    assert os.path.samefile(path, store.blob_path(new_hash))
+    with open(store.blob_path(old_hash), 'rb') as f:
+        assert f.read() == PDF_A
+
+
+def test_rejected_uploads_leave_nothing_behind(store):
+    with pytest.raises(UploadTooLargeError):
+        store.save(io.BytesIO(PDF_A), 'big.pdf', max_bytes=1000)
+    with pytest.raises(InvalidUploadError):
+        store.save(io.BytesIO(b'PK\x03\x04' + b'x' * 5000), 'zip.pdf')
+    with pytest.raises(InvalidUploadError):
+        store.save(io.BytesIO(b''), 'empty.pdf')
+
+    assert blobs(store) == []
+    assert os.listdir(store.uploads_dir) == ['.store']
+
+
+def test_remove_drops_unreferenced_blob(store):
+    path_a, doc_hash = store.save(io.BytesIO(PDF_A), 'a.pdf')
+    path_b, _ = store.save(io.BytesIO(PDF_A), 'b.pdf')
+
+    store.remove(path_a, doc_hash)
+    # b.pdf still links to the blob
+    assert blobs(store) == [f"{doc_hash}.pdf"]
+    store.remove(path_b, doc_hash)
+    assert blobs(store) == []
+    assert not os.path.exists(path_a) and not os.path.exists(path_b)
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from search import vector_index as vector_index_module
+from search.vector_index import VectorIndex
+
+DIM = 32
+
+
+def clustered_embeddings(rng, n, n_topics=40):
+    """Page embeddings drawn around a few topic directions, like real documents"""
+    topics = rng.standard_normal((n_topics, DIM))
+    return topics[rng.integers(n_topics, size=n)] + 0.3 * rng.standard_normal((n, DIM))
+
+
+def brute_force_top_k(vectors, query, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return set(np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:k].tolist())
+
+
+def build(rng, n_docs, pages_per_doc=5):
+    index = VectorIndex()
+    embeddings = clustered_embeddings(rng, n_docs * pages_per_doc)
+    for d in range(n_docs):
+        rows = embeddings[d * pages_per_doc:(d + 1) * pages_per_doc]
+        index.add_document(f"doc{d}", f"doc{d}.pdf", list(range(1, pages_per_doc + 1)), rows)
+    return index, embeddings
+
+
+def row_of(hit, pages_per_doc=5):
+    return int(hit['doc_hash'][3:]) * pages_per_doc + hit['page'] - 1
+
+
+def test_small_index_is_exact():
+    rng = np.random.default_rng(0)
+    index, embeddings = build(rng, 40)
+    query = rng.standard_normal(DIM)
+    hits = index.search(query, k=10)
+    assert {row_of(hit) for hit in hits} == brute_force_top_k(embeddings, query, 10)
+    scores = [hit['score'] for hit in hits]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_ivf_recall_against_brute_force(monkeypatch):
+    monkeypatch.setattr(vector_index_module, 'MIN_TRAIN_SIZE', 1000)
+    rng = np.random.default_rng(1)
+    index, embeddings = build(rng, 600)
+    assert index._centroids is not None
+
+    recalls = []
+    for _ in range(50):
+        query = embeddings[rng.integers(len(embeddings))] + 0.1 * rng.standard_normal(DIM)
+        hits = index.search(query, k=10)
+        recalls.append(len({row_of(hit) for hit in hits} & brute_force_top_k(embeddings, query, 10)) / 10)
+    assert np.mean(recalls) >= 0.9
+
+
+def test_removed_documents_are_not_returned(monkeypatch):
+    monkeypatch.setattr(vector_index_module, 'MIN_TRAIN_SIZE', 1000)
+    rng = np.random.default_rng(2)
+    index, embeddings = build(rng, 300)
+    query = embeddings[7]  # Page 3 of doc1
+    assert index.search(query, k=1)[0]['doc_hash'] == "doc1"
+
+    index.remove_filename("doc1.pdf")
+    assert "doc1" not in {hit['doc_hash'] for hit in index.search(query, k=20)}
+    assert not index.contains("doc1")
+    assert index.vector_count == len(embeddings) - 5
+
+    # Past COMPACTION_RATIO the removed rows are dropped and the lists rebuilt
+    for d in range(2, 100):
+        index.remove_filename(f"doc{d}.pdf")
+    assert index.vector_count == (300 - 99) * 5
+    assert index._size < 300 * 5
+    assert index.search(embeddings[1000], k=1)[0]['doc_hash'] == "doc200"
+
+
+def test_save_and_load_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index_module, 'MIN_TRAIN_SIZE', 1000)
+    rng = np.random.default_rng(3)
+    index, embeddings = build(rng, 300)
+    index.save(str(tmp_path))
+    # Later saves only append the new rows as another segment
+    extra = clustered_embeddings(rng, 5)
+    index.add_document("extra", "extra.pdf", [1, 2, 3, 4, 5], extra)
+    index.remove_filename("doc0.pdf")
+    index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path))
+    assert loaded.vector_count == index.vector_count
+    assert not loaded.contains("doc0") and loaded.contains("extra")
+    for query in (embeddings[3], embeddings[1234], extra[2], rng.standard_normal(DIM)):
+        assert loaded.search(query, k=10) == index.search(query, k=10)
+    assert VectorIndex.load(str(tmp_path / "missing")) is None
+
+
+def test_dimension_mismatch_is_rejected():
+    index = VectorIndex()
+    index.add_document("a", "a.pdf", [1], np.ones((1, DIM)))
+    with pytest.raises(ValueError):
+        index.add_document("b", "b.pdf", [1], np.ones((1, DIM + 1)))
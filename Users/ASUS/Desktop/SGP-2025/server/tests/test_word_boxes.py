@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from storage.word_boxes import DocumentWordBoxes, align_words, token_offsets
+
+TEXT = "hello world\nfoo bar"
+# Two lines of words: (x0, y0, x1, y1, text)
+WORDS = [(10, 10, 60, 20, "hello"), (70, 10, 120, 20, "world"),
+         (10, 30, 40, 40, "foo"), (50, 30, 80, 40, "bar")]
+
+
+@pytest.fixture
+def word_boxes():
+    return DocumentWordBoxes.build([{'page': 1, 'text': TEXT}], {1: WORDS}, {1: (200.0, 100.0)})
+
+
+def test_token_offsets_match_split():
+    text = " ગુજરાત\tભાષા abc\n\nx "
+    starts, ends = token_offsets(text)
+    assert [text[s:e] for s, e in zip(starts, ends)] == text.split()
+
+
+def test_align_words_skips_words_missing_from_the_text():
+    # Text cleanup rewrote a word and dropped another; a repeated word is found after the previous one
+    text = "the cat, the dog and the bird"
+    words = ["the", "cat", "the", "d0g", "", "and", "the", "bird"]
+    starts, ends = align_words(text, words)
+    assert starts.tolist() == [0, 4, 9, -1, -1, 17, 21, 25]
+    assert [text[s:e] for s, e in zip(starts, ends) if s >= 0] == ["the", "cat", "the", "and", "the", "bird"]
+
+
+def test_align_words_does_not_jump_far_ahead():
+    text = "a " + "x " * 100 + "b"
+    starts, _ = align_words(text, ["a", "b"])
+    assert starts.tolist() == [0, -1]
+
+
+def test_rects_merge_words_on_a_line(word_boxes):
+    assert word_boxes.rects(1, 0, 11) == [[10, 10, 120, 20]]
+    # One rectangle per line spanned
+    assert word_boxes.rects(1, 6, 15) == [[70, 10, 120, 20], [10, 30, 40, 40]]
+
+
+def test_rects_clip_partly_covered_words(word_boxes):
+    # "lo wor": the last 2 of 5 characters of "hello" and the first 3 of "world"
+    assert word_boxes.rects(1, 3, 9) == [[40, 10, 100, 20]]
+    assert word_boxes.rects(1, 1, 2) == [[20, 10, 30, 20]]
+
+
+def test_rects_outside_words(word_boxes):
+    # The newline between the lines has no box
+    assert word_boxes.rects(1, 11, 12) == []
+    assert word_boxes.rects(2, 0, 5) == []
+
+
+def test_rects_are_rounded():
+    word_boxes = DocumentWordBoxes.build([{'page': 3, 'text': "abc"}], {3: [(1.0, 2.0, 4.0, 5.0, "abc")]},
+                                         {3: (10.0, 10.0)})
+    assert word_boxes.rects(3, 0, 1) == [[1, 2, 2, 5]]
+    assert word_boxes.rects(3, 1, 2) == [[2, 2, 3, 5]]
+    word_boxes.boxes[0] = (1.0, 2.0, 2.0, 5.0)
+    assert word_boxes.rects(3, 0, 1) == [[1, 2, 1.33, 5]]
+
+
+def test_build_drops_unaligned_words_and_round_trips(tmp_path):
+    pages = [{'page': 1, 'text': TEXT}, {'page': 2, 'text': "only"}]
+    word_boxes = DocumentWordBoxes.build(pages, {1: WORDS + [(0, 0, 1, 1, "missing")], 2: [(5, 5, 9, 9, "only")]},
+                                         {1: (200.0, 100.0)})
+    assert word_boxes.page_starts.tolist() == [0, 4, 5]
+    assert word_boxes.page_size(2) == (0.0, 0.0)
+    assert word_boxes.page_size(9) is None
+
+    path = str(tmp_path / "boxes.npz")
+    word_boxes.save(path)
+    loaded = DocumentWordBoxes.load(path)
+    assert np.array_equal(loaded.boxes, word_boxes.boxes)
+    assert loaded.rects(1, 12, 19) == word_boxes.rects(1, 12, 19) == [[10, 30, 80, 40]]
+    assert loaded.rects(2, 0, 4) == [[5, 5, 9, 9]]